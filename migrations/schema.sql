@@ -121,8 +121,82 @@ CREATE INDEX IF NOT EXISTS idx_jobs_user_id ON jobs(user_id);
 CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
 CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_jobs_session_id ON jobs(session_id);
+-- Keyset pagination of a user's jobs, newest first
+CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at DESC, job_id DESC);
 -- Optimize retry scheduling lookups
 CREATE INDEX IF NOT EXISTS idx_jobs_status_next_attempt ON jobs(status, next_attempt_at);
+
+-- Per-user job counters kept in step with jobs by the triggers below, so stats
+-- reads are a single-row lookup instead of an aggregate over every job.
+-- reconcile_job_stats() repairs any drift.
+CREATE TABLE IF NOT EXISTS job_stats (
+    user_id TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0,
+    pending INTEGER NOT NULL DEFAULT 0,
+    processing INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER IF NOT EXISTS job_stats_after_insert
+AFTER INSERT ON jobs
+BEGIN
+    INSERT INTO job_stats (user_id, total, pending, processing, completed, failed, cancelled)
+    VALUES (
+        NEW.user_id, 1,
+        NEW.status = 'pending', NEW.status = 'processing', NEW.status = 'completed',
+        NEW.status = 'failed', NEW.status = 'cancelled'
+    )
+    ON CONFLICT(user_id) DO UPDATE SET
+        total = total + 1,
+        pending = pending + excluded.pending,
+        processing = processing + excluded.processing,
+        completed = completed + excluded.completed,
+        failed = failed + excluded.failed,
+        cancelled = cancelled + excluded.cancelled,
+        updated_at = datetime('now');
+END;
+
+CREATE TRIGGER IF NOT EXISTS job_stats_after_status_update
+AFTER UPDATE OF status ON jobs
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE job_stats SET
+        pending = pending - (OLD.status = 'pending') + (NEW.status = 'pending'),
+        processing = processing - (OLD.status = 'processing') + (NEW.status = 'processing'),
+        completed = completed - (OLD.status = 'completed') + (NEW.status = 'completed'),
+        failed = failed - (OLD.status = 'failed') + (NEW.status = 'failed'),
+        cancelled = cancelled - (OLD.status = 'cancelled') + (NEW.status = 'cancelled'),
+        updated_at = datetime('now')
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS job_stats_after_delete
+AFTER DELETE ON jobs
+BEGIN
+    UPDATE job_stats SET
+        total = total - 1,
+        pending = pending - (OLD.status = 'pending'),
+        processing = processing - (OLD.status = 'processing'),
+        completed = completed - (OLD.status = 'completed'),
+        failed = failed - (OLD.status = 'failed'),
+        cancelled = cancelled - (OLD.status = 'cancelled'),
+        updated_at = datetime('now')
+    WHERE user_id = OLD.user_id;
+END;
+
+-- Seed counters for jobs that predate the table (only while it is still empty)
+INSERT OR IGNORE INTO job_stats (user_id, total, pending, processing, completed, failed, cancelled)
+SELECT user_id, COUNT(*),
+    SUM(status = 'pending'), SUM(status = 'processing'), SUM(status = 'completed'),
+    SUM(status = 'failed'), SUM(status = 'cancelled')
+FROM jobs
+WHERE NOT EXISTS (SELECT 1 FROM job_stats)
+GROUP BY user_id;
+
 CREATE INDEX IF NOT EXISTS idx_api_keys_user_id ON api_keys(user_id);
 CREATE INDEX IF NOT EXISTS idx_api_keys_lookup_hash ON api_keys(lookup_hash);
 CREATE INDEX IF NOT EXISTS idx_users_github_id ON users(github_id);
@@ -352,6 +426,28 @@ CREATE TABLE IF NOT EXISTS usage_events (
 CREATE INDEX IF NOT EXISTS idx_usage_events_user_created ON usage_events(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_usage_events_job ON usage_events(job_id, created_at DESC);
 
+-- Hourly and daily usage totals, updated by record_usage_event in the same batch
+-- as the event insert. Rebuild with scripts/backfill_usage_rollups.py.
+CREATE TABLE IF NOT EXISTS usage_rollups_hourly (
+    user_id TEXT NOT NULL,
+    bucket_start TEXT NOT NULL, -- 'YYYY-MM-DD HH:00:00' (UTC)
+    events INTEGER NOT NULL DEFAULT 0,
+    bytes_downloaded INTEGER NOT NULL DEFAULT 0,
+    duration_s REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS usage_rollups_daily (
+    user_id TEXT NOT NULL,
+    bucket_start TEXT NOT NULL, -- 'YYYY-MM-DD 00:00:00' (UTC)
+    events INTEGER NOT NULL DEFAULT 0,
+    bytes_downloaded INTEGER NOT NULL DEFAULT 0,
+    duration_s REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
 -- Idempotent step invocations (Phase 2.5)
 CREATE TABLE IF NOT EXISTS step_invocations (
     idempotency_key TEXT NOT NULL,
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Rebuild the hourly/daily usage rollups from usage_events.
+
+Deployed databases (D1 included) are backfilled once by schema migration
+0002_backfill_usage_rollups when the Worker starts. This script rebuilds the
+local SQLite database's rollups on demand, e.g. when they are suspect.
+Usage: backfill_usage_rollups.py [user_id]
+"""
+import asyncio
+import sys
+from src.workers.api.database import Database, backfill_usage_rollups
+
+async def main():
+    user_id = sys.argv[1] if len(sys.argv) > 1 else None
+
+    try:
+        db = Database()
+        buckets = await backfill_usage_rollups(db, user_id)
+        scope = f"user {user_id}" if user_id else "all users"
+        print(f"✅ Rebuilt usage rollups for {scope}: " + ", ".join(f"{table}={count}" for table, count in buckets.items()))
+    except Exception as e:
+        print(f"❌ Failed to backfill usage rollups: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
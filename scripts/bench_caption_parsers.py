@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark caption parsers on synthetic multi-hour transcripts.
+
+Compares the original join + regex json3 parser and the splitlines() +
+lookahead VTT parser with the parsers core.youtube_proxy dispatches to:
+CAPTION_TEXT_PARSERS by default, CAPTION_PARSERS when segments are requested.
+
+Usage:
+    python scripts/bench_caption_parsers.py [hours] [repeats]
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src" / "workers"))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-only-secret")
+os.environ.setdefault("PYTEST_DISABLE_DOTENV", "1")
+
+from core.youtube_proxy import CAPTION_PARSERS, CAPTION_TEXT_PARSERS  # noqa: E402
+
+WORDS = "the quick brown fox jumps over a lazy dog and then we talk about python caption parsing".split()
+
+
+def legacy_parse_json3_text(payload: str) -> str:
+    data = json.loads(payload)
+    parts = []
+    for event in data.get("events") or []:
+        for seg in event.get("segs") or []:
+            text = seg.get("utf8")
+            if text:
+                cleaned = text.replace("\n", " ").strip()
+                if cleaned:
+                    parts.append(cleaned)
+    return re.sub(r"\s+", " ", " ".join(parts)).strip()
+
+
+def legacy_parse_vtt_text(vtt_text: str) -> str:
+    raw_lines = vtt_text.splitlines()
+    lines = []
+    total = len(raw_lines)
+    idx = 0
+    while idx < total:
+        stripped = raw_lines[idx].strip()
+        idx += 1
+        if not stripped or stripped.startswith("WEBVTT") or "-->" in stripped:
+            continue
+        if stripped.isdigit():
+            lookahead_idx = idx
+            next_line = ""
+            while lookahead_idx < total:
+                candidate = raw_lines[lookahead_idx].strip()
+                if candidate:
+                    next_line = candidate
+                    break
+                lookahead_idx += 1
+            if next_line and "-->" in next_line:
+                continue
+        lines.append(stripped)
+    return re.sub(r"\s+", " ", " ".join(lines)).strip()
+
+
+def build_srt_style_vtt(hours: float, seed: int = 7) -> str:
+    """Build a numbered (SRT-style) VTT body with a cue every ~2s."""
+    rng = random.Random(seed)
+    out = ["WEBVTT", ""]
+    t = 0
+    index = 1
+    while t < hours * 3_600_000:
+        end = t + 2000
+        out.append(str(index))
+        out.append(f"{_vtt_ts(t)} --> {_vtt_ts(end)} align:start position:0%")
+        for _ in range(rng.randint(1, 2)):
+            out.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))))
+        out.append("")
+        t += rng.randint(1500, 2500)
+        index += 1
+    return "\n".join(out)
+
+
+def _vtt_ts(ms: int) -> str:
+    hours, rem = divmod(ms, 3_600_000)
+    minutes, rem = divmod(rem, 60_000)
+    return f"{hours:02d}:{minutes:02d}:{rem / 1000:06.3f}"
+
+
+def build_json3_payload(hours: float, seed: int = 7) -> str:
+    """Build an ASR-style json3 payload: a cue every ~2s, word-level segs, newline events."""
+    rng = random.Random(seed)
+    events = [{"tStartMs": 0, "dDurationMs": int(hours * 3_600_000), "id": 1, "wpWinPosId": 1}]
+    t = 0
+    while t < hours * 3_600_000:
+        segs = [{"utf8": rng.choice(WORDS)}]
+        segs += [{"utf8": " " + rng.choice(WORDS), "tOffsetMs": 120 * i} for i in range(1, rng.randint(3, 8))]
+        events.append({"tStartMs": t, "dDurationMs": 2000, "wWinId": 1, "segs": segs})
+        events.append({"tStartMs": t + 1900, "dDurationMs": 100, "wWinId": 1, "aAppend": 1, "segs": [{"utf8": "\n"}]})
+        t += rng.randint(1500, 2500)
+    return json.dumps({"wireMagic": "pb3", "events": events})
+
+
+def best_of(fns: dict, payload: str, repeats: int) -> dict:
+    """Interleave runs so machine noise hits every parser equally; keep the best time."""
+    best = {name: float("inf") for name in fns}
+    for _ in range(repeats):
+        for name, fn in fns.items():
+            # timeit disables GC while timing, which keeps multi-MB runs comparable
+            best[name] = min(best[name], timeit.timeit(lambda: fn(payload), number=1))
+    return best
+
+
+def main() -> None:
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 4.0
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    payload = build_json3_payload(hours)
+    assert legacy_parse_json3_text(payload) == CAPTION_TEXT_PARSERS["json3"](payload)
+
+    timings = best_of(
+        {
+            "json.loads only": json.loads,
+            "legacy join + regex": legacy_parse_json3_text,
+            "production (text only)": CAPTION_TEXT_PARSERS["json3"],
+            "with segments": CAPTION_PARSERS["json3"],
+        },
+        payload,
+        repeats,
+    )
+    _, segments = CAPTION_PARSERS["json3"](payload)
+
+    print(f"json3 payload: {hours:g}h, {len(payload) / 1_000_000:.1f} MB, {len(segments['text'])} cues")
+    for name, seconds in timings.items():
+        print(f"  {name:<24}: {seconds * 1000:8.1f} ms")
+    decode = timings["json.loads only"]
+    legacy_post = timings["legacy join + regex"] - decode
+    production_post = timings["production (text only)"] - decode
+    print(f"  {'post-decode speedup':<24}: {legacy_post / max(production_post, 1e-9):.2f}x")
+    print(f"  {'end-to-end speedup':<24}: {timings['legacy join + regex'] / timings['production (text only)']:.2f}x")
+
+    vtt = build_srt_style_vtt(hours)
+    assert legacy_parse_vtt_text(vtt) == CAPTION_TEXT_PARSERS["vtt"](vtt)
+    timings = best_of(
+        {
+            "legacy splitlines + regex": legacy_parse_vtt_text,
+            "production (text only)": CAPTION_TEXT_PARSERS["vtt"],
+            "with segments": CAPTION_PARSERS["vtt"],
+        },
+        vtt,
+        repeats,
+    )
+    print(f"vtt payload: {hours:g}h, {len(vtt) / 1_000_000:.1f} MB")
+    for name, seconds in timings.items():
+        print(f"  {name:<24}: {seconds * 1000:8.1f} ms")
+    speedup = timings["legacy splitlines + regex"] / timings["production (text only)"]
+    print(f"  {'production speedup':<24}: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare sequential and batched Database.execute_many against a fake D1 binding.
+
+The fake binding charges a fixed round-trip latency for every run() and every
+batch() call, plus a small per-statement cost inside the database. The
+sequential path is the previous implementation (one run() per parameter
+tuple); the batched path is the current execute_many, which sends chunks of
+statements through db.batch().
+
+Usage:
+    python scripts/bench_d1_execute_many.py [rows] [round_trip_ms] [statement_us]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src" / "workers"))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-only-secret")
+os.environ.setdefault("PYTEST_DISABLE_DOTENV", "1")
+
+from api.database import Database  # noqa: E402
+
+QUERY = "INSERT INTO usage_events (id, user_id, job_id, event_type, metrics) VALUES (?, ?, ?, ?, ?)"
+
+
+class FakeStatement:
+    def __init__(self, d1, params=()):
+        self.d1, self.params = d1, params
+
+    def bind(self, *params):
+        return FakeStatement(self.d1, params)
+
+    async def run(self):
+        self.d1.round_trips += 1
+        await asyncio.sleep(self.d1.round_trip_s + self.d1.statement_s)
+        self.d1.rows += 1
+        return {"success": True}
+
+
+class FakeD1:
+    def __init__(self, round_trip_ms: float, statement_us: float):
+        self.round_trip_s = round_trip_ms / 1000
+        self.statement_s = statement_us / 1e6
+        self.round_trips = 0
+        self.rows = 0
+
+    def prepare(self, sql):
+        return FakeStatement(self)
+
+    async def batch(self, statements):
+        self.round_trips += 1
+        await asyncio.sleep(self.round_trip_s + self.statement_s * len(statements))
+        self.rows += len(statements)
+        return [{"success": True} for _ in statements]
+
+
+async def sequential(db: Database, params_list):
+    """The pre-batching D1 path: one awaited run() per parameter tuple."""
+    for params in params_list:
+        await db._statements.bind(db.db, QUERY, params).run()
+
+
+async def batched(db: Database, params_list):
+    reports = await db.execute_many(QUERY, params_list, return_reports=True)
+    assert not any(report["error"] for report in reports)
+
+
+async def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    round_trip_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    statement_us = float(sys.argv[3]) if len(sys.argv) > 3 else 20.0
+    params_list = [
+        (f"event-{i}", "user-1", f"job-{i // 10}", "download", '{"bytes_downloaded": 1024}')
+        for i in range(rows)
+    ]
+
+    print(f"{rows} rows, {round_trip_ms:g} ms per round trip, {statement_us:g} us per statement")
+    print(f"{'path':<12} {'ms':>9} {'round trips':>12} {'rows/s':>10}")
+    for name, fn in (("sequential", sequential), ("batched", batched)):
+        d1 = FakeD1(round_trip_ms, statement_us)
+        db = Database(db=d1)
+        started = time.perf_counter()
+        await fn(db, params_list)
+        elapsed = time.perf_counter() - started
+        assert d1.rows == rows
+        print(f"{name:<12} {elapsed * 1000:>9.1f} {d1.round_trips:>12} {rows / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
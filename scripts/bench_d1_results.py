@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Compare per-row and bulk conversion of D1 result sets.
+
+Outside a Worker there is no Pyodide, so this installs a stub pyodide.ffi
+whose JsProxy wraps plain Python rows and charges a fixed cost for every
+Python <-> JS boundary crossing (keys(), item access, iteration, to_py()).
+The per-row path crosses the boundary for every row and every column; the
+bulk path converts the whole results array with one to_py() call.
+
+Usage:
+    python scripts/bench_d1_results.py [rows] [columns] [crossing_us]
+"""
+
+import os
+import sys
+import time
+import timeit
+import types
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src" / "workers"))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-only-secret")
+os.environ.setdefault("PYTEST_DISABLE_DOTENV", "1")
+
+CROSSING_US = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+crossings = 0
+
+
+def _cross() -> None:
+    """Spin for one simulated FFI crossing."""
+    global crossings
+    crossings += 1
+    deadline = time.perf_counter() + CROSSING_US / 1e6
+    while time.perf_counter() < deadline:
+        pass
+
+
+class StubJsProxy:
+    """A JS array or object as seen from Python, with a cost per crossing."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def keys(self):
+        _cross()
+        return list(self._value.keys())
+
+    def __getitem__(self, key):
+        _cross()
+        value = self._value[key]
+        return StubJsProxy(value) if isinstance(value, (dict, list)) else value
+
+    def __iter__(self):
+        for item in self._value:
+            _cross()
+            yield StubJsProxy(item) if isinstance(item, (dict, list)) else item
+
+    def __len__(self):
+        return len(self._value)
+
+    def to_py(self):
+        _cross()
+        if isinstance(self._value, list):
+            return [dict(row) if isinstance(row, dict) else row for row in self._value]
+        return dict(self._value)
+
+
+ffi = types.ModuleType("pyodide.ffi")
+ffi.JsProxy = StubJsProxy
+sys.modules["pyodide"] = types.ModuleType("pyodide")
+sys.modules["pyodide.ffi"] = ffi
+
+from api.database import _jsproxy_to_dict, _jsproxy_to_list, _rows_to_dicts  # noqa: E402
+
+
+def per_row(rows):
+    return [_jsproxy_to_dict(row) for row in _jsproxy_to_list(rows)]
+
+
+def make_results(row_count: int, columns: int) -> StubJsProxy:
+    rows = [
+        {f"col_{c}": (f"value-{r}-{c}" if c % 2 else r * columns + c) for c in range(columns)}
+        for r in range(row_count)
+    ]
+    return StubJsProxy(rows)
+
+
+def measure(fn, results, number: int = 20) -> tuple:
+    global crossings
+    crossings = 0
+    fn(results)
+    per_call_crossings = crossings
+    seconds = timeit.timeit(lambda: fn(results), number=number) / number
+    return seconds * 1000, per_call_crossings
+
+
+def main() -> None:
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    columns = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    results = make_results(row_count, columns)
+    assert per_row(results) == _rows_to_dicts(results)
+
+    print(f"{row_count} rows x {columns} columns, {CROSSING_US:g} us per boundary crossing")
+    print(f"{'path':<10} {'ms/page':>9} {'crossings':>10}")
+    for name, fn in (("per-row", per_row), ("bulk", _rows_to_dicts)):
+        ms, count = measure(fn, results)
+        print(f"{name:<10} {ms:>9.3f} {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
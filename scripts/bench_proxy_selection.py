@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Simulate proxy selection strategies against a synthetic proxy fleet.
+
+Each proxy gets a latency distribution (lognormal around its own median) and a
+failure rate; failures cost a timeout. Every simulated transcript request
+retries on a freshly selected proxy (up to 3 attempts, like the scraper) and
+its end-to-end latency is the sum of its attempts. Outcomes are fed back via
+mark_proxy_success/mark_proxy_failure so adaptive strategies can learn.
+
+It then times a single get_next_proxy call per strategy as the pool grows,
+next to the old "rebuild the active list, then scan it" approach.
+
+Usage:
+    python scripts/bench_proxy_selection.py [requests] [proxies] [seed]
+"""
+
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src" / "workers"))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-only-secret")
+os.environ.setdefault("PYTEST_DISABLE_DOTENV", "1")
+
+from core.proxy_pool import ProxyEntry, ProxyPoolManager  # noqa: E402
+
+STRATEGIES = ("random", "round_robin", "best", "p2c", "weighted")
+PICK_STRATEGIES = STRATEGIES + ("lru",)
+POOL_SIZES = (50, 1000, 10000)
+MAX_ATTEMPTS = 3
+TIMEOUT_MS = 5000.0
+
+
+def build_fleet(count: int, seed: int) -> dict:
+    """Mostly mediocre free proxies, a few fast ones, some slow-but-working ones."""
+    rng = random.Random(seed)
+    fleet = {}
+    for index in range(count):
+        kind = rng.random()
+        if kind < 0.15:
+            median_ms, failure_rate = rng.uniform(150, 400), rng.uniform(0.0, 0.1)
+        elif kind < 0.45:
+            median_ms, failure_rate = rng.uniform(1500, 4000), rng.uniform(0.0, 0.2)
+        else:
+            median_ms, failure_rate = rng.uniform(400, 1500), rng.uniform(0.2, 0.8)
+        fleet[f"http://10.0.{index // 250}.{index % 250}:8080"] = (median_ms, failure_rate)
+    return fleet
+
+
+def simulate(strategy: str, fleet: dict, requests: int, seed: int) -> list:
+    rng = random.Random(seed)
+    random.seed(seed)  # the pool's own random choices
+    manager = ProxyPoolManager()
+    manager.proxies = {url: ProxyEntry(url=url) for url in fleet}
+    manager.rotation_strategy = strategy
+
+    latencies = []
+    for _ in range(requests):
+        total = 0.0
+        for _ in range(MAX_ATTEMPTS):
+            url = manager.get_next_proxy()
+            median_ms, failure_rate = fleet[url]
+            if rng.random() < failure_rate:
+                cost = TIMEOUT_MS if rng.random() < 0.5 else median_ms
+                total += cost
+                manager.mark_proxy_failure(url, cost)
+                continue
+            cost = median_ms * rng.lognormvariate(0, 0.35)
+            total += cost
+            manager.mark_proxy_success(url, cost)
+            break
+        latencies.append(total)
+    return latencies
+
+
+def legacy_lru_pick(manager: ProxyPoolManager) -> str:
+    """The pre-index selection path: rebuild the active list and scan it for LRU."""
+    active = [proxy for proxy in manager.proxies.values() if proxy.is_active]
+    proxy = min(active, key=lambda p: p.last_used or datetime.min.replace(tzinfo=timezone.utc))
+    proxy.last_used = datetime.now(timezone.utc)
+    return proxy.url
+
+
+def pick_cost_us(size: int, picks: int = 5000) -> dict:
+    manager = ProxyPoolManager()
+    fleet = build_fleet(size, seed=size)
+    manager.proxies = {url: ProxyEntry(url=url) for url in fleet}
+    for url, (median_ms, failure_rate) in fleet.items():
+        manager.mark_proxy_success(url, median_ms)
+        if failure_rate > 0.5:
+            manager.mark_proxy_failure(url, TIMEOUT_MS)
+
+    costs = {"legacy lru scan": timeit.timeit(lambda: legacy_lru_pick(manager), number=picks) / picks * 1e6}
+    for strategy in PICK_STRATEGIES:
+        manager.rotation_strategy = strategy
+        costs[strategy] = timeit.timeit(manager.get_next_proxy, number=picks) / picks * 1e6
+    return costs
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    proxies = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 42
+    fleet = build_fleet(proxies, seed)
+
+    print(f"{requests} requests over {proxies} proxies (seed {seed})")
+    print(f"{'strategy':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for strategy in STRATEGIES:
+        latencies = simulate(strategy, fleet, requests, seed)
+        mean = sum(latencies) / len(latencies)
+        print(
+            f"{strategy:<12} {percentile(latencies, 50):>9.0f} {percentile(latencies, 95):>9.0f} "
+            f"{percentile(latencies, 99):>9.0f} {mean:>9.0f}"
+        )
+
+    print()
+    print("get_next_proxy cost (us per pick)")
+    results = {size: pick_cost_us(size) for size in POOL_SIZES}
+    print(f"{'strategy':<16}" + "".join(f"{size:>10}" for size in POOL_SIZES))
+    for name in results[POOL_SIZES[0]]:
+        print(f"{name:<16}" + "".join(f"{results[size][name]:>10.1f}" for size in POOL_SIZES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Replay transcript request traces against a simulated YouTube and proxy fleet.
+
+Nothing leaves the process: fetch_transcript_via_proxy runs unchanged with a
+real ProxyPoolManager, but every scrape client is wired to an in-memory
+transport that plays both the proxy and the watch/player/timedtext endpoints.
+Each fake proxy has its own lognormal latency, a failure rate (half of the
+failures hang until the scraper timeout, half refuse fast) and an exit-IP rate
+limit: past it YouTube answers 429 and keeps answering 429 for a penalty window.
+
+Time is scaled so long traces run quickly: with --time-scale 0.01 a simulated
+second takes 10 real ms. Scraper delays and the pool's time constants (EWMA
+half-life, breaker cooldowns) are scaled by the same factor; reported
+latencies and throughput are in simulated time.
+
+A trace is JSON lines of {"at": seconds_from_start, "video_id": "..."}. Without
+--trace a Poisson trace is generated (--dump-trace saves it for later A/B runs).
+A fleet file is a JSON list of objects with the FakeProxy fields.
+
+Usage:
+    python scripts/bench_transcript_stack.py [--requests N] [--rate RPS] [--proxies N]
+        [--strategies weighted,p2c,random] [--trace FILE] [--fleet FILE] ...
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src" / "workers"))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-only-secret")
+os.environ.setdefault("PYTEST_DISABLE_DOTENV", "1")
+
+import httpx  # noqa: E402
+
+from core import proxy_pool, youtube_proxy  # noqa: E402
+from core.proxy_pool import ProxyEntry, ProxyPoolManager  # noqa: E402
+from core.youtube_proxy import TranscriptProxyError, fetch_transcript_via_proxy  # noqa: E402
+
+STRATEGIES = ("weighted", "p2c", "best", "random", "round_robin")
+# Pool time constants (seconds) that shrink with the time scale
+SCALED_POOL_CONSTANTS = (
+    "EWMA_HALF_LIFE_SECONDS",
+    "BREAKER_BASE_COOLDOWN_SECONDS",
+    "BREAKER_MAX_COOLDOWN_SECONDS",
+    "BREAKER_PROBE_TIMEOUT_SECONDS",
+)
+API_KEY = "sim-innertube-key"
+CLIENT_VERSION = "2.20240101.00.00"
+WATCH_HTML = (
+    f'<html><script>ytcfg.set({{"INNERTUBE_API_KEY":"{API_KEY}",'
+    f'"INNERTUBE_CONTEXT_CLIENT_VERSION":"{CLIENT_VERSION}"}});</script></html>'
+)
+
+
+@dataclass
+class FakeProxy:
+    """One simulated proxy: latency per HTTP exchange, failures and exit-IP rate limit."""
+    url: str
+    median_ms: float = 800.0
+    sigma: float = 0.35
+    failure_rate: float = 0.1
+    hang_share: float = 0.5  # share of failures that hang until the client timeout
+    rate_limit_per_minute: float = 0.0  # 0 = never rate limited
+    penalty_seconds: float = 120.0  # keep answering 429 this long after tripping the limit
+    recent: Deque[float] = field(default_factory=deque, repr=False)
+    blocked_until: float = field(default=0.0, repr=False)
+
+
+@dataclass
+class RequestResult:
+    video_id: str
+    latency_ms: float
+    outcome: str
+
+
+def build_fleet(count: int, seed: int) -> List[FakeProxy]:
+    """Fast/steady, slow-but-working, flaky, rate-limited and dead free proxies."""
+    rng = random.Random(seed)
+    fleet = []
+    for index in range(count):
+        url = f"http://10.1.{index // 250}.{index % 250}:8080"
+        kind = rng.random()
+        if kind < 0.15:
+            proxy = FakeProxy(url, rng.uniform(150, 400), failure_rate=rng.uniform(0.0, 0.05))
+        elif kind < 0.40:
+            proxy = FakeProxy(url, rng.uniform(1200, 3500), failure_rate=rng.uniform(0.0, 0.15))
+        elif kind < 0.70:
+            proxy = FakeProxy(url, rng.uniform(400, 1500), failure_rate=rng.uniform(0.2, 0.7))
+        elif kind < 0.85:
+            proxy = FakeProxy(
+                url, rng.uniform(300, 900), failure_rate=0.05, rate_limit_per_minute=rng.uniform(6, 20)
+            )
+        else:
+            proxy = FakeProxy(url, rng.uniform(400, 1500), failure_rate=1.0)
+        fleet.append(proxy)
+    return fleet
+
+
+def load_fleet(path: str) -> List[FakeProxy]:
+    return [FakeProxy(**item) for item in json.loads(Path(path).read_text())]
+
+
+def generate_trace(requests: int, rate: float, catalogue: int, seed: int) -> List[dict]:
+    """Poisson arrivals; video popularity is Zipf-like so some videos repeat."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(catalogue)]
+    videos = [f"sim{index:08d}" for index in range(catalogue)]
+    at = 0.0
+    trace = []
+    for video_id in rng.choices(videos, weights=weights, k=requests):
+        at += rng.expovariate(rate)
+        trace.append({"at": round(at, 4), "video_id": video_id})
+    return trace
+
+
+def load_trace(path: str) -> List[dict]:
+    with open(path) as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+class SimulatedNetwork:
+    """Routes scrape clients through fake proxies to a fake YouTube."""
+
+    def __init__(self, fleet: List[FakeProxy], *, no_captions: set, time_scale: float, seed: int) -> None:
+        self.proxies = {proxy.url: proxy for proxy in fleet}
+        # Requests with no proxy go out from the worker's own IP
+        self.direct = FakeProxy("direct", median_ms=250.0, failure_rate=0.0, rate_limit_per_minute=10.0)
+        self.no_captions = no_captions
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.exchanges: Counter = Counter()
+
+    def now(self) -> float:
+        """Simulated seconds."""
+        return time.monotonic() / self.time_scale
+
+    async def sleep_ms(self, simulated_ms: float) -> None:
+        await asyncio.sleep(simulated_ms / 1000 * self.time_scale)
+
+    def build_client(self, proxy_url: Optional[str], is_free_proxy: bool, timeout: float) -> httpx.AsyncClient:
+        """Drop-in for youtube_proxy._build_client; one client per scrape attempt."""
+        self.exchanges["attempts"] += 1
+        link = self.proxies.get(proxy_url) if proxy_url else self.direct
+        if link is None:
+            link = FakeProxy(proxy_url, failure_rate=1.0)  # not in the fleet: unreachable
+        return httpx.AsyncClient(transport=_ProxyTransport(self, link, timeout), timeout=timeout)
+
+    def rate_limited(self, link: FakeProxy) -> bool:
+        if not link.rate_limit_per_minute:
+            return False
+        now = self.now()
+        if now < link.blocked_until:
+            return True
+        while link.recent and link.recent[0] < now - 60:
+            link.recent.popleft()
+        link.recent.append(now)
+        if len(link.recent) > link.rate_limit_per_minute:
+            link.blocked_until = now + link.penalty_seconds
+            return True
+        return False
+
+    def youtube(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        video_id = parse_qs(request.url.query.decode()).get("v", [""])[0]
+        if path == "/watch":
+            return httpx.Response(200, text=WATCH_HTML, request=request)
+        if path == "/youtubei/v1/player":
+            video_id = json.loads(request.content).get("videoId", "")
+            data: Dict[str, object] = {"playabilityStatus": {"status": "OK"}}
+            if video_id not in self.no_captions:
+                data["captions"] = {"playerCaptionsTracklistRenderer": {"captionTracks": [{
+                    "baseUrl": f"https://www.youtube.com/api/timedtext?v={video_id}&lang=en",
+                    "languageCode": "en",
+                    "kind": "asr",
+                }]}}
+            return httpx.Response(200, json=data, request=request)
+        if path == "/api/timedtext":
+            events = [{"tStartMs": i * 2000, "dDurationMs": 2000, "segs": [{"utf8": f"{video_id} line {i}"}]}
+                      for i in range(20)]
+            return httpx.Response(200, json={"events": events}, request=request)
+        return httpx.Response(404, request=request)
+
+
+class _ProxyTransport(httpx.AsyncBaseTransport):
+    def __init__(self, network: SimulatedNetwork, link: FakeProxy, timeout: float) -> None:
+        self.network = network
+        self.link = link
+        self.timeout_ms = timeout * 1000
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        network, link = self.network, self.link
+        latency_ms = link.median_ms * network.rng.lognormvariate(0, link.sigma)
+        if network.rng.random() < link.failure_rate:
+            if network.rng.random() < link.hang_share:
+                network.exchanges["timeout"] += 1
+                await network.sleep_ms(self.timeout_ms)
+                raise httpx.ReadTimeout("simulated proxy hang", request=request)
+            network.exchanges["refused"] += 1
+            await network.sleep_ms(latency_ms * 0.2)
+            raise httpx.ConnectError("simulated proxy refused connection", request=request)
+        await network.sleep_ms(min(latency_ms, self.timeout_ms))
+        if latency_ms >= self.timeout_ms:
+            network.exchanges["timeout"] += 1
+            raise httpx.ReadTimeout("simulated slow proxy", request=request)
+        if network.rate_limited(link):
+            network.exchanges["429"] += 1
+            return httpx.Response(429, request=request)
+        network.exchanges["ok"] += 1
+        return network.youtube(request)
+
+
+def configure(args: argparse.Namespace, strategy: str, network: SimulatedNetwork, fleet: List[FakeProxy]) -> None:
+    """Point the scraper at the simulated network and give it a fresh, pre-filled pool."""
+    scale = args.time_scale
+    for name, value in args.pool_constants.items():
+        setattr(proxy_pool, name, value * scale)
+    settings = youtube_proxy.settings
+    settings.youtube_scraper_timeout_seconds = args.timeout
+    settings.youtube_scraper_max_retries = args.retries
+    settings.youtube_scraper_retry_base_delay = args.retry_delay * scale
+    settings.youtube_scraper_jitter_max_seconds = args.jitter * scale
+    settings.youtube_scraper_caption_race = args.caption_race
+    settings.youtube_scraper_proxy_pool = []
+    youtube_proxy._build_client = network.build_client
+    youtube_proxy.clear_negative_cache()
+    youtube_proxy._caption_format_stats.clear()
+
+    manager = ProxyPoolManager()
+    manager.proxies = {proxy.url: ProxyEntry(url=proxy.url) for proxy in fleet}
+    manager.rotation_strategy = strategy
+    # Keep background maintenance (real fetches, health probes) from ever coming due
+    manager.last_fetch = manager.last_health_check = proxy_pool.datetime.now(proxy_pool.timezone.utc)
+    manager.fetch_interval = manager.health_check_interval = math.inf
+    proxy_pool._proxy_pool_manager = manager
+
+
+async def replay(trace: List[dict], network: SimulatedNetwork) -> List[RequestResult]:
+    scale = network.time_scale
+
+    async def one(item: dict) -> RequestResult:
+        await asyncio.sleep(item["at"] * scale)
+        started = time.perf_counter()
+        try:
+            await fetch_transcript_via_proxy(item["video_id"])
+            outcome = "success"
+        except TranscriptProxyError as exc:
+            outcome = exc.code
+        latency_ms = (time.perf_counter() - started) * 1000 / scale
+        return RequestResult(item["video_id"], latency_ms, outcome)
+
+    return list(await asyncio.gather(*(one(item) for item in trace)))
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def summarize(results: List[RequestResult], makespan_s: float) -> dict:
+    served = [r for r in results if r.outcome in ("success", "no_captions")]
+    latencies = [r.latency_ms for r in served]
+    return {
+        "requests": len(results),
+        "success": sum(r.outcome == "success" for r in results),
+        "served_rate": len(served) / len(results) if results else 0.0,
+        "throughput_rps": len(served) / makespan_s if makespan_s else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "outcomes": dict(Counter(r.outcome for r in results)),
+    }
+
+
+async def run_strategy(args, strategy: str, trace: List[dict], fleet: List[FakeProxy], no_captions: set) -> dict:
+    network = SimulatedNetwork(fleet, no_captions=no_captions, time_scale=args.time_scale, seed=args.seed)
+    random.seed(args.seed)  # the pool's and scraper's own random choices
+    configure(args, strategy, network, fleet)
+    started = time.perf_counter()
+    results = await replay(trace, network)
+    makespan_s = (time.perf_counter() - started) / args.time_scale
+    summary = summarize(results, makespan_s)
+    summary["attempts_per_request"] = network.exchanges.pop("attempts", 0) / max(len(results), 1)
+    summary["exchanges"] = dict(network.exchanges)
+    summary["breaker_transitions"] = proxy_pool.get_proxy_pool_manager().get_pool_stats().get("breaker_transitions")
+    return summary
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=5.0, help="arrivals per simulated second")
+    parser.add_argument("--catalogue", type=int, default=200, help="distinct videos in a generated trace")
+    parser.add_argument("--no-captions", type=float, default=0.05, help="share of videos without captions")
+    parser.add_argument("--proxies", type=int, default=50)
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--trace", help="replay this JSON-lines trace instead of generating one")
+    parser.add_argument("--dump-trace", help="write the trace that was replayed to this file")
+    parser.add_argument("--fleet", help="JSON list of FakeProxy objects instead of a generated fleet")
+    parser.add_argument("--timeout", type=float, default=10.0, help="scraper timeout, simulated seconds")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--retry-delay", type=float, default=0.5, help="retry base delay, simulated seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="max pre-attempt jitter, simulated seconds")
+    parser.add_argument("--caption-race", action="store_true")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="real seconds per simulated second")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print full results as JSON")
+    args = parser.parse_args(argv)
+    args.pool_constants = {name: getattr(proxy_pool, name) for name in SCALED_POOL_CONSTANTS}
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.CRITICAL)
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    fleet_spec = load_fleet(args.fleet) if args.fleet else build_fleet(args.proxies, args.seed)
+    trace = load_trace(args.trace) if args.trace else generate_trace(args.requests, args.rate, args.catalogue, args.seed)
+    if args.dump_trace:
+        with open(args.dump_trace, "w") as handle:
+            handle.writelines(json.dumps(item) + "\n" for item in trace)
+    videos = sorted({item["video_id"] for item in trace})
+    no_captions = set(random.Random(args.seed).sample(videos, int(len(videos) * args.no_captions)))
+
+    results = {}
+    for strategy in args.strategies.split(","):
+        # Every strategy starts from the same untouched fleet state
+        fleet = [FakeProxy(**{k: v for k, v in asdict(p).items() if k not in ("recent", "blocked_until")})
+                 for p in fleet_spec]
+        results[strategy] = asyncio.run(run_strategy(args, strategy, trace, fleet, no_captions))
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+        return
+    print(f"{len(trace)} requests over {len(fleet_spec)} proxies (seed {args.seed}, time scale {args.time_scale})")
+    print(f"{'strategy':<12} {'served':>7} {'rps':>7} {'tries':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  outcomes")
+    for strategy, summary in results.items():
+        print(
+            f"{strategy:<12} {summary['served_rate']:>7.1%} {summary['throughput_rps']:>7.2f} "
+            f"{summary['attempts_per_request']:>6.2f} "
+            f"{summary['p50_ms']:>9.0f} {summary['p95_ms']:>9.0f} {summary['p99_ms']:>9.0f}  {summary['outcomes']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -24,7 +24,8 @@ from .static_loader import mount_static_files
 
 from .config import Settings, settings as global_settings
 from .cloudflare_queue import QueueProducer
-from .database import Database, ensure_sessions_schema, ensure_full_schema
+from .database import Database
+from .migrations import migrate
 from .exceptions import APIException
 from .app_logging import setup_logging, get_logger, get_request_id
 from .middleware import (
@@ -76,14 +77,19 @@ def create_app(custom_settings: Optional[Settings] = None) -> FastAPI:
         # (D1 binding). Database() abstracts that difference.
         db_instance = Database(db=active_settings.d1_database)
         app_logger.info("Database initialized")
+        if active_settings.event_buffer_enabled:
+            db_instance.enable_event_buffer(
+                max_batch=active_settings.event_buffer_max_batch,
+                flush_interval=active_settings.event_buffer_flush_ms / 1000,
+                max_pending=active_settings.event_buffer_max_pending,
+            )
+            app_logger.info("Event write-behind buffer enabled")
         set_db_instance(db_instance)
 
         try:
-            await ensure_sessions_schema(db_instance)
-            app_logger.info("Session schema ensured")
-            # Apply full schema to ensure all tables exist
-            await ensure_full_schema(db_instance)
-            app_logger.info("Full database schema ensured")
+            # One version check when the schema is current; migrations only on a bump
+            schema_version = await migrate(db_instance)
+            app_logger.info("Database schema at version %s", schema_version)
         except Exception as exc:  # pragma: no cover - fail fast on schema errors
             app_logger.error(
                 "Failed ensuring database schema: %s, error_type=%s",
@@ -135,6 +141,10 @@ def create_app(custom_settings: Optional[Settings] = None) -> FastAPI:
                 app_logger.error("Error cancelling background tasks: %s", exc, exc_info=True)
 
             if db_instance is not None:
+                try:
+                    await db_instance.close_event_buffer()
+                except Exception as exc:  # pragma: no cover - defensive logging
+                    app_logger.error("Error flushing event buffer: %s", exc, exc_info=True)
                 try:
                     if hasattr(db_instance, "db") and db_instance.db is not None:
                         db_obj = db_instance.db
@@ -147,6 +157,7 @@ def create_app(custom_settings: Optional[Settings] = None) -> FastAPI:
                                     method()
                                 app_logger.info("Database %s called", method_name)
                                 break
+                    db_instance.close()
                     app_logger.info("Database connection closed")
                 except Exception as exc:  # pragma: no cover - defensive logging
                     app_logger.error("Error closing database connection: %s", exc, exc_info=True)
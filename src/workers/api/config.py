@@ -128,6 +128,19 @@ class Settings:
     session_touch_interval_seconds: int = 300
 
     d1_database: Optional[Any] = None
+    # LOCAL_SQLITE_PATH deployments: reader connections next to the single writer
+    sqlite_pool_readers: int = 4
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size_mb: int = 256
+    # Write-behind buffering of pipeline/usage event rows; for long-running
+    # processes only, since a Worker isolate may be frozen before a timed flush
+    event_buffer_enabled: bool = False
+    event_buffer_max_batch: int = 50
+    event_buffer_flush_ms: int = 250
+    event_buffer_max_pending: int = 1000
+    # Job/document context reused across pipeline events; 0 disables
+    pipeline_event_cache_ttl_seconds: int = 30
+    pipeline_event_cache_size: int = 512
     queue: Optional[Any] = None
     dlq: Optional[Any] = None
     kv_namespace: Optional[Any] = None
@@ -168,6 +181,9 @@ class Settings:
     youtube_scraper_max_retries: int = 3
     youtube_scraper_retry_base_delay: float = 0.5
     youtube_scraper_jitter_max_seconds: float = 0.2
+    youtube_scraper_caption_race: bool = False  # fetch json3 and vtt concurrently
+    youtube_transcript_bulk_concurrency: int = 8
+    youtube_transcript_negative_cache_ttl_seconds: int = 600  # 0 disables
     
     # Free proxy pool configuration
     youtube_scraper_enable_free_proxies: bool = False
@@ -176,7 +192,7 @@ class Settings:
     youtube_scraper_max_free_proxies: int = 50
     youtube_scraper_proxy_health_check_timeout: float = 5.0
     youtube_scraper_proxy_min_success_rate: float = 0.3
-    youtube_scraper_proxy_rotation_strategy: str = "random"  # random, round_robin, lru, best
+    youtube_scraper_proxy_rotation_strategy: str = "random"  # random, round_robin, lru, best, weighted, p2c
 
     def __post_init__(self) -> None:
         self.environment = (self.environment or "development").lower()
@@ -217,6 +233,18 @@ class Settings:
                 f"{self.session_ttl_hours * 3600} seconds)"
             )
         self.drive_watch_renewal_window_minutes = _int(self.drive_watch_renewal_window_minutes, 60)
+        self.sqlite_pool_readers = max(1, _int(self.sqlite_pool_readers, 4))
+        self.sqlite_synchronous = (self.sqlite_synchronous or "NORMAL").strip().upper()
+        if self.sqlite_synchronous not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+            self.sqlite_synchronous = "NORMAL"
+        self.sqlite_mmap_size_mb = max(0, _int(self.sqlite_mmap_size_mb, 256))
+        self.event_buffer_enabled = _bool(self.event_buffer_enabled)
+        self.event_buffer_max_batch = max(1, _int(self.event_buffer_max_batch, 50))
+        # A 0 ms interval would make the flusher spin; 10 ms matches EventWriteBuffer's floor
+        self.event_buffer_flush_ms = max(10, _int(self.event_buffer_flush_ms, 250))
+        self.event_buffer_max_pending = max(1, _int(self.event_buffer_max_pending, 1000))
+        self.pipeline_event_cache_ttl_seconds = max(0, _int(self.pipeline_event_cache_ttl_seconds, 30))
+        self.pipeline_event_cache_size = max(1, _int(self.pipeline_event_cache_size, 512))
         if not self.jwt_secret_key:
             raise ValueError("JWT_SECRET_KEY is required")
         # In production we always require external queues; in development
@@ -257,6 +285,11 @@ class Settings:
         self.youtube_scraper_max_retries = max(1, _int(self.youtube_scraper_max_retries, 3))
         self.youtube_scraper_retry_base_delay = max(0.05, _float(self.youtube_scraper_retry_base_delay, 0.5))
         self.youtube_scraper_jitter_max_seconds = max(0.0, _float(self.youtube_scraper_jitter_max_seconds, 0.2))
+        self.youtube_scraper_caption_race = _bool(self.youtube_scraper_caption_race)
+        self.youtube_transcript_bulk_concurrency = max(1, _int(self.youtube_transcript_bulk_concurrency, 8))
+        self.youtube_transcript_negative_cache_ttl_seconds = max(
+            0, _int(self.youtube_transcript_negative_cache_ttl_seconds, 600)
+        )
         
         # Free proxy pool settings
         raw_value = getattr(self, 'youtube_scraper_enable_free_proxies', None)
@@ -271,7 +304,7 @@ class Settings:
         self.youtube_scraper_proxy_health_check_timeout = max(1.0, _float(self.youtube_scraper_proxy_health_check_timeout, 5.0))
         self.youtube_scraper_proxy_min_success_rate = max(0.0, min(1.0, _float(self.youtube_scraper_proxy_min_success_rate, 0.3)))
         rotation_strategy = (self.youtube_scraper_proxy_rotation_strategy or "random").lower()
-        if rotation_strategy not in {"random", "round_robin", "lru", "best"}:
+        if rotation_strategy not in {"random", "round_robin", "lru", "best", "weighted", "p2c"}:
             rotation_strategy = "random"
         self.youtube_scraper_proxy_rotation_strategy = rotation_strategy
 
@@ -4,6 +4,8 @@ or special local runs via the LOCAL_SQLITE_PATH environment variable.
 """
 
 import json
+import base64
+import binascii
 import hashlib
 import uuid
 from typing import Optional, List, Dict, Any
@@ -17,6 +19,10 @@ import random
 from .config import settings
 from .models import JobStatus, JobStatusEnum, JobProgress
 from .exceptions import DatabaseError
+from .sqlite_pool import SQLiteConnectionPool, is_read_query
+from .statement_cache import StatementCache
+from .event_buffer import EventWriteBuffer
+from .ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +33,78 @@ TERMINAL_JOB_STATES = {
     JobStatusEnum.CANCELLED.value
 }
 
+# Status counter columns of the job_stats table, one per job status
+JOB_STATS_STATUSES = tuple(status.value for status in JobStatusEnum)
+
+# usage_events rollup tables and the bucket each created_at timestamp falls into
+USAGE_ROLLUPS = (
+    ("usage_rollups_hourly", "%Y-%m-%d %H:00:00"),
+    ("usage_rollups_daily", "%Y-%m-%d 00:00:00"),
+)
+_SQL_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Per-call caps for D1 batch(): each bound statement counts toward the Worker's
+# query limit and the whole batch travels in one request, so stay well inside both
+D1_BATCH_MAX_STATEMENTS = 100
+D1_BATCH_MAX_BYTES = 1_000_000
+
+
+def _chunk_params(
+    query: str,
+    params_list: List[tuple],
+    max_statements: int = D1_BATCH_MAX_STATEMENTS,
+    max_bytes: int = D1_BATCH_MAX_BYTES,
+) -> List[tuple[int, List[tuple]]]:
+    """Split params_list into (offset, chunk) pieces within the statement and size caps."""
+    query_bytes = len(query.encode("utf-8"))
+    chunks: List[tuple[int, List[tuple]]] = []
+    current: List[tuple] = []
+    offset = 0
+    size = 0
+    for index, params in enumerate(params_list):
+        params_bytes = query_bytes + sum(len(str(value).encode("utf-8")) for value in params)
+        if current and (len(current) >= max_statements or size + params_bytes > max_bytes):
+            chunks.append((offset, current))
+            current, offset, size = [], index, 0
+        current.append(params)
+        size += params_bytes
+    if current:
+        chunks.append((offset, current))
+    return chunks
+
+
+_UNRESOLVED = object()
+# pyodide's JsProxy class and JS JSON object, or None outside Pyodide; resolved once
+_jsproxy_type: Any = _UNRESOLVED
+_js_json: Any = _UNRESOLVED
+
+
+def _get_jsproxy_type() -> Optional[type]:
+    global _jsproxy_type
+    if _jsproxy_type is _UNRESOLVED:
+        try:
+            from pyodide.ffi import JsProxy
+            _jsproxy_type = JsProxy
+        except ImportError:
+            _jsproxy_type = None
+    return _jsproxy_type
+
+
+def _is_jsproxy(obj: Any) -> bool:
+    jsproxy = _get_jsproxy_type()
+    return jsproxy is not None and isinstance(obj, jsproxy)
+
+
+def _get_js_json() -> Any:
+    global _js_json
+    if _js_json is _UNRESOLVED:
+        try:
+            from js import JSON
+            _js_json = JSON
+        except ImportError:
+            _js_json = None
+    return _js_json
+
 
 def _jsproxy_to_dict(obj: Any) -> Dict[str, Any]:
     """Convert a JsProxy object (from D1/Pyodide) to a Python dict.
@@ -41,54 +119,48 @@ def _jsproxy_to_dict(obj: Any) -> Dict[str, Any]:
     # JsProxy internal properties to exclude
     JS_PROXY_INTERNALS = {'js_id', 'typeof', '__class__', '__dict__', '__module__'}
     
-    # Check if it's a JsProxy (from pyodide.ffi)
-    try:
-        from pyodide.ffi import JsProxy
-        if isinstance(obj, JsProxy):
-            # JsProxy objects can be accessed like dicts, but we need to iterate
-            # over their keys to convert to Python dict
-            result = {}
-            # Try to get keys - JsProxy objects may have keys() method or be iterable
+    if _is_jsproxy(obj):
+        # JsProxy objects can be accessed like dicts, but we need to iterate
+        # over their keys to convert to Python dict
+        result = {}
+        # Try to get keys - JsProxy objects may have keys() method or be iterable
+        try:
+            # Try accessing as dict-like object
+            if hasattr(obj, 'keys'):
+                for key in obj.keys():
+                    key_str = str(key)
+                    # Skip JsProxy internal properties
+                    if key_str not in JS_PROXY_INTERNALS:
+                        result[key_str] = obj[key]
+            elif hasattr(obj, '__iter__'):
+                # If it's iterable, try to convert each item
+                for key in obj:
+                    key_str = str(key)
+                    if key_str not in JS_PROXY_INTERNALS:
+                        result[key_str] = obj[key]
+            else:
+                # Fallback: try to access common properties
+                # D1 results typically have column names as attributes
+                # Try to get all attributes
+                for attr in dir(obj):
+                    if not attr.startswith('_') and attr not in JS_PROXY_INTERNALS:
+                        try:
+                            value = getattr(obj, attr)
+                            # Skip methods
+                            if not callable(value):
+                                result[attr] = value
+                        except Exception:
+                            pass
+        except Exception as e:
+            logger.debug(f"Error converting JsProxy to dict: {e}")
+            # Last resort: try direct dict conversion
             try:
-                # Try accessing as dict-like object
-                if hasattr(obj, 'keys'):
-                    for key in obj.keys():
-                        key_str = str(key)
-                        # Skip JsProxy internal properties
-                        if key_str not in JS_PROXY_INTERNALS:
-                            result[key_str] = obj[key]
-                elif hasattr(obj, '__iter__'):
-                    # If it's iterable, try to convert each item
-                    for key in obj:
-                        key_str = str(key)
-                        if key_str not in JS_PROXY_INTERNALS:
-                            result[key_str] = obj[key]
-                else:
-                    # Fallback: try to access common properties
-                    # D1 results typically have column names as attributes
-                    # Try to get all attributes
-                    for attr in dir(obj):
-                        if not attr.startswith('_') and attr not in JS_PROXY_INTERNALS:
-                            try:
-                                value = getattr(obj, attr)
-                                # Skip methods
-                                if not callable(value):
-                                    result[attr] = value
-                            except Exception:
-                                pass
-            except Exception as e:
-                logger.debug(f"Error converting JsProxy to dict: {e}")
-                # Last resort: try direct dict conversion
-                try:
-                    converted = dict(obj)
-                    # Filter out internals
-                    return {k: v for k, v in converted.items() if k not in JS_PROXY_INTERNALS}
-                except Exception:
-                    return {}
-            return result
-    except ImportError:
-        # pyodide not available (e.g., in tests), try regular dict conversion
-        pass
+                converted = dict(obj)
+                # Filter out internals
+                return {k: v for k, v in converted.items() if k not in JS_PROXY_INTERNALS}
+            except Exception:
+                return {}
+        return result
     
     # Not a JsProxy or pyodide not available, try regular conversion
     if isinstance(obj, dict):
@@ -113,20 +185,16 @@ def _jsproxy_to_list(obj: Any) -> List[Any]:
         obj = obj.results
     
     # Check if it's a JsProxy array
-    try:
-        from pyodide.ffi import JsProxy
-        if isinstance(obj, JsProxy):
-            # Convert JsProxy array to Python list
+    if _is_jsproxy(obj):
+        # Convert JsProxy array to Python list
+        try:
+            return [_jsproxy_to_dict(item) if hasattr(item, 'keys') or _is_jsproxy(item) else item for item in obj]
+        except Exception:
+            # Fallback: try to convert directly
             try:
-                return [_jsproxy_to_dict(item) if hasattr(item, 'keys') or isinstance(item, JsProxy) else item for item in obj]
+                return list(obj)
             except Exception:
-                # Fallback: try to convert directly
-                try:
-                    return list(obj)
-                except Exception:
-                    return []
-    except ImportError:
-        pass
+                return []
     
     # Not a JsProxy, try regular conversion
     if isinstance(obj, list):
@@ -137,10 +205,38 @@ def _jsproxy_to_list(obj: Any) -> List[Any]:
         return []
 
 
+def _js_results_to_py(results: Any) -> Optional[List[Dict[str, Any]]]:
+    """Convert a whole D1 results array in one boundary crossing.
+    
+    to_py() converts the array and its plain-object rows in one call; older
+    runtimes that leave rows as JsProxy fall back to a single JSON round trip.
+    Returns None when neither works so the caller can convert row by row.
+    """
+    try:
+        converted = results.to_py()
+    except Exception:
+        converted = None
+    if isinstance(converted, list) and all(isinstance(row, dict) for row in converted):
+        return converted
+    js_json = _get_js_json()
+    if js_json is not None:
+        try:
+            return json.loads(js_json.stringify(results))
+        except Exception as e:
+            logger.debug(f"JSON conversion of D1 results failed: {e}")
+    return None
+
+
 def _rows_to_dicts(rows: Any) -> List[Dict[str, Any]]:
     """Normalize D1/SQLite list results into a list of plain dicts."""
     if not rows:
         return []
+    if hasattr(rows, 'results'):
+        rows = rows.results
+    if _is_jsproxy(rows):
+        converted = _js_results_to_py(rows)
+        if converted is not None:
+            return converted
     rows_list = _jsproxy_to_list(rows)
     return [_jsproxy_to_dict(row) for row in rows_list]
 
@@ -161,6 +257,14 @@ class Database:
         """
         self.db = db or settings.d1_database
         self._sqlite_path: Optional[str] = None
+        self._sqlite_pool: Optional[SQLiteConnectionPool] = None
+        self._statements = StatementCache()
+        # Write-behind queue for event rows; off unless enable_event_buffer() is called
+        self.event_buffer: Optional[EventWriteBuffer] = None
+        # Job and document context used to enrich pipeline events, keyed by id
+        ttl = settings.pipeline_event_cache_ttl_seconds
+        self._event_jobs = TTLCache(ttl, settings.pipeline_event_cache_size)
+        self._event_documents = TTLCache(ttl, settings.pipeline_event_cache_size)
         
         # Check if we have a D1 binding (Cloudflare Workers)
         is_d1 = self.db and hasattr(self.db, "prepare")
@@ -172,6 +276,13 @@ class Database:
                 # SQLite only allowed when explicitly set via LOCAL_SQLITE_PATH (for tests)
                 self._sqlite_path = sqlite_path
                 self._apply_sqlite_migrations()
+                self._sqlite_pool = SQLiteConnectionPool(
+                    sqlite_path,
+                    readers=settings.sqlite_pool_readers,
+                    synchronous=settings.sqlite_synchronous,
+                    mmap_size=settings.sqlite_mmap_size_mb * 1024 * 1024,
+                    cached_statements=self._statements.capacity,
+                )
             else:
                 raise DatabaseError(
                     "Database not configured: D1 binding required. "
@@ -199,13 +310,47 @@ class Database:
         except Exception as e:
             logger.warning(f"Applying migrations to SQLite failed: {e}")
 
-    def _get_sqlite_connection(self) -> sqlite3.Connection:
-        """Create a new short-lived SQLite connection for each operation."""
-        if not self._sqlite_path:
+    async def _run_sqlite(self, fn, *, write: bool = True):
+        """Run fn(connection) on the pooled writer, or on a reader for read-only work."""
+        if self._sqlite_pool is None:
             raise DatabaseError("Database not initialized")
-        conn = sqlite3.connect(self._sqlite_path, timeout=30, isolation_level='DEFERRED')
-        conn.row_factory = sqlite3.Row
-        return conn
+        return await self._sqlite_pool.run(fn, write=write)
+
+    def statement_stats(self, top: Optional[int] = 20) -> Dict[str, Any]:
+        """Prepared-statement cache counters and the slowest statements by total time."""
+        return self._statements.stats(top)
+
+    def enrichment_cache_stats(self) -> Dict[str, Any]:
+        """Hit rates of the pipeline-event job and document context caches."""
+        return {"jobs": self._event_jobs.stats(), "documents": self._event_documents.stats()}
+
+    def sqlite_pool_stats(self) -> Optional[Dict[str, Any]]:
+        """Connection pool utilization and wait times, or None on D1."""
+        return self._sqlite_pool.stats() if self._sqlite_pool else None
+
+    def enable_event_buffer(self, **options: Any) -> EventWriteBuffer:
+        """Route write_events() through a write-behind buffer (see EventWriteBuffer)."""
+        if self.event_buffer is None:
+            self.event_buffer = EventWriteBuffer(self.batch, **options)
+        return self.event_buffer
+
+    async def close_event_buffer(self) -> None:
+        """Flush any buffered event rows and go back to writing them inline."""
+        buffer, self.event_buffer = self.event_buffer, None
+        if buffer is not None:
+            await buffer.close()
+
+    async def write_events(self, statements: List[tuple[str, tuple]]) -> None:
+        """Write the statements for one event, via the write-behind buffer when enabled."""
+        if self.event_buffer is not None:
+            await self.event_buffer.add(statements)
+        else:
+            await self.batch(statements)
+
+    def close(self) -> None:
+        """Close pooled SQLite connections; a no-op on D1."""
+        if self._sqlite_pool is not None:
+            self._sqlite_pool.close()
 
     def _ensure_phase1_schema(self, conn: sqlite3.Connection) -> None:
         """Ensure Phase 1 schema: documents table and jobs new columns if missing.
@@ -456,7 +601,8 @@ class Database:
         if self.db and hasattr(self.db, "prepare"):
             # D1 path: execute DELETE and get affected rows from changes count
             try:
-                result = await self.db.prepare(query).bind(cutoff_param).run()
+                with self._statements.track(query):
+                    result = await self._statements.bind(self.db, query, (cutoff_param,)).run()
                 # D1's run() returns result with rows_written property indicating affected rows
                 if hasattr(result, 'meta') and hasattr(result.meta, 'rows_written'):
                     rows_written = result.meta.rows_written
@@ -466,19 +612,11 @@ class Database:
                 logger.error(f"Cleanup old step_invocations failed (D1): {e}")
                 return 0
         try:
-            def _delete_and_count():
-                conn = self._get_sqlite_connection()
-                try:
-                    cur = conn.cursor()
-                    cur.execute(query, (cutoff_param,))
-                    deleted = cur.rowcount if cur.rowcount is not None else 0
-                    # Commit if we're in a transaction (DML operations start transactions automatically)
-                    if conn.in_transaction:
-                        conn.commit()
-                    return deleted
-                finally:
-                    conn.close()
-            return await asyncio.to_thread(_delete_and_count)
+            def _delete_and_count(conn):
+                cur = conn.execute(query, (cutoff_param,))
+                return cur.rowcount if cur.rowcount is not None else 0
+            with self._statements.track(query):
+                return await self._run_sqlite(_delete_and_count)
         except Exception as e:
             logger.error(f"Cleanup old step_invocations failed: {e}")
             return 0
@@ -506,24 +644,17 @@ class Database:
         """Execute a query and return the first row (as dict-like)."""
         if self.db and hasattr(self.db, "prepare"):
             try:
-                return await self.db.prepare(query).bind(*params).first()
+                with self._statements.track(query):
+                    return await self._statements.bind(self.db, query, params).first()
             except Exception as e:
                 logger.error(f"Database query failed: {e}", exc_info=True)
                 raise DatabaseError(f"Database operation failed: {str(e)}")
         try:
-            def _exec_one():
-                conn = self._get_sqlite_connection()
-                try:
-                    cur = conn.execute(query, params)
-                    row = cur.fetchone()
-                    # Commit if we're in a transaction (DML operations start transactions automatically)
-                    if conn.in_transaction:
-                        conn.commit()
-                    return row
-                finally:
-                    conn.close()
-            row = await asyncio.to_thread(_exec_one)
-            return row
+            def _exec_one(conn):
+                # The writer commits DML (which opens a transaction) once this returns
+                return conn.execute(query, params).fetchone()
+            with self._statements.track(query):
+                return await self._run_sqlite(_exec_one, write=not is_read_query(query))
         except Exception as e:
             logger.error(f"SQLite query failed: {e}", exc_info=True)
             raise DatabaseError(f"Database operation failed: {str(e)}")
@@ -532,62 +663,95 @@ class Database:
         """Execute a query and return all rows."""
         if self.db and hasattr(self.db, "prepare"):
             try:
-                result = await self.db.prepare(query).bind(*params).all()
+                with self._statements.track(query):
+                    result = await self._statements.bind(self.db, query, params).all()
                 return result.results if hasattr(result, 'results') else result
             except Exception as e:
                 logger.error(f"Database query failed: {e}", exc_info=True)
                 raise DatabaseError(f"Database operation failed: {str(e)}")
         try:
-            def _exec_all():
-                conn = self._get_sqlite_connection()
-                try:
-                    cur = conn.execute(query, params)
-                    rows = cur.fetchall()
-                    return rows
-                finally:
-                    conn.close()
-            rows = await asyncio.to_thread(_exec_all)
-            return rows
+            def _exec_all(conn):
+                return conn.execute(query, params).fetchall()
+            with self._statements.track(query):
+                return await self._run_sqlite(_exec_all, write=not is_read_query(query))
         except Exception as e:
             logger.error(f"SQLite query-all failed: {e}", exc_info=True)
             raise DatabaseError(f"Database operation failed: {str(e)}")
     
-    async def execute_many(self, query: str, params_list: List[tuple]) -> Any:
-        """Execute a query multiple times with different parameters."""
+    async def execute_many(
+        self,
+        query: str,
+        params_list: List[tuple],
+        *,
+        chunk_size: int = D1_BATCH_MAX_STATEMENTS,
+        return_reports: bool = False,
+        stop_on_error: bool = True,
+    ) -> List[Any]:
+        """Execute a query once per parameter tuple.
+        
+        On D1 the tuples are sent through db.batch() in chunks of at most chunk_size
+        statements (and D1_BATCH_MAX_BYTES of SQL and parameters); each chunk is one
+        round trip and one transaction, but the call as a whole is not atomic: when a
+        chunk fails, the chunks before it stay committed. SQLite runs everything as a
+        single chunk in one transaction.
+        
+        By default returns the per-statement results and raises DatabaseError on the
+        first failed chunk. With return_reports the outcome of each chunk is returned
+        instead of raised, as {"offset", "count", "results", "error"}; stop_on_error
+        then decides whether the chunks after a failure are still attempted.
+        """
+        if not params_list:
+            return []
+        reports = await self._execute_many_chunks(
+            query, params_list, chunk_size, stop_on_error=stop_on_error or not return_reports
+        )
+        if return_reports:
+            return reports
+        failed = next((report for report in reports if report["error"]), None)
+        if failed is not None:
+            committed = f"; the first {failed['offset']} rows were committed" if failed["offset"] else ""
+            raise DatabaseError(f"Database operation failed: {failed['error']}{committed}")
+        return [result for report in reports for result in report["results"]]
+    
+    async def _execute_many_chunks(
+        self, query: str, params_list: List[tuple], chunk_size: int, *, stop_on_error: bool
+    ) -> List[Dict[str, Any]]:
+        reports: List[Dict[str, Any]] = []
         if self.db and hasattr(self.db, "prepare"):
-            try:
-                results = []
-                for params in params_list:
-                    result = await self.db.prepare(query).bind(*params).run()
-                    results.append(result)
-                return results
-            except Exception as e:
-                logger.error(f"Database batch operation failed: {e}", exc_info=True)
-                raise DatabaseError(f"Database operation failed: {str(e)}")
-        try:
-            def _exec_many():
-                conn = self._get_sqlite_connection()
+            max_statements = max(1, min(chunk_size, D1_BATCH_MAX_STATEMENTS))
+            for offset, chunk in _chunk_params(query, params_list, max_statements):
+                report: Dict[str, Any] = {"offset": offset, "count": len(chunk), "results": [], "error": None}
                 try:
-                    cur = conn.cursor()
-                    try:
-                        # Begin explicit transaction so the whole batch is atomic
-                        conn.execute("BEGIN")
-                        for params in params_list:
-                            cur.execute(query, params)
-                        conn.commit()
-                        return True
-                    except Exception:
-                        # Roll back entire batch on any error
-                        try:
-                            conn.rollback()
-                        finally:
-                            raise
-                finally:
-                    conn.close()
-            return await asyncio.to_thread(_exec_many)
+                    with self._statements.track(query):
+                        prepared = [self._statements.bind(self.db, query, params) for params in chunk]
+                        results = await self.db.batch(prepared)
+                    report["results"] = _jsproxy_to_list(results) if results is not None else []
+                except Exception as e:
+                    logger.error(
+                        f"D1 execute_many chunk failed: {e}",
+                        exc_info=True,
+                        extra={"offset": offset, "count": len(chunk)},
+                    )
+                    report["error"] = str(e)
+                reports.append(report)
+                if report["error"] and stop_on_error:
+                    break
+            return reports
+        report = {"offset": 0, "count": len(params_list), "results": [], "error": None}
+        try:
+            def _exec_many(conn):
+                # Begin explicit transaction so the whole batch is atomic; the
+                # pool rolls it back on any error
+                conn.execute("BEGIN")
+                rowcounts = [conn.execute(query, params).rowcount for params in params_list]
+                conn.commit()
+                return rowcounts
+            with self._statements.track(query):
+                report["results"] = await self._run_sqlite(_exec_many)
         except Exception as e:
             logger.error(f"SQLite batch operation failed: {e}", exc_info=True)
-            raise DatabaseError(f"Database operation failed: {str(e)}")
+            report["error"] = str(e)
+        return [report]
 
     async def batch(self, statements: List[tuple[str, tuple]]):
         """Execute multiple SQL statements atomically.
@@ -596,31 +760,20 @@ class Database:
         """
         if self.db and hasattr(self.db, "prepare") and hasattr(self.db, "batch"):
             try:
-                prepared = [self.db.prepare(sql).bind(*(params or ())) for sql, params in statements]
+                prepared = [self._statements.bind(self.db, sql, params or ()) for sql, params in statements]
                 return await self.db.batch(prepared)
             except Exception as e:
                 logger.error(f"D1 batch failed: {e}", exc_info=True)
                 raise DatabaseError(f"Database operation failed: {str(e)}")
         # SQLite fallback
         try:
-            def _exec_batch():
-                conn = self._get_sqlite_connection()
-                try:
-                    cur = conn.cursor()
-                    try:
-                        conn.execute("BEGIN")
-                        for sql, params in statements:
-                            cur.execute(sql, params or ())
-                        conn.commit()
-                        return True
-                    except Exception:
-                        try:
-                            conn.rollback()
-                        finally:
-                            raise
-                finally:
-                    conn.close()
-            return await asyncio.to_thread(_exec_batch)
+            def _exec_batch(conn):
+                conn.execute("BEGIN")
+                for sql, params in statements:
+                    conn.execute(sql, params or ())
+                conn.commit()
+                return True
+            return await self._run_sqlite(_exec_batch)
         except Exception as e:
             logger.error(f"SQLite exec batch failed: {e}", exc_info=True)
             raise DatabaseError(f"Database operation failed: {str(e)}")
@@ -1037,10 +1190,7 @@ async def list_google_tokens(db: Database, user_id: str) -> List[Dict[str, Any]]
     tokens: List[Dict[str, Any]] = []
     if not rows:
         return tokens
-    # Convert JsProxy results to Python list
-    rows_list = _jsproxy_to_list(rows)
-    for row in rows_list:
-        tokens.append(_jsproxy_to_dict(row))
+    tokens.extend(_rows_to_dicts(rows))
     return tokens
 
 
@@ -1193,6 +1343,7 @@ async def update_job_status(
     params.append(job_id)
     query = f"UPDATE jobs SET {', '.join(updates)} WHERE job_id = ?"
     await db.execute(query, tuple(params))
+    db._event_jobs.invalidate(job_id)
 
 
 async def set_job_output(db: Database, job_id: str, output: Dict[str, Any]) -> None:
@@ -1228,6 +1379,53 @@ async def reset_job_retry_state(db: Database, job_id: str) -> None:
     )
 
 
+def _job_filters(user_id: str, status: Optional[str], session_id: Optional[str]) -> tuple[str, List[Any]]:
+    where_clause = "WHERE user_id = ?"
+    params: List[Any] = [user_id]
+    if status:
+        where_clause += " AND status = ?"
+        params.append(status)
+    if session_id:
+        where_clause += " AND session_id = ?"
+        params.append(session_id)
+    return where_clause, params
+
+
+def encode_job_cursor(job: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past job in (created_at DESC, job_id DESC) order."""
+    raw = json.dumps([job.get("created_at"), job.get("job_id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_job_cursor(cursor: str) -> tuple[str, str]:
+    """Return (created_at, job_id) from a cursor; ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, job_id = json.loads(raw)
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise ValueError("Invalid job cursor") from exc
+    if not isinstance(created_at, str) or not isinstance(job_id, str):
+        raise ValueError("Invalid job cursor")
+    return created_at, job_id
+
+
+async def count_jobs(
+    db: Database,
+    user_id: str,
+    status: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> int:
+    """Exact number of a user's jobs matching the filters."""
+    if session_id is None and (status is None or status in JOB_STATS_STATUSES):
+        # Served by the job_stats counters without touching jobs
+        return (await get_job_stats(db, user_id))[status or "total"]
+    where_clause, params = _job_filters(user_id, status, session_id)
+    count_result = await db.execute(f"SELECT COUNT(*) as total FROM jobs {where_clause}", tuple(params))
+    if not count_result:
+        return 0
+    return _jsproxy_to_dict(count_result).get("total", 0) or 0
+
+
 async def list_jobs(
     db: Database,
     user_id: str,
@@ -1236,32 +1434,19 @@ async def list_jobs(
     status: Optional[str] = None,
     session_id: Optional[str] = None,
 ) -> tuple[List[Dict[str, Any]], int]:
-    """List jobs for a user with pagination."""
-    offset = (page - 1) * page_size
-    where_clause = "WHERE user_id = ?"
-    params = [user_id]
-    
-    if status:
-        where_clause += " AND status = ?"
-        params.append(status)
-    if session_id:
-        where_clause += " AND session_id = ?"
-        params.append(session_id)
+    """List jobs for a user with offset pagination and an exact total.
     
-    # Get total count
-    count_query = f"SELECT COUNT(*) as total FROM jobs {where_clause}"
-    count_result = await db.execute(count_query, tuple(params))
-    if count_result:
-        count_dict = _jsproxy_to_dict(count_result)
-        total = count_dict.get("total", 0)
-    else:
-        total = 0
+    Deep pages scan and discard every earlier row; prefer list_jobs_page.
+    """
+    offset = (page - 1) * page_size
+    where_clause, params = _job_filters(user_id, status, session_id)
+    total = await count_jobs(db, user_id, status, session_id)
     
     # Get jobs
     query = f"""
         SELECT * FROM jobs
         {where_clause}
-        ORDER BY created_at DESC
+        ORDER BY created_at DESC, job_id DESC
         LIMIT ? OFFSET ?
     """
     params.extend([page_size, offset])
@@ -1271,48 +1456,106 @@ async def list_jobs(
     return jobs, total
 
 
+async def list_jobs_page(
+    db: Database,
+    user_id: str,
+    *,
+    cursor: Optional[str] = None,
+    page_size: int = 20,
+    status: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """List a user's jobs newest first with keyset pagination.
+    
+    Returns (jobs, next_cursor); next_cursor is None on the last page. Each page
+    is an index range scan on (user_id, created_at, job_id) however deep it is.
+    Raises ValueError for a malformed cursor.
+    """
+    where_clause, params = _job_filters(user_id, status, session_id)
+    if cursor:
+        created_at, job_id = decode_job_cursor(cursor)
+        where_clause += " AND (created_at, job_id) < (?, ?)"
+        params.extend([created_at, job_id])
+    query = f"""
+        SELECT * FROM jobs
+        {where_clause}
+        ORDER BY created_at DESC, job_id DESC
+        LIMIT ?
+    """
+    # One extra row tells whether another page exists without counting
+    params.append(page_size + 1)
+    jobs = _rows_to_dicts(await db.execute_all(query, tuple(params)))
+    if len(jobs) <= page_size:
+        return jobs, None
+    jobs = jobs[:page_size]
+    return jobs, encode_job_cursor(jobs[-1])
+
+
 async def get_job_stats(db: Database, user_id: Optional[str] = None) -> Dict[str, int]:
-    """Get job statistics."""
+    """Get job counts by status from the job_stats counters.
+    
+    A user's stats are one primary-key lookup; the global stats sum one row per
+    user rather than scanning jobs.
+    """
+    columns = ("total",) + JOB_STATS_STATUSES
     if user_id:
-        query = f"""
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = '{JobStatusEnum.COMPLETED.value}' THEN 1 ELSE 0 END) as completed,
-                SUM(CASE WHEN status = '{JobStatusEnum.FAILED.value}' THEN 1 ELSE 0 END) as failed,
-                SUM(CASE WHEN status = '{JobStatusEnum.PENDING.value}' THEN 1 ELSE 0 END) as pending,
-                SUM(CASE WHEN status = '{JobStatusEnum.PROCESSING.value}' THEN 1 ELSE 0 END) as processing
-            FROM jobs
-            WHERE user_id = ?
-        """
+        query = f"SELECT {', '.join(columns)} FROM job_stats WHERE user_id = ?"
         result = await db.execute(query, (user_id,))
     else:
-        query = f"""
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = '{JobStatusEnum.COMPLETED.value}' THEN 1 ELSE 0 END) as completed,
-                SUM(CASE WHEN status = '{JobStatusEnum.FAILED.value}' THEN 1 ELSE 0 END) as failed,
-                SUM(CASE WHEN status = '{JobStatusEnum.PENDING.value}' THEN 1 ELSE 0 END) as pending,
-                SUM(CASE WHEN status = '{JobStatusEnum.PROCESSING.value}' THEN 1 ELSE 0 END) as processing
-            FROM jobs
-        """
-        result = await db.execute(query, ())
+        sums = ", ".join(f"SUM({column}) as {column}" for column in columns)
+        result = await db.execute(f"SELECT {sums} FROM job_stats", ())
+    stats = _jsproxy_to_dict(result) if result else {}
+    return {column: stats.get(column, 0) or 0 for column in columns}
+
+
+async def reconcile_job_stats(db: Database, user_id: Optional[str] = None) -> Dict[str, int]:
+    """Recount jobs by status and repair job_stats rows that have drifted.
     
-    if not result:
-        return {
-            "total": 0,
-            "completed": 0,
-            "failed": 0,
-            "pending": 0,
-            "processing": 0,
-        }
-    stats = _jsproxy_to_dict(result)
-    return {
-        "total": stats.get("total", 0) or 0,
-        "completed": stats.get("completed", 0) or 0,
-        "failed": stats.get("failed", 0) or 0,
-        "pending": stats.get("pending", 0) or 0,
-        "processing": stats.get("processing", 0) or 0,
-    }
+    The triggers on jobs keep the counters exact; this catches rows written
+    before the triggers existed or changed outside them. Each repair recomputes
+    the row from jobs in a single statement, so concurrent job writes cannot
+    leave it half-updated. Returns how many users were checked and repaired.
+    """
+    columns = ("total",) + JOB_STATS_STATUSES
+    where_clause, params = ("WHERE user_id = ?", (user_id,)) if user_id else ("", ())
+    counts = ", ".join(f"SUM(status = '{status}') as {status}" for status in JOB_STATS_STATUSES)
+    actual_rows = _rows_to_dicts(await db.execute_all(
+        f"SELECT user_id, COUNT(*) as total, {counts} FROM jobs {where_clause} GROUP BY user_id",
+        params,
+    ))
+    stored_rows = _rows_to_dicts(await db.execute_all(
+        f"SELECT user_id, {', '.join(columns)} FROM job_stats {where_clause}",
+        params,
+    ))
+    actual = {row["user_id"]: row for row in actual_rows}
+    stored = {row["user_id"]: row for row in stored_rows}
+    
+    drifted = [
+        uid for uid in set(actual) | set(stored)
+        if any(
+            (actual.get(uid, {}).get(column) or 0) != (stored.get(uid, {}).get(column) or 0)
+            for column in columns
+        )
+    ]
+    if drifted:
+        recount = ",\n".join(
+            [f"total = (SELECT COUNT(*) FROM jobs WHERE jobs.user_id = job_stats.user_id)"]
+            + [
+                f"{status} = (SELECT COUNT(*) FROM jobs WHERE jobs.user_id = job_stats.user_id AND status = '{status}')"
+                for status in JOB_STATS_STATUSES
+            ]
+        )
+        repair_sql = f"UPDATE job_stats SET {recount}, updated_at = datetime('now') WHERE user_id = ?"
+        statements: List[tuple[str, tuple]] = []
+        for uid in drifted:
+            statements.append(("INSERT OR IGNORE INTO job_stats (user_id) VALUES (?)", (uid,)))
+            statements.append((repair_sql, (uid,)))
+        await db.batch(statements)
+        logger.warning(
+            "job_stats.drift_repaired",
+            extra={"users": len(drifted), "sample_user_ids": sorted(drifted)[:10]},
+        )
+    return {"checked": len(set(actual) | set(stored)), "repaired": len(drifted)}
 
 async def get_pending_jobs(
     db: Database,
@@ -1565,10 +1808,7 @@ async def list_documents(
     )
     if not rows:
         return [], total
-    # Convert JsProxy results to Python list
-    rows_list = _jsproxy_to_list(rows)
-    docs = [_jsproxy_to_dict(row) for row in rows_list]
-    return docs, total
+    return _rows_to_dicts(rows), total
 
 
 async def get_drive_workspace(db: Database, user_id: str) -> Optional[Dict[str, Any]]:
@@ -1701,9 +1941,7 @@ async def list_drive_watches_for_user(db: Database, user_id: str) -> List[Dict[s
     )
     if not rows:
         return []
-    # Convert JsProxy results to Python list
-    rows_list = _jsproxy_to_list(rows)
-    return [_jsproxy_to_dict(row) for row in rows_list]
+    return _rows_to_dicts(rows)
 
 
 async def list_drive_watches_expiring(
@@ -1739,9 +1977,7 @@ async def list_drive_watches_expiring(
         )
     if not rows:
         return []
-    # Convert JsProxy results to Python list
-    rows_list = _jsproxy_to_list(rows)
-    return [_jsproxy_to_dict(row) for row in rows_list]
+    return _rows_to_dicts(rows)
 
 
 async def update_drive_watch_fields(
@@ -1889,6 +2125,7 @@ async def update_document(
     params.append(document_id)
     query = f"UPDATE documents SET {', '.join(fields)} WHERE document_id = ?"
     await db.execute(query, tuple(params))
+    db._event_documents.invalidate(document_id)
 
 
 def _is_unique_constraint_violation(error: Exception) -> bool:
@@ -2345,6 +2582,7 @@ async def ensure_full_schema(db: Database) -> None:
         ("CREATE INDEX IF NOT EXISTS idx_jobs_job_type ON jobs(job_type)", ()),
         ("CREATE INDEX IF NOT EXISTS idx_jobs_document_id ON jobs(document_id)", ()),
         ("CREATE INDEX IF NOT EXISTS idx_jobs_session_id ON jobs(session_id)", ()),
+        ("CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at DESC, job_id DESC)", ()),
     ]
     
     # Jobs triggers
@@ -2373,6 +2611,101 @@ async def ensure_full_schema(db: Database) -> None:
         ),
     ]
     
+    # Per-user job counters, maintained by triggers on jobs
+    job_stats_tables = [
+        (
+            """
+            CREATE TABLE IF NOT EXISTS job_stats (
+                user_id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL DEFAULT 0,
+                pending INTEGER NOT NULL DEFAULT 0,
+                processing INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                cancelled INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+            """,
+            (),
+        ),
+    ]
+    
+    job_stats_triggers = [
+        (
+            """
+            CREATE TRIGGER IF NOT EXISTS job_stats_after_insert
+            AFTER INSERT ON jobs
+            BEGIN
+                INSERT INTO job_stats (user_id, total, pending, processing, completed, failed, cancelled)
+                VALUES (
+                    NEW.user_id, 1,
+                    NEW.status = 'pending', NEW.status = 'processing', NEW.status = 'completed',
+                    NEW.status = 'failed', NEW.status = 'cancelled'
+                )
+                ON CONFLICT(user_id) DO UPDATE SET
+                    total = total + 1,
+                    pending = pending + excluded.pending,
+                    processing = processing + excluded.processing,
+                    completed = completed + excluded.completed,
+                    failed = failed + excluded.failed,
+                    cancelled = cancelled + excluded.cancelled,
+                    updated_at = datetime('now');
+            END
+            """,
+            (),
+        ),
+        (
+            """
+            CREATE TRIGGER IF NOT EXISTS job_stats_after_status_update
+            AFTER UPDATE OF status ON jobs
+            WHEN OLD.status IS NOT NEW.status
+            BEGIN
+                UPDATE job_stats SET
+                    pending = pending - (OLD.status = 'pending') + (NEW.status = 'pending'),
+                    processing = processing - (OLD.status = 'processing') + (NEW.status = 'processing'),
+                    completed = completed - (OLD.status = 'completed') + (NEW.status = 'completed'),
+                    failed = failed - (OLD.status = 'failed') + (NEW.status = 'failed'),
+                    cancelled = cancelled - (OLD.status = 'cancelled') + (NEW.status = 'cancelled'),
+                    updated_at = datetime('now')
+                WHERE user_id = NEW.user_id;
+            END
+            """,
+            (),
+        ),
+        (
+            """
+            CREATE TRIGGER IF NOT EXISTS job_stats_after_delete
+            AFTER DELETE ON jobs
+            BEGIN
+                UPDATE job_stats SET
+                    total = total - 1,
+                    pending = pending - (OLD.status = 'pending'),
+                    processing = processing - (OLD.status = 'processing'),
+                    completed = completed - (OLD.status = 'completed'),
+                    failed = failed - (OLD.status = 'failed'),
+                    cancelled = cancelled - (OLD.status = 'cancelled'),
+                    updated_at = datetime('now')
+                WHERE user_id = OLD.user_id;
+            END
+            """,
+            (),
+        ),
+        # Seed counters for jobs that predate the table (only while it is still empty)
+        (
+            """
+            INSERT OR IGNORE INTO job_stats (user_id, total, pending, processing, completed, failed, cancelled)
+            SELECT user_id, COUNT(*),
+                SUM(status = 'pending'), SUM(status = 'processing'), SUM(status = 'completed'),
+                SUM(status = 'failed'), SUM(status = 'cancelled')
+            FROM jobs
+            WHERE NOT EXISTS (SELECT 1 FROM job_stats)
+            GROUP BY user_id
+            """,
+            (),
+        ),
+    ]
+    
     # Google integration tokens
     google_tokens_tables = [
         (
@@ -2718,6 +3051,25 @@ async def ensure_full_schema(db: Database) -> None:
         ("CREATE INDEX IF NOT EXISTS idx_usage_events_job ON usage_events(job_id, created_at DESC)", ()),
     ]
     
+    # Usage rollups, maintained by record_usage_event
+    usage_rollups_tables = [
+        (
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                user_id TEXT NOT NULL,
+                bucket_start TEXT NOT NULL,
+                events INTEGER NOT NULL DEFAULT 0,
+                bytes_downloaded INTEGER NOT NULL DEFAULT 0,
+                duration_s REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, bucket_start),
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+            """,
+            (),
+        )
+        for table, _ in USAGE_ROLLUPS
+    ]
+    
     # Step invocations
     step_invocations_tables = [
         (
@@ -2768,6 +3120,10 @@ async def ensure_full_schema(db: Database) -> None:
         await db.batch(jobs_triggers)
         logger.info("Applied jobs table and triggers")
         
+        await db.batch(job_stats_tables)
+        await db.batch(job_stats_triggers)
+        logger.info("Applied job_stats table and triggers")
+        
         await db.batch(pipeline_events_tables)
         # Legacy datasets might predate the session_id column; add it only if missing
         if not await _table_has_column(db, "pipeline_events", "session_id"):
@@ -2800,6 +3156,9 @@ async def ensure_full_schema(db: Database) -> None:
         await db.batch(usage_events_tables)
         logger.info("Applied usage_events table")
         
+        await db.batch(usage_rollups_tables)
+        logger.info("Applied usage rollup tables")
+        
         await db.batch(step_invocations_tables)
         logger.info("Applied step_invocations table")
         
@@ -2830,47 +3189,76 @@ async def list_usage_events(
     return _rows_to_dicts(rows)
 
 
+def _usage_metric_totals(metrics: Any) -> tuple[int, float]:
+    """bytes_downloaded and duration_s from a usage event's metrics (dict or JSON string)."""
+    if isinstance(metrics, str):
+        try:
+            metrics = json.loads(metrics)
+        except Exception:
+            return 0, 0.0
+    if not isinstance(metrics, dict):
+        return 0, 0.0
+    b = metrics.get("bytes_downloaded")
+    d = metrics.get("duration_s")
+    return (
+        b if isinstance(b, int) else 0,
+        float(d) if isinstance(d, (int, float)) else 0.0,
+    )
+
+
 async def get_usage_summary(
     db: Database,
     user_id: str,
     window_days: int = 7,
 ) -> Dict[str, Any]:
-    """Aggregate a simple summary for a user's usage over the given window (days)."""
-    # Aggregate bytes_downloaded, duration_s, events count
-    # metrics stored as JSON; extract fields with JSON functions where possible, else sum in Python
-    rows = await db.execute_all(
+    """Aggregate a simple summary for a user's usage over the given window (days).
+    
+    Whole hours and days come from the rollup tables; only the events between the
+    window start and the next hour boundary are read (and their metrics parsed) raw.
+    The current hour and day need no raw read because their rollups are written
+    together with each event.
+    """
+    window_start = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0) - timedelta(days=int(window_days))
+    hour_edge = window_start.replace(minute=0, second=0)
+    if hour_edge < window_start:
+        hour_edge += timedelta(hours=1)
+    day_edge = hour_edge.replace(hour=0)
+    if day_edge < hour_edge:
+        day_edge += timedelta(days=1)
+    hour_edge_s = hour_edge.strftime(_SQL_TIMESTAMP_FORMAT)
+    day_edge_s = day_edge.strftime(_SQL_TIMESTAMP_FORMAT)
+
+    rollup = await db.execute(
         """
-        SELECT metrics, event_type
-        FROM usage_events
-        WHERE user_id = ? AND created_at >= datetime('now', ?)
+        SELECT SUM(events) AS events, SUM(bytes_downloaded) AS bytes_downloaded, SUM(duration_s) AS duration_s
+        FROM (
+            SELECT events, bytes_downloaded, duration_s FROM usage_rollups_daily
+            WHERE user_id = ? AND bucket_start >= ?
+            UNION ALL
+            SELECT events, bytes_downloaded, duration_s FROM usage_rollups_hourly
+            WHERE user_id = ? AND bucket_start >= ? AND bucket_start < ?
+        )
         """,
-        (user_id, f"-{int(window_days)} days"),
+        (user_id, day_edge_s, user_id, hour_edge_s, day_edge_s),
     )
-    row_dicts = _rows_to_dicts(rows)
-    total_events = 0
-    total_bytes = 0
-    total_duration = 0.0
-    for r in row_dicts:
+    totals = _jsproxy_to_dict(rollup) if rollup else {}
+    total_events = totals.get("events") or 0
+    total_bytes = totals.get("bytes_downloaded") or 0
+    total_duration = float(totals.get("duration_s") or 0.0)
+
+    edge_rows = _rows_to_dicts(await db.execute_all(
+        """
+        SELECT metrics
+        FROM usage_events
+        WHERE user_id = ? AND created_at >= ? AND created_at < ?
+        """,
+        (user_id, window_start.strftime(_SQL_TIMESTAMP_FORMAT), hour_edge_s),
+    ))
+    for r in edge_rows:
         total_events += 1
-        try:
-            metrics_raw = None
-            metrics_raw = r.get("metrics")
-            # Parse JSON if needed
-            m = metrics_raw
-            if isinstance(m, str):
-                try:
-                    m = json.loads(m)
-                except Exception:
-                    m = None
-            if isinstance(m, dict):
-                b = m.get("bytes_downloaded")
-                if isinstance(b, int):
-                    total_bytes += b
-                d = m.get("duration_s")
-                if isinstance(d, (int, float)):
-                    total_duration += float(d)
-        except Exception:
-            continue
+        b, d = _usage_metric_totals(r.get("metrics"))
+        total_bytes += b
+        total_duration += d
     return {
         "window_days": int(window_days),
         "events": total_events,
@@ -2880,6 +3268,45 @@ async def get_usage_summary(
     }
 
 
+async def backfill_usage_rollups(db: Database, user_id: Optional[str] = None) -> Dict[str, int]:
+    """Rebuild the usage rollup tables from usage_events, for one user or everyone.
+    
+    Needed once for events recorded before the rollups existed, and safe to re-run:
+    each table's rows are deleted and recomputed in one atomic batch. Returns the
+    number of buckets written per table.
+    """
+    def _json_number(field: str, types: str) -> str:
+        return (
+            f"CASE WHEN json_valid(metrics) THEN "
+            f"(CASE WHEN json_type(metrics, '$.{field}') IN ({types}) THEN json_extract(metrics, '$.{field}') ELSE 0 END) "
+            f"ELSE 0 END"
+        )
+
+    where_clause, params = ("WHERE user_id = ?", (user_id,)) if user_id else ("WHERE 1 = 1", ())
+    statements: List[tuple[str, tuple]] = []
+    for table, bucket_format in USAGE_ROLLUPS:
+        statements.append((f"DELETE FROM {table} {where_clause}", params))
+        statements.append((
+            f"""
+            INSERT INTO {table} (user_id, bucket_start, events, bytes_downloaded, duration_s)
+            SELECT user_id, strftime('{bucket_format}', created_at), COUNT(*),
+                SUM({_json_number("bytes_downloaded", "'integer'")}),
+                SUM({_json_number("duration_s", "'integer', 'real'")})
+            FROM usage_events
+            {where_clause}
+            GROUP BY user_id, strftime('{bucket_format}', created_at)
+            """,
+            params,
+        ))
+    await db.batch(statements)
+
+    buckets: Dict[str, int] = {}
+    for table, _ in USAGE_ROLLUPS:
+        row = await db.execute(f"SELECT COUNT(*) AS cnt FROM {table} {where_clause}", params)
+        buckets[table] = (_jsproxy_to_dict(row).get("cnt") if row else 0) or 0
+    return buckets
+
+
 async def count_usage_events(db: Database, user_id: str) -> int:
     """Return total number of usage events for a user."""
     # Use db.execute (single-row) and adapt to various return shapes
@@ -3146,31 +3573,34 @@ def _extract_drive_web_link(drive_block: Dict[str, Any]) -> Optional[str]:
     return drive_block.get("web_view_link")
 
 
-async def _enrich_pipeline_event_payload(
-    db: Database,
-    user_id: str,
-    job_row: Optional[Dict[str, Any]],
-    data: Optional[Dict[str, Any]],
-) -> Dict[str, Any]:
-    enriched: Dict[str, Any] = dict(data or {})
-    document_id = enriched.get("document_id")
-    if not document_id and job_row:
-        doc_candidate = job_row.get("document_id")
-        if doc_candidate:
-            document_id = doc_candidate
-            enriched["document_id"] = doc_candidate
-    if job_row and job_row.get("job_type"):
-        enriched.setdefault("job_type", job_row.get("job_type"))
-    if job_row and job_row.get("session_id"):
-        enriched.setdefault("session_id", job_row.get("session_id"))
-    if not document_id:
-        return enriched
+async def _pipeline_event_job_context(db: Database, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """The job fields pipeline events are enriched with, cached per job."""
+    cached = db._event_jobs.get(job_id)
+    if cached is not None and cached["user_id"] == user_id:
+        return cached
+    try:
+        job_row = await get_job(db, job_id, user_id=user_id)
+    except Exception:
+        return None
+    if not job_row:
+        return None
+    context = {key: job_row.get(key) for key in ("user_id", "document_id", "job_type", "session_id")}
+    db._event_jobs.set(job_id, context)
+    return context
+
+
+async def _pipeline_event_document_context(db: Database, document_id: str, user_id: str) -> Dict[str, Any]:
+    """Title, slug and Drive fields for a document, parsed once and cached per document."""
+    cached = db._event_documents.get(document_id)
+    if cached is not None and cached[0] == user_id:
+        return cached[1]
     try:
         document = await get_document(db, document_id, user_id=user_id)
     except Exception:
         document = None
     if not document:
-        return enriched
+        return {}
+    context: Dict[str, Any] = {}
     metadata = _dict_from_json_field(document.get("metadata"))
     frontmatter = _dict_from_json_field(document.get("frontmatter"))
     title = (
@@ -3180,20 +3610,45 @@ async def _enrich_pipeline_event_payload(
         or document_id
     )
     if title:
-        enriched.setdefault("document_title", title)
+        context["document_title"] = title
     slug = frontmatter.get("slug") or metadata.get("slug")
     if slug:
-        enriched.setdefault("document_slug", slug)
+        context["document_slug"] = slug
     drive_block = metadata.get("drive") if isinstance(metadata.get("drive"), dict) else {}
     drive_file_id = document.get("drive_file_id") or drive_block.get("file_id")
     if drive_file_id:
-        enriched.setdefault("drive_file_id", drive_file_id)
+        context["drive_file_id"] = drive_file_id
     folder_id = document.get("drive_folder_id") or drive_block.get("folder_id")
     if folder_id:
-        enriched.setdefault("drive_folder_id", folder_id)
+        context["drive_folder_id"] = folder_id
     web_link = _extract_drive_web_link(drive_block)
     if web_link:
-        enriched.setdefault("drive_web_view_link", web_link)
+        context["drive_web_view_link"] = web_link
+    db._event_documents.set(document_id, (user_id, context))
+    return context
+
+
+async def _enrich_pipeline_event_payload(
+    db: Database,
+    user_id: str,
+    job_row: Optional[Dict[str, Any]],
+    data: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    enriched: Dict[str, Any] = dict(data or {})
+    document_id = enriched.get("document_id")
+    if not document_id and job_row:
+        doc_candidate = job_row.get("document_id")
+        if doc_candidate:
+            document_id = doc_candidate
+            enriched["document_id"] = doc_candidate
+    if job_row and job_row.get("job_type"):
+        enriched.setdefault("job_type", job_row.get("job_type"))
+    if job_row and job_row.get("session_id"):
+        enriched.setdefault("session_id", job_row.get("session_id"))
+    if not document_id:
+        return enriched
+    for key, value in (await _pipeline_event_document_context(db, document_id, user_id)).items():
+        enriched.setdefault(key, value)
     return enriched
 
 
@@ -3213,20 +3668,17 @@ async def record_pipeline_event(
     session_id: Optional[str] = None,
 ) -> None:
     event_id = str(uuid.uuid4())
-    job_row = None
-    if job_id:
-        try:
-            job_row = await get_job(db, job_id, user_id=user_id)
-        except Exception:
-            job_row = None
+    job_row = await _pipeline_event_job_context(db, job_id, user_id) if job_id else None
     payload_dict = await _enrich_pipeline_event_payload(db, user_id, job_row, data)
     payload = json.dumps(payload_dict)
     session_value = session_id
     if session_value is None and job_row:
         session_value = job_row.get("session_id")
-    await db.execute(
+    # Timestamp taken now, not at insert time, since the write may be buffered
+    created_at = datetime.now(timezone.utc).strftime(_SQL_TIMESTAMP_FORMAT)
+    await db.write_events([(
         "INSERT INTO pipeline_events (event_id, user_id, job_id, session_id, event_type, stage, status, message, data, created_at) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
         (
             event_id,
             user_id,
@@ -3237,8 +3689,9 @@ async def record_pipeline_event(
             status,
             message,
             payload,
+            created_at,
         ),
-    )
+    )])
     # Removed: Notification creation - notifications feature removed
 
 
@@ -3295,17 +3748,36 @@ async def record_usage_event(
     event_type: str,
     metrics: Dict[str, Any] | None = None,
 ) -> None:
-    """Record a usage event with metrics JSON."""
-    await db.execute(
-        "INSERT INTO usage_events (id, user_id, job_id, event_type, metrics, created_at) VALUES (?, ?, ?, ?, ?, datetime('now'))",
+    """Record a usage event with metrics JSON and add it to the hourly and daily rollups."""
+    now = datetime.now(timezone.utc)
+    created_at = now.strftime(_SQL_TIMESTAMP_FORMAT)
+    bytes_downloaded, duration_s = _usage_metric_totals(metrics or {})
+    statements: List[tuple[str, tuple]] = [
         (
-            f"{job_id}:{event_type}:{datetime.now(timezone.utc).isoformat()}:{uuid.uuid4()}",
-            user_id,
-            job_id,
-            event_type,
-            json.dumps(metrics or {}),
-        ),
-    )
+            "INSERT INTO usage_events (id, user_id, job_id, event_type, metrics, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                f"{job_id}:{event_type}:{now.isoformat()}:{uuid.uuid4()}",
+                user_id,
+                job_id,
+                event_type,
+                json.dumps(metrics or {}),
+                created_at,
+            ),
+        )
+    ]
+    for table, bucket_format in USAGE_ROLLUPS:
+        statements.append((
+            f"""
+            INSERT INTO {table} (user_id, bucket_start, events, bytes_downloaded, duration_s)
+            VALUES (?, ?, 1, ?, ?)
+            ON CONFLICT(user_id, bucket_start) DO UPDATE SET
+                events = events + 1,
+                bytes_downloaded = bytes_downloaded + excluded.bytes_downloaded,
+                duration_s = duration_s + excluded.duration_s
+            """,
+            (user_id, now.strftime(bucket_format), bytes_downloaded, duration_s),
+        ))
+    await db.write_events(statements)
     
 
 async def create_project(db: Database, user_id: str, document_id: str, youtube_url: str, title: str | None = None) -> Dict[str, Any]:
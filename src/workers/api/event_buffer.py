@@ -0,0 +1,141 @@
+"""Write-behind buffering for append-only event rows (pipeline_events, usage_events).
+
+Callers hand over the statements for one event and return immediately; a
+background task writes everything queued through Database.batch once
+max_batch events are waiting or flush_interval has passed. Events are written
+strictly in the order they were added, one flush at a time, so the sequence of
+events for any job is preserved.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Statements = List[tuple]
+
+# Shortest timed flush; a zero timeout would turn the flusher into a busy loop
+MIN_FLUSH_INTERVAL = 0.01
+
+
+class EventWriteBuffer:
+    """Queue of event statement groups flushed in batches by size or time."""
+
+    def __init__(
+        self,
+        write_batch: Callable[[Statements], Awaitable[Any]],
+        *,
+        max_batch: int = 50,
+        flush_interval: float = 0.25,
+        max_pending: int = 1000,
+    ) -> None:
+        self._write_batch = write_batch
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = max(MIN_FLUSH_INTERVAL, flush_interval)
+        self.max_pending = max(self.max_batch, max_pending)
+        self._pending: Deque[Statements] = deque()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.max_pending_seen = 0
+
+    def _ensure_started(self) -> None:
+        # Created lazily so the primitives bind to the loop that actually uses them
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._run())
+
+    async def add(self, statements: Statements) -> None:
+        """Queue the statements for one event; they are written together, in order."""
+        if self._closed:
+            raise RuntimeError("Event write buffer is closed")
+        self._ensure_started()
+        while len(self._pending) >= self.max_pending:
+            # Backpressure: the producer pays for a flush instead of growing the queue
+            self.backpressure_waits += 1
+            await self.flush()
+        self._pending.append(list(statements))
+        self.max_pending_seen = max(self.max_pending_seen, len(self._pending))
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything queued so far."""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._pending:
+                count = min(self.max_batch, len(self._pending))
+                groups = [self._pending[index] for index in range(count)]
+                await self._write_groups(groups)
+                # Dequeue only once written, so a cancelled flush leaves its events queued
+                for _ in range(count):
+                    self._pending.popleft()
+
+    async def _write_groups(self, groups: List[Statements]) -> None:
+        self.flushes += 1
+        try:
+            await self._write_batch([statement for group in groups for statement in group])
+            self.written += len(groups)
+            return
+        except Exception as exc:
+            if len(groups) == 1:
+                self.dropped += 1
+                logger.error("event_buffer.write_failed", exc_info=True, extra={"error": str(exc)})
+                return
+            logger.warning(
+                "event_buffer.batch_failed_retrying_individually",
+                extra={"events": len(groups), "error": str(exc)},
+            )
+        # A batch is atomic, so one bad event fails all of them; isolate it and keep the rest
+        for group in groups:
+            try:
+                await self._write_batch(group)
+                self.written += 1
+            except Exception as exc:
+                self.dropped += 1
+                logger.error("event_buffer.write_failed", exc_info=True, extra={"error": str(exc)})
+
+    async def close(self) -> None:
+        """Stop the background flusher and write whatever is still queued."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None and not self._flusher.done():
+            # Let an in-progress flush finish rather than cancelling it mid-write
+            self._wake.set()
+            await self._flusher
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "max_pending_seen": self.max_pending_seen,
+            "max_batch": self.max_batch,
+            "flush_interval_ms": round(self.flush_interval * 1000),
+            "flushes": self.flushes,
+            "written": self.written,
+            "dropped": self.dropped,
+            "backpressure_waits": self.backpressure_waits,
+        }
@@ -0,0 +1,85 @@
+"""Versioned schema migrations.
+
+Each vNNNN_<name>.py module in this package defines ``async def upgrade(db)``
+and is listed in MIGRATIONS, in order. The highest applied version is recorded
+in the schema_version table, so a start against an up-to-date database costs a
+single SELECT and migrations run only when the code ships a newer version.
+
+Several isolates can cold-start at once and race through the same upgrade, so
+every migration must be idempotent (IF NOT EXISTS, column checks before ALTER).
+"""
+
+from __future__ import annotations
+
+import logging
+from types import ModuleType
+from typing import Awaitable, Callable, List, NamedTuple
+
+from ..database import Database, _jsproxy_to_dict
+from ..exceptions import DatabaseError
+from . import v0001_baseline, v0002_backfill_usage_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    upgrade: Callable[[Database], Awaitable[None]]
+
+
+def _from_module(module: ModuleType) -> Migration:
+    prefix, _, name = module.__name__.rsplit(".", 1)[-1].partition("_")
+    return Migration(int(prefix.lstrip("v")), name, module.upgrade)
+
+
+MIGRATIONS: List[Migration] = [
+    _from_module(v0001_baseline),
+    _from_module(v0002_backfill_usage_rollups),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def get_schema_version(db: Database) -> int:
+    """Highest applied migration version, or 0 for a database that predates them."""
+    try:
+        row = await db.execute("SELECT MAX(version) AS version FROM schema_version", ())
+    except DatabaseError as exc:
+        if "no such table" in str(exc.detail).lower():
+            return 0
+        raise
+    return (_jsproxy_to_dict(row).get("version") if row else None) or 0
+
+
+async def migrate(db: Database) -> int:
+    """Apply every migration newer than the database's version; return the resulting version."""
+    current = await get_schema_version(db)
+    if current >= LATEST_VERSION:
+        if current > LATEST_VERSION:
+            logger.warning(
+                "schema_version.ahead_of_code",
+                extra={"database_version": current, "code_version": LATEST_VERSION},
+            )
+        return current
+
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+        """,
+        (),
+    )
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logger.info(f"Applying schema migration {migration.version:04d}_{migration.name}")
+        await migration.upgrade(db)
+        await db.execute(
+            "INSERT OR IGNORE INTO schema_version (version, name) VALUES (?, ?)",
+            (migration.version, migration.name),
+        )
+        current = migration.version
+    return current
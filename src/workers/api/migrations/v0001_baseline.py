@@ -0,0 +1,14 @@
+"""Baseline: every table, index and trigger the app had before versioned migrations.
+
+Both helpers are idempotent, so this converges databases created by any earlier
+release (or by migrations/schema.sql) as well as empty ones.
+"""
+
+from __future__ import annotations
+
+from ..database import Database, ensure_full_schema, ensure_sessions_schema
+
+
+async def upgrade(db: Database) -> None:
+    await ensure_sessions_schema(db)
+    await ensure_full_schema(db)
@@ -0,0 +1,14 @@
+"""Fill the usage rollup tables from usage_events recorded before they existed.
+
+record_usage_event keeps the rollups current from here on; this rebuilds every
+bucket once so usage summaries also cover older events. The rebuild runs as one
+atomic batch per call, so racing isolates just recompute the same totals.
+"""
+
+from __future__ import annotations
+
+from ..database import Database, backfill_usage_rollups
+
+
+async def upgrade(db: Database) -> None:
+    await backfill_usage_rollups(db)
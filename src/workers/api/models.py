@@ -96,10 +96,11 @@ class JobListResponse(BaseModel):
     """Paginated job list response."""
     
     jobs: List[JobStatus]
-    total: int
+    total: Optional[int] = None  # omitted unless requested on cursor pages
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=20, ge=1, le=100)
     has_more: bool
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
 
 
 class UserResponse(BaseModel):
@@ -513,14 +514,41 @@ class TranscriptProxyRequest(BaseModel):
     """Request model for YouTube transcript proxy endpoint."""
     
     video_id: str = Field(..., description="YouTube video ID (11 characters)", min_length=11, max_length=11)
+    include_segments: bool = Field(
+        default=False,
+        description="Include timed segments as parallel text/tStartMs/dDurationMs arrays when available",
+    )
 
 
 class TranscriptProxyResponse(BaseModel):
     """Response model for YouTube transcript proxy endpoint."""
     
     success: bool
-    transcript: Optional[Dict[str, Any]] = Field(default=None, description="Transcript data with text, format, language, track_kind")
-    metadata: Optional[Dict[str, Any]] = Field(default=None, description="Metadata including client_version, method, video_id")
+    transcript: Optional[Dict[str, Any]] = Field(default=None, description="Transcript data with text, format, language, track_kind and optional segments")
+    metadata: Optional[Dict[str, Any]] = Field(default=None, description="Metadata including client_version, method, video_id and per-stage scrape timings")
     error: Optional[Dict[str, Any]] = Field(default=None, description="Error details when success is False")
     
     model_config = ConfigDict(use_enum_values=True)
+
+
+class TranscriptProxyBulkRequest(BaseModel):
+    """Request model for the bulk YouTube transcript proxy endpoint."""
+
+    video_ids: List[str] = Field(
+        ...,
+        description="YouTube video IDs (11 characters each); duplicates are fetched once",
+        min_length=1,
+        max_length=500,
+    )
+    include_segments: bool = Field(
+        default=False,
+        description="Include timed segments as parallel text/tStartMs/dDurationMs arrays when available",
+    )
+
+    @field_validator("video_ids")
+    @classmethod
+    def validate_video_ids(cls, v: List[str]) -> List[str]:
+        for video_id in v:
+            if not isinstance(video_id, str) or len(video_id) != 11:
+                raise ValueError(f"Invalid video_id {video_id!r}: must be 11 characters")
+        return list(dict.fromkeys(v))
@@ -22,7 +22,9 @@ from .models import (
 from .database import (
     create_job_extended,
     get_job,
+    count_jobs,
     list_jobs,
+    list_jobs_page,
     update_job_status,
     list_google_tokens,
     get_user_by_id,
@@ -369,6 +371,17 @@ async def debug_env():
     }
 
 
+@router.get("/api/v1/debug/db", tags=["Debug"])
+async def debug_db(user: dict = Depends(get_saas_user)):
+    db = ensure_db()
+    return {
+        "statements": db.statement_stats(),
+        "sqlite_pool": db.sqlite_pool_stats(),
+        "event_buffer": db.event_buffer.stats() if db.event_buffer else None,
+        "enrichment_cache": db.enrichment_cache_stats(),
+    }
+
+
 # Removed: GitHub OAuth status endpoint - GitHub OAuth removed
 
 
@@ -769,24 +782,57 @@ async def list_user_jobs(
     page: int = 1,
     page_size: int = 20,
     status_filter: Optional[JobStatusEnum] = None,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     user: dict = Depends(get_saas_user),
     agent_session_id: Optional[str] = Depends(get_agent_session_id),
 ):
+    """List jobs newest first.
+    
+    Follow next_cursor for further pages. The total is included on the first
+    page (or with include_total=true). Passing page > 1 without a cursor still
+    uses offset pagination for older clients.
+    """
     db = ensure_db()
     if page < 1:
         page = 1
     if page_size < 1 or page_size > 100:
         page_size = 20
-    jobs_list, total = await list_jobs(
-        db,
-        user["user_id"],
+    status_value = status_filter.value if status_filter else None
+    if page > 1 and not cursor:
+        jobs_list, total = await list_jobs(
+            db,
+            user["user_id"],
+            page=page,
+            page_size=page_size,
+            status=status_value,
+            session_id=agent_session_id,
+        )
+        job_statuses = [_job_status_from_row(job) for job in jobs_list]
+        return JobListResponse(jobs=job_statuses, total=total, page=page, page_size=page_size, has_more=(page * page_size) < total)
+    try:
+        jobs_list, next_cursor = await list_jobs_page(
+            db,
+            user["user_id"],
+            cursor=cursor,
+            page_size=page_size,
+            status=status_value,
+            session_id=agent_session_id,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    total = None
+    if include_total if include_total is not None else not cursor:
+        total = await count_jobs(db, user["user_id"], status_value, agent_session_id)
+    job_statuses = [_job_status_from_row(job) for job in jobs_list]
+    return JobListResponse(
+        jobs=job_statuses,
+        total=total,
         page=page,
         page_size=page_size,
-        status=status_filter.value if status_filter else None,
-        session_id=agent_session_id,
+        has_more=next_cursor is not None,
+        next_cursor=next_cursor,
     )
-    job_statuses = [_job_status_from_row(job) for job in jobs_list]
-    return JobListResponse(jobs=job_statuses, total=total, page=page, page_size=page_size, has_more=(page * page_size) < total)
 
 
 # Removed: Sessions/events and text ingestion endpoints - Not needed for YouTube proxy API
@@ -1,12 +1,14 @@
 """YouTube transcript proxy endpoint."""
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, Request, status, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from .config import settings
 from .deps import get_saas_user
@@ -15,12 +17,17 @@ from .better_auth import (
     fetch_youtube_integration,
     refresh_youtube_access_token,
 )
+from core.proxy_fetcher import get_provider_stats
+from core.proxy_pool import get_proxy_pool_manager
+from core.scrape_metrics import get_scrape_stats
 from core.youtube_proxy import (
     TranscriptProxyError,
     fetch_transcript_via_proxy,
     fetch_transcript_via_youtube_api,
+    get_caption_format_stats,
+    get_negative_cache_stats,
 )
-from .models import TranscriptProxyRequest, TranscriptProxyResponse
+from .models import TranscriptProxyBulkRequest, TranscriptProxyRequest, TranscriptProxyResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -63,7 +70,8 @@ def _identity_key(user: Dict[str, Any], request: Request) -> str:
     return "anonymous"
 
 
-def _is_identity_rate_limited(identity: str) -> bool:
+def _is_identity_rate_limited(identity: str, cost: int = 1) -> bool:
+    """Charge ``cost`` requests to ``identity``; all or nothing, so a rejected call charges none."""
     minute_limit, hour_limit = _rate_limits()
     if minute_limit <= 0 and hour_limit <= 0:
         return False
@@ -86,12 +94,12 @@ def _is_identity_rate_limited(identity: str) -> bool:
     requests_last_hour = len(history)
     requests_last_minute = len([ts for ts in history if (now - ts).total_seconds() < 60])
 
-    if (minute_limit > 0 and requests_last_minute >= minute_limit) or (
-        hour_limit > 0 and requests_last_hour >= hour_limit
+    if (minute_limit > 0 and requests_last_minute + cost > minute_limit) or (
+        hour_limit > 0 and requests_last_hour + cost > hour_limit
     ):
         return True
 
-    history.append(now)
+    history.extend([now] * cost)
     return False
 
 
@@ -101,9 +109,8 @@ def _is_expired(expires_at: Optional[datetime]) -> bool:
     return expires_at <= datetime.now(timezone.utc)
 
 
-async def _try_youtube_api_primary(
-    request: Request, video_id: str
-) -> Tuple[Optional[TranscriptProxyResponse], Optional[str]]:
+async def _resolve_youtube_access_token(request: Request) -> Tuple[Optional[str], Optional[str]]:
+    """Return a usable YouTube access token for the caller, or a link hint when none is available."""
     integration, forbidden = await fetch_youtube_integration(request)
     if forbidden:
         logger.info("youtube_api_access_forbidden")
@@ -135,9 +142,14 @@ async def _try_youtube_api_primary(
             extra={"integration_id": integration.integration_id},
         )
         return None, YOUTUBE_LINK_HINT
+    return token, None
 
+
+async def _fetch_youtube_api_transcript(
+    video_id: str, token: str, include_segments: bool = False
+) -> Tuple[Optional[TranscriptProxyResponse], Optional[str]]:
     try:
-        result = await fetch_transcript_via_youtube_api(video_id, token)
+        result = await fetch_transcript_via_youtube_api(video_id, token, include_segments=include_segments)
     except TranscriptProxyError as fallback_exc:
         logger.warning(
             "youtube_api_primary_failed",
@@ -154,15 +166,22 @@ async def _try_youtube_api_primary(
     return _response_from_result(result, video_id), None
 
 
-def _error_response(
+async def _try_youtube_api_primary(
+    request: Request, video_id: str, include_segments: bool = False
+) -> Tuple[Optional[TranscriptProxyResponse], Optional[str]]:
+    token, hint = await _resolve_youtube_access_token(request)
+    if not token:
+        return None, hint
+    return await _fetch_youtube_api_transcript(video_id, token, include_segments)
+
+
+def _error_payload(
     code: str,
     message: str,
     *,
     details: Optional[Any] = None,
-    status_code: int = status.HTTP_400_BAD_REQUEST,
-) -> JSONResponse:
-    """Build standardized error response."""
-    payload = TranscriptProxyResponse(
+) -> TranscriptProxyResponse:
+    return TranscriptProxyResponse(
         success=False,
         error={
             "code": code,
@@ -170,6 +189,17 @@ def _error_response(
             **({"details": details} if details is not None else {}),
         },
     )
+
+
+def _error_response(
+    code: str,
+    message: str,
+    *,
+    details: Optional[Any] = None,
+    status_code: int = status.HTTP_400_BAD_REQUEST,
+) -> JSONResponse:
+    """Build standardized error response."""
+    payload = _error_payload(code, message, details=details)
     return JSONResponse(status_code=status_code, content=payload.model_dump(exclude_none=True))
 
 
@@ -190,16 +220,21 @@ def _response_from_result(
         "video_id": metadata_data.get("videoId", fallback_video_id),
         "caption_id": metadata_data.get("captionId"),
     }
+    if metadata_data.get("timings"):
+        metadata["timings"] = metadata_data["timings"]
     if hint:
         metadata["accountLinkHint"] = hint
+    transcript = {
+        "text": transcript_data.get("text", ""),
+        "format": transcript_data.get("format", "text"),
+        "language": transcript_data.get("language"),
+        "track_kind": transcript_data.get("trackKind"),
+    }
+    if transcript_data.get("segments"):
+        transcript["segments"] = transcript_data["segments"]
     return TranscriptProxyResponse(
         success=True,
-        transcript={
-            "text": transcript_data.get("text", ""),
-            "format": transcript_data.get("format", "text"),
-            "language": transcript_data.get("language"),
-            "track_kind": transcript_data.get("trackKind"),
-        },
+        transcript=transcript,
         metadata=metadata,
     )
 
@@ -221,7 +256,9 @@ async def proxy_youtube_transcript(
     
     youtube_hint: Optional[str] = None
     try:
-        youtube_response, youtube_hint = await _try_youtube_api_primary(request, request_body.video_id)
+        youtube_response, youtube_hint = await _try_youtube_api_primary(
+            request, request_body.video_id, request_body.include_segments
+        )
     except Exception as exc:
         logger.exception("youtube_api_primary_exception", extra={"video_id": request_body.video_id})
         youtube_response, youtube_hint = None, None
@@ -246,7 +283,9 @@ async def proxy_youtube_transcript(
         return youtube_response
 
     try:
-        result = await fetch_transcript_via_proxy(request_body.video_id)
+        result = await fetch_transcript_via_proxy(
+            request_body.video_id, include_segments=request_body.include_segments
+        )
         return _response_from_result(result, request_body.video_id, hint=youtube_hint)
 
     except TranscriptProxyError as exc:
@@ -276,3 +315,110 @@ async def proxy_youtube_transcript(
             "An unexpected error occurred while fetching transcript.",
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+async def _fetch_bulk_item(
+    video_id: str,
+    access_token: Optional[str],
+    youtube_hint: Optional[str],
+    include_segments: bool = False,
+) -> Dict[str, Any]:
+    """Fetch one transcript for the bulk endpoint; never raises."""
+    hint = youtube_hint
+    try:
+        if access_token:
+            youtube_response, hint = await _fetch_youtube_api_transcript(video_id, access_token, include_segments)
+            if youtube_response:
+                return {"video_id": video_id, **youtube_response.model_dump(exclude_none=True)}
+        result = await fetch_transcript_via_proxy(video_id, include_segments=include_segments)
+        response = _response_from_result(result, video_id, hint=hint)
+    except TranscriptProxyError as exc:
+        details = exc.details or {}
+        if hint:
+            details = {**details, "accountLinkHint": hint}
+        response = _error_payload(exc.code, exc.message, details=details)
+    except ValueError as exc:
+        response = _error_payload("invalid_request", str(exc))
+    except Exception:
+        logger.exception("youtube_transcript_bulk_item_error", extra={"video_id": video_id})
+        response = _error_payload(
+            "internal_error",
+            "An unexpected error occurred while fetching transcript.",
+        )
+    return {"video_id": video_id, **response.model_dump(exclude_none=True)}
+
+
+async def _stream_bulk_results(
+    video_ids: List[str],
+    access_token: Optional[str],
+    youtube_hint: Optional[str],
+    include_segments: bool = False,
+) -> AsyncIterator[str]:
+    """Yield one NDJSON line per video as soon as its fetch completes."""
+    semaphore = asyncio.Semaphore(settings.youtube_transcript_bulk_concurrency)
+
+    async def _run(video_id: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await _fetch_bulk_item(video_id, access_token, youtube_hint, include_segments)
+
+    tasks = [asyncio.create_task(_run(video_id)) for video_id in video_ids]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            yield json.dumps(item, default=str) + "\n"
+    finally:
+        # Client disconnected or the stream was closed early
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/api/proxy/youtube-transcript/bulk", response_model=None, tags=["Proxy"])
+async def proxy_youtube_transcript_bulk(
+    request_body: TranscriptProxyBulkRequest,
+    request: Request,
+    user: Dict[str, Any] = Depends(get_saas_user),
+) -> StreamingResponse | JSONResponse:
+    """Fetch transcripts for many videos, streaming per-video results as NDJSON.
+
+    Auth and YouTube integration lookup happen once per call. Every video ID
+    counts as one request against the identity's rate limit, and a call that
+    doesn't fit in the remaining quota is rejected whole. Each line is a
+    TranscriptProxyResponse payload plus ``video_id``; lines are emitted in
+    completion order, not request order.
+    """
+    identity_key = _identity_key(user, request)
+    if _is_identity_rate_limited(identity_key, cost=len(request_body.video_ids)):
+        return _error_response(
+            "rate_limited",
+            "Too many requests for this identity. Please slow down or send fewer video IDs.",
+            details={"video_count": len(request_body.video_ids)},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    try:
+        access_token, youtube_hint = await _resolve_youtube_access_token(request)
+    except Exception:
+        logger.exception("youtube_api_primary_exception", extra={"video_count": len(request_body.video_ids)})
+        access_token, youtube_hint = None, None
+
+    return StreamingResponse(
+        _stream_bulk_results(
+            request_body.video_ids,
+            access_token,
+            youtube_hint,
+            request_body.include_segments,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/api/proxy/debug/scrape-stats", tags=["Debug"])
+async def proxy_scrape_stats(user: Dict[str, Any] = Depends(get_saas_user)) -> Dict[str, Any]:
+    """Aggregate Innertube scrape latency per stage plus caption, cache and proxy pool counters."""
+    return {
+        "scrape": get_scrape_stats(),
+        "caption_formats": get_caption_format_stats(),
+        "negative_cache": get_negative_cache_stats(),
+        "proxy_pool": get_proxy_pool_manager().get_pool_stats(),
+        "proxy_sources": get_provider_stats(),
+    }
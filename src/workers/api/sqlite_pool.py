@@ -0,0 +1,200 @@
+"""Persistent SQLite connections for the LOCAL_SQLITE_PATH database path.
+
+One writer connection serializes every statement that may write; a small set of
+reader connections serves plain SELECTs concurrently under WAL. Each connection
+is owned by one thread of a dedicated executor, so it is opened, configured and
+warmed once instead of per query.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+BUSY_TIMEOUT_SECONDS = 30.0
+VALID_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def is_read_query(sql: str) -> bool:
+    """True for statements a reader connection may run (plain SELECTs)."""
+    head = sql.lstrip().split(None, 1)
+    return bool(head) and head[0].upper() == "SELECT" and "RETURNING" not in sql.upper()
+
+
+class _LaneStats:
+    """Counters for one side of the pool (writer or readers); updated from worker threads."""
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.busy_ms_total = 0.0
+
+    def as_dict(self, elapsed_s: float) -> Dict[str, Any]:
+        capacity_ms = elapsed_s * 1000 * self.workers
+        return {
+            "workers": self.workers,
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "avg_wait_ms": round(self.wait_ms_total / self.calls, 3) if self.calls else 0.0,
+            "max_wait_ms": round(self.wait_ms_max, 3),
+            "utilization": round(self.busy_ms_total / capacity_ms, 4) if capacity_ms else 0.0,
+        }
+
+
+class SQLiteConnectionPool:
+    """One writer plus N reader connections to a WAL-mode SQLite database file."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        readers: int = 4,
+        synchronous: str = "NORMAL",
+        mmap_size: int = 256 * 1024 * 1024,
+        cached_statements: int = 128,
+    ) -> None:
+        self.path = path
+        self.readers = max(1, readers)
+        self.synchronous = synchronous.upper() if synchronous.upper() in VALID_SYNCHRONOUS else "NORMAL"
+        self.mmap_size = max(0, mmap_size)
+        self.cached_statements = max(0, cached_statements)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._reader = ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="sqlite-reader")
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._stats = {"writer": _LaneStats(1), "readers": _LaneStats(self.readers)}
+        self._started = time.monotonic()
+        self._closed = False
+        # journal_mode is persistent in the file; switch it before any reader opens
+        self._writer.submit(self._connection, False).result()
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level="DEFERRED",
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        if not readonly:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if str(mode).lower() != "wal":
+                logger.warning(f"SQLite journal_mode is {mode}, not WAL; readers will block on writes")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _connection(self, readonly: bool) -> sqlite3.Connection:
+        """The calling worker thread's own connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect(readonly)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    async def run(self, fn: Callable[[sqlite3.Connection], T], *, write: bool = True) -> T:
+        """Run fn(connection) on the writer, or on a reader when write is False."""
+        if self._closed:
+            raise RuntimeError("SQLite connection pool is closed")
+        lane = self._stats["writer" if write else "readers"]
+        executor = self._writer if write else self._reader
+        submitted = time.perf_counter()
+        with self._lock:
+            lane.waiting += 1
+            lane.max_waiting = max(lane.max_waiting, lane.waiting)
+
+        dequeued = False
+
+        def _call() -> T:
+            nonlocal dequeued
+            started = time.perf_counter()
+            wait_ms = (started - submitted) * 1000
+            with self._lock:
+                if not dequeued:
+                    dequeued = True
+                    lane.waiting -= 1
+                lane.calls += 1
+                lane.in_flight += 1
+                lane.max_in_flight = max(lane.max_in_flight, lane.in_flight)
+                lane.wait_ms_total += wait_ms
+                lane.wait_ms_max = max(lane.wait_ms_max, wait_ms)
+            try:
+                conn = self._connection(not write)
+                try:
+                    result = fn(conn)
+                    if write and conn.in_transaction:
+                        conn.commit()
+                    return result
+                except Exception:
+                    if write and conn.in_transaction:
+                        # Never leave the shared writer inside a half-finished transaction
+                        conn.rollback()
+                    raise
+            except Exception:
+                with self._lock:
+                    lane.errors += 1
+                raise
+            finally:
+                with self._lock:
+                    lane.in_flight -= 1
+                    lane.busy_ms_total += (time.perf_counter() - started) * 1000
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, _call)
+        except asyncio.CancelledError:
+            with self._lock:
+                if not dequeued:  # cancelled while still queued; _call will never run
+                    dequeued = True
+                    lane.waiting -= 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started
+        with self._lock:
+            return {
+                "path": self.path,
+                "connections": len(self._connections),
+                "writer": self._stats["writer"].as_dict(elapsed),
+                "readers": self._stats["readers"].as_dict(elapsed),
+            }
+
+    def close(self) -> None:
+        """Wait for queued work, then close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.shutdown(wait=True)
+        self._reader.shutdown(wait=True)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as exc:
+                logger.debug(f"Error closing SQLite connection: {exc}")
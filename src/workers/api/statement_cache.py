@@ -0,0 +1,112 @@
+"""Prepared-statement reuse and per-statement timings for the Database wrapper."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# The query helpers use a fixed set of SQL strings; this comfortably holds them all
+STATEMENT_CACHE_SIZE = 256
+
+
+class StatementStats:
+    __slots__ = ("calls", "errors", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "total_ms": round(self.total_ms, 3),
+        }
+
+
+class StatementCache:
+    """LRU of D1 prepared statements keyed by SQL text, plus per-SQL call stats.
+
+    D1's bind() returns a new bound statement and leaves the prepared one
+    untouched, so one prepare() per SQL string serves every call. A binding whose
+    bind() mutates and returns the statement itself cannot be shared; such SQL is
+    re-prepared per call. SQLite keeps its own per-connection statement cache,
+    sized to match (see SQLiteConnectionPool), and only uses the stats side.
+    """
+
+    def __init__(self, capacity: int = STATEMENT_CACHE_SIZE) -> None:
+        self.capacity = max(1, capacity)
+        self._prepared: "OrderedDict[str, Any]" = OrderedDict()
+        self._unshareable: set = set()
+        self._stats: Dict[str, StatementStats] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bind(self, db: Any, sql: str, params: tuple = ()) -> Any:
+        """Return sql prepared on db and bound to params, reusing the prepared statement."""
+        if sql in self._unshareable:
+            self.misses += 1
+            return db.prepare(sql).bind(*params)
+        statement = self._prepared.get(sql)
+        if statement is None:
+            self.misses += 1
+            statement = db.prepare(sql)
+            self._prepared[sql] = statement
+            if len(self._prepared) > self.capacity:
+                self._prepared.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self._prepared.move_to_end(sql)
+        bound = statement.bind(*params)
+        if bound is statement:
+            # bind() mutated the shared statement; stop sharing it
+            self._prepared.pop(sql, None)
+            self._unshareable.add(sql)
+        return bound
+
+    @contextmanager
+    def track(self, sql: str) -> Iterator[None]:
+        """Time one execution of sql and count it (and any error) against it."""
+        stats = self._stats.get(sql)
+        if stats is None:
+            if len(self._stats) >= self.capacity * 4:
+                # Ad-hoc SQL (e.g. dynamic IN lists) must not grow this without bound
+                self._stats.pop(next(iter(self._stats)))
+            stats = self._stats[sql] = StatementStats()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+
+    def stats(self, top: Optional[int] = 20) -> Dict[str, Any]:
+        """Cache counters and the statements with the most total time."""
+        ranked: List[tuple] = sorted(self._stats.items(), key=lambda item: item[1].total_ms, reverse=True)
+        if top is not None:
+            ranked = ranked[:top]
+        return {
+            "size": len(self._prepared),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "statements": {" ".join(sql.split()): stats.as_dict() for sql, stats in ranked},
+        }
+
+    def clear(self) -> None:
+        self._prepared.clear()
+        self._unshareable.clear()
@@ -0,0 +1,57 @@
+"""Small in-process cache whose entries expire a fixed time after they are stored."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """LRU map of at most max_entries values, each kept for ttl seconds.
+
+    Lives in one process (or Worker isolate), so explicit invalidation only
+    reaches this copy; the TTL bounds how stale any other copy can get.
+    A ttl of 0 disables caching.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 512) -> None:
+        self.ttl = max(0.0, ttl)
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -1,84 +1,354 @@
 """Free proxy fetcher from public APIs."""
 from __future__ import annotations
 
+import asyncio
+import csv
+import json
 import logging
-from typing import List
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
 import httpx
 
 logger = logging.getLogger(__name__)
 
 PROXYSCRAPE_API_URL = "https://api.proxyscrape.com/v2/?request=getproxies&protocol=http&timeout=10000&country=all&ssl=all&anonymity=all"
+GEONODE_API_URL = "https://proxylist.geonode.com/api/proxy-list?limit=500&page=1&sort_by=lastChecked&sort_type=desc&protocols=http%2Chttps"
+SPEEDX_HTTP_LIST_URL = "https://raw.githubusercontent.com/TheSpeedX/PROXY-List/master/http.txt"
 
+# Stop reading a source after this many bytes; free lists are a few hundred KB at most
+MAX_SOURCE_BYTES = 2_000_000
+# Sources whose probed proxies rarely prove working are polled every Nth refresh,
+# N growing as yield falls below LOW_YIELD_RATIO (capped at MAX_POLL_SKIP + 1).
+# MIN_YIELD_SAMPLE is the number of probed (promoted + rejected) proxies needed first.
+LOW_YIELD_RATIO = 0.05
+MIN_YIELD_SAMPLE = 50
+MAX_POLL_SKIP = 7
+# A URL a source lists again within this window is not counted as new for it
+SEEN_TTL_SECONDS = 24 * 3600
+MAX_SEEN_PER_PROVIDER = 20_000
 
-async def fetch_proxyscrape_proxies(timeout: float = 10.0) -> List[str]:
-    """Fetch free proxies from ProxyScrape API."""
+
+@dataclass
+class ProxyProvider:
+    """A public proxy list: where to fetch it, how to parse it, and how it has performed."""
+    name: str
+    url: str
+    format: str = "text"  # text, json, csv
+    timeout: float = 10.0
+    polls: int = 0
+    skipped_polls: int = 0
+    fetched: int = 0
+    unique: int = 0
+    working: int = 0
+    rejected: int = 0
+    errors: int = 0
+    last_error: Optional[str] = None
+    last_duration_ms: Optional[float] = None
+    skip_remaining: int = 0
+    # URL -> when this source last listed it, so re-polls of a stable list are not "new"
+    seen: "OrderedDict[str, float]" = field(default_factory=OrderedDict, repr=False)
+
+    @property
+    def probed(self) -> int:
+        return self.working + self.rejected
+
+    @property
+    def yield_ratio(self) -> Optional[float]:
+        """Share of this source's probed proxies that proved working."""
+        return self.working / self.probed if self.probed else None
+
+    def note_seen(self, proxy_url: str, now: float) -> bool:
+        """Remember proxy_url as listed by this source; True if it is new within SEEN_TTL_SECONDS."""
+        last_seen = self.seen.pop(proxy_url, None)
+        self.seen[proxy_url] = now
+        if len(self.seen) > MAX_SEEN_PER_PROVIDER:
+            self.seen.popitem(last=False)
+        return last_seen is None or now - last_seen >= SEEN_TTL_SECONDS
+
+    def poll_skip(self) -> int:
+        """How many refreshes to sit out after a poll, based on observed yield."""
+        ratio = self.yield_ratio
+        if ratio is None or self.probed < MIN_YIELD_SAMPLE or ratio >= LOW_YIELD_RATIO:
+            return 0
+        return min(MAX_POLL_SKIP, math.ceil(LOW_YIELD_RATIO / max(ratio, 1e-3)) - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        ratio = self.yield_ratio
+        return {
+            "format": self.format,
+            "polls": self.polls,
+            "skipped_polls": self.skipped_polls,
+            "fetched": self.fetched,
+            "unique": self.unique,
+            "working": self.working,
+            "rejected": self.rejected,
+            "yield_ratio": round(ratio, 4) if ratio is not None else None,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+
+_providers: Dict[str, ProxyProvider] = {}
+# normalized proxy URL -> provider that first supplied it, for yield attribution.
+# The pool resolves each entry (working, rejected or discarded); the cap evicts the
+# oldest entries as a backstop so attribution never stops for new proxies.
+_proxy_origins: "OrderedDict[str, str]" = OrderedDict()
+_MAX_TRACKED_ORIGINS = 50_000
+
+
+def register_provider(provider: ProxyProvider) -> None:
+    """Add or replace a proxy source in the registry."""
+    _providers[provider.name] = provider
+
+
+def unregister_provider(name: str) -> None:
+    _providers.pop(name, None)
+
+
+def get_providers() -> List[ProxyProvider]:
+    return list(_providers.values())
+
+
+def get_provider_stats() -> Dict[str, Dict[str, Any]]:
+    return {provider.name: provider.stats() for provider in _providers.values()}
+
+
+def record_proxy_working(proxy_url: str) -> None:
+    """Credit the source of a proxy the first time it proves working."""
+    provider = _providers.get(_proxy_origins.pop(proxy_url, ""))
+    if provider is not None:
+        provider.working += 1
+
+
+def record_proxy_rejected(proxy_url: str) -> None:
+    """Count a failed validation probe against the source of a proxy."""
+    provider = _providers.get(_proxy_origins.pop(proxy_url, ""))
+    if provider is not None:
+        provider.rejected += 1
+
+
+def discard_proxy_origin(proxy_url: str) -> None:
+    """Stop tracking a proxy that will not be probed (already known, or no room to quarantine)."""
+    _proxy_origins.pop(proxy_url, None)
+
+
+register_provider(ProxyProvider(name="proxyscrape", url=PROXYSCRAPE_API_URL, format="text"))
+register_provider(ProxyProvider(name="geonode", url=GEONODE_API_URL, format="json"))
+register_provider(ProxyProvider(name="speedx", url=SPEEDX_HTTP_LIST_URL, format="text"))
+
+
+async def _iter_lines(response: httpx.Response) -> AsyncIterator[str]:
+    received = 0
+    async for line in response.aiter_lines():
+        received += len(line) + 1
+        if received > MAX_SOURCE_BYTES:
+            logger.warning(f"Proxy source {response.url} exceeded {MAX_SOURCE_BYTES} bytes; truncating")
+            return
+        yield line
+
+
+def parse_text_line(line: str) -> Optional[str]:
+    """Parse one line of a one-proxy-per-line list; blanks and comments yield None."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    return normalize_proxy_url(line.split()[0]) or None
+
+
+class CsvRowParser:
+    """Line-at-a-time CSV parser: an ip/host + port header, or plain host,port rows."""
+
+    def __init__(self) -> None:
+        self._first = True
+        self._host_col, self._port_col = 0, 1
+        self._scheme_col: Optional[int] = None
+
+    def __call__(self, line: str) -> Optional[str]:
+        row = next(csv.reader([line]), [])
+        if not row:
+            return None
+        if self._first:
+            self._first = False
+            header = [cell.strip().lower() for cell in row]
+            if "port" in header and ("ip" in header or "host" in header):
+                self._host_col = header.index("ip") if "ip" in header else header.index("host")
+                self._port_col = header.index("port")
+                self._scheme_col = next(
+                    (header.index(key) for key in ("protocol", "type", "scheme") if key in header), None
+                )
+                return None
+        if len(row) <= max(self._host_col, self._port_col):
+            return normalize_proxy_url(row[0]) or None
+        host, port = row[self._host_col].strip(), row[self._port_col].strip()
+        scheme = "http"
+        if self._scheme_col is not None and self._scheme_col < len(row):
+            scheme = row[self._scheme_col].strip().lower() or "http"
+        return normalize_proxy_url(f"{scheme}://{host}:{port}") or None
+
+
+def parse_json_payload(payload: Any) -> Iterator[str]:
+    """Yield proxies from common JSON list shapes.
+
+    Accepts a list, or an object whose "data"/"proxies" key holds one. Items may be
+    proxy strings or objects with "proxy" or "ip" + "port" and optional "protocol(s)".
+    """
+    if isinstance(payload, dict):
+        payload = payload.get("data") or payload.get("proxies") or []
+    if not isinstance(payload, list):
+        return
+    for item in payload:
+        if isinstance(item, str):
+            candidate = item
+        elif isinstance(item, dict):
+            if item.get("proxy"):
+                candidate = str(item["proxy"])
+            elif item.get("ip") and item.get("port"):
+                protocols = item.get("protocols") or [item.get("protocol") or "http"]
+                scheme = next((p for p in protocols if p in ("http", "https")), None)
+                if scheme is None:
+                    continue
+                candidate = f"{scheme}://{item['ip']}:{item['port']}"
+            else:
+                continue
+        else:
+            continue
+        normalized = normalize_proxy_url(candidate)
+        if normalized:
+            yield normalized
+
+
+async def fetch_provider(client: httpx.AsyncClient, provider: ProxyProvider, timeout: float) -> List[str]:
+    """Fetch and parse one source, parsing line-based formats as lines arrive."""
     proxies: List[str] = []
-    try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # Disable automatic decompression to handle raw response
-            response = await client.get(
-                PROXYSCRAPE_API_URL,
-                headers={"Accept-Encoding": "identity"}  # Request no compression
+    async with client.stream(
+        "GET",
+        provider.url,
+        headers={"Accept-Encoding": "identity"},
+        timeout=timeout,
+    ) as response:
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(
+                f"status {response.status_code}", request=response.request, response=response
             )
-            if response.status_code == 200:
-                # Try to decode as text, handling both compressed and uncompressed
-                try:
-                    text = response.text
-                except Exception:
-                    # If text decoding fails, try to decompress manually
-                    import gzip
-                    text = gzip.decompress(response.content).decode('utf-8')
-                
-                proxy_list = text.strip().split('\n')
-                for proxy in proxy_list:
-                    proxy = normalize_proxy_url(proxy)
-                    if proxy:
-                        proxies.append(proxy)
-                logger.info(f"Fetched {len(proxies)} proxies from ProxyScrape")
-            else:
-                logger.warning(f"ProxyScrape API returned status {response.status_code}")
-    except httpx.TimeoutException as e:
-        logger.warning(f"Timeout fetching from ProxyScrape: {str(e)}")
-    except httpx.HTTPError as e:
-        logger.warning(f"HTTP error fetching from ProxyScrape: {str(e)}")
-    except Exception as e:
-        logger.error(f"Unexpected error fetching from ProxyScrape: {str(e)}", exc_info=True)
+        if provider.format == "json":
+            # JSON needs the whole document; stay within the same byte budget
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if len(body) > MAX_SOURCE_BYTES:
+                    raise ValueError(f"JSON body exceeds {MAX_SOURCE_BYTES} bytes")
+            proxies.extend(parse_json_payload(json.loads(bytes(body))))
+        else:
+            parse_line = CsvRowParser() if provider.format == "csv" else parse_text_line
+            async for line in _iter_lines(response):
+                proxy = parse_line(line)
+                if proxy:
+                    proxies.append(proxy)
     return proxies
 
 
+async def _poll_provider(client: httpx.AsyncClient, provider: ProxyProvider, timeout: float) -> List[str]:
+    provider.polls += 1
+    started = time.perf_counter()
+    try:
+        # The overall deadline also covers slow-drip bodies that never trip the read timeout
+        proxies = await asyncio.wait_for(fetch_provider(client, provider, timeout), timeout=timeout)
+        provider.last_error = None
+        logger.info(f"Fetched {len(proxies)} proxies from {provider.name}")
+        return proxies
+    except asyncio.TimeoutError:
+        provider.errors += 1
+        provider.last_error = "timeout"
+        logger.warning(f"Timeout fetching from {provider.name}")
+    except Exception as e:
+        provider.errors += 1
+        provider.last_error = str(e)[:200]
+        logger.warning(f"Error fetching from {provider.name}: {str(e)}")
+    finally:
+        provider.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    return []
+
+
+async def fetch_proxy_candidates(timeout: Optional[float] = None) -> Dict[str, str]:
+    """Poll every due provider concurrently; return normalized URL -> source name.
+
+    timeout, when given, caps each provider's own timeout. Duplicates across
+    sources are credited to the first provider in registry order.
+    """
+    due: List[ProxyProvider] = []
+    for provider in _providers.values():
+        if provider.skip_remaining > 0:
+            provider.skip_remaining -= 1
+            provider.skipped_polls += 1
+            continue
+        due.append(provider)
+    if not due:
+        return {}
+
+    async with httpx.AsyncClient() as client:
+        results = await asyncio.gather(*(
+            _poll_provider(client, p, min(p.timeout, timeout) if timeout is not None else p.timeout)
+            for p in due
+        ))
+
+    candidates: Dict[str, str] = {}
+    now = time.monotonic()
+    for provider, proxies in zip(due, results):
+        provider.fetched += len(proxies)
+        for proxy in proxies:
+            if proxy in candidates:
+                continue
+            candidates[proxy] = provider.name
+            if provider.note_seen(proxy, now):
+                provider.unique += 1
+            if proxy not in _proxy_origins:
+                _proxy_origins[proxy] = provider.name
+                if len(_proxy_origins) > _MAX_TRACKED_ORIGINS:
+                    _proxy_origins.popitem(last=False)
+        provider.skip_remaining = provider.poll_skip()
+
+    logger.info(f"Total unique proxies fetched: {len(candidates)} from {len(due)} sources")
+    return candidates
+
+
+async def fetch_proxyscrape_proxies(timeout: float = 10.0) -> List[str]:
+    """Fetch free proxies from ProxyScrape API."""
+    provider = ProxyProvider(name="proxyscrape", url=PROXYSCRAPE_API_URL, timeout=timeout)
+    async with httpx.AsyncClient() as client:
+        return await _poll_provider(client, provider, timeout)
+
+
 async def fetch_all_free_proxies(timeout: float = 10.0) -> List[str]:
-    """Fetch proxies from all available free sources."""
-    all_proxies: List[str] = []
-    
-    # Fetch from ProxyScrape
-    proxyscrape_proxies = await fetch_proxyscrape_proxies(timeout)
-    all_proxies.extend(proxyscrape_proxies)
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_proxies = []
-    for proxy in all_proxies:
-        if proxy not in seen:
-            seen.add(proxy)
-            unique_proxies.append(proxy)
-    
-    logger.info(f"Total unique proxies fetched: {len(unique_proxies)}")
-    return unique_proxies
+    """Fetch proxies from all registered sources, deduplicated in source order."""
+    return list(await fetch_proxy_candidates(timeout))
 
 
 def normalize_proxy_url(proxy: str) -> str:
-    """Normalize proxy URL while preserving scheme if provided."""
-    proxy = proxy.strip()
+    """Normalize proxy URL while preserving scheme if provided.
+
+    Returns "" for anything that is not an http(s) proxy with a numeric port.
+    """
+    proxy = proxy.strip().rstrip("/")
     if not proxy:
         return ""
 
     scheme = "http"
-    if proxy.startswith("https://"):
+    lowered = proxy.lower()
+    if lowered.startswith("https://"):
         scheme = "https"
-    if proxy.startswith("http://") or proxy.startswith("https://"):
+    if lowered.startswith("http://") or lowered.startswith("https://"):
         proxy = proxy.split("://", 1)[1]
+    elif "://" in proxy:
+        return ""  # socks4/socks5 etc. need extra transports
 
-    if ':' in proxy:
-        return f"{scheme}://{proxy}"
-    return ""
+    credentials, _, host_port = proxy.rpartition("@")
+    host, sep, port = host_port.rpartition(":")
+    if not sep or not host or not port.isdigit() or not 0 < int(port) < 65536:
+        return ""
+    prefix = f"{credentials}@" if credentials else ""
+    return f"{scheme}://{prefix}{host.lower()}:{int(port)}"
@@ -0,0 +1,195 @@
+"""Incremental selection indexes over the active proxies in a pool."""
+from __future__ import annotations
+
+import heapq
+import random
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Lazy-deletion heaps are rebuilt once stale entries outnumber live ones by this factor
+HEAP_COMPACT_FACTOR = 4
+
+
+class _FenwickTree:
+    """Prefix sums over a dense, growable array of weights for O(log n) weighted picks."""
+
+    def __init__(self) -> None:
+        self._values: List[float] = []
+        self._tree: List[float] = [0.0]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def append(self, weight: float) -> None:
+        self._values.append(weight)
+        index = len(self._values)
+        # tree[i] covers (i - lowbit(i), i]; sum the already-built part of that range
+        total = weight
+        stop = index - (index & -index)
+        child = index - 1
+        while child > stop:
+            total += self._tree[child]
+            child -= child & -child
+        self._tree.append(total)
+
+    def set(self, position: int, weight: float) -> None:
+        delta = weight - self._values[position]
+        self._values[position] = weight
+        index = position + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def pop(self) -> float:
+        self._tree.pop()
+        return self._values.pop()
+
+    def value(self, position: int) -> float:
+        return self._values[position]
+
+    def total(self) -> float:
+        index = len(self._values)
+        total = 0.0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, target: float) -> int:
+        """Return the position whose cumulative weight range contains target."""
+        size = len(self._values)
+        position = 0
+        step = 1 << (size.bit_length() - 1) if size else 0
+        while step:
+            candidate = position + step
+            if candidate <= size and self._tree[candidate] <= target:
+                position = candidate
+                target -= self._tree[candidate]
+            step >>= 1
+        return min(position, size - 1)
+
+    def rebuild(self) -> None:
+        values = self._values
+        self._values, self._tree = [], [0.0]
+        for weight in values:
+            self.append(weight)
+
+
+class ProxySelectionIndex:
+    """Active proxy URLs kept ready for every rotation strategy.
+
+    The dense URL list gives O(1) uniform picks and doubles as the round-robin
+    ring, a Fenwick tree over the same positions serves weighted picks, and two
+    lazy-deletion heaps answer "best" and least-recently-used. Callers push
+    changes through update()/remove(); nothing here scans the pool per pick.
+    """
+
+    def __init__(self) -> None:
+        self._urls: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._weights = _FenwickTree()
+        self._cursor = 0
+        self._best_keys: Dict[str, Tuple[float, int]] = {}
+        self._best_heap: List[Tuple[Tuple[float, int], str]] = []
+        self._lru_keys: Dict[str, float] = {}
+        self._lru_heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._positions
+
+    def urls(self) -> List[str]:
+        return list(self._urls)
+
+    def update(self, url: str, *, active: bool, weight: float, best_key: Tuple[float, int], last_used: Optional[datetime]) -> None:
+        """Insert, refresh or drop one proxy after its stats or health changed."""
+        if not active:
+            self.remove(url)
+            return
+        position = self._positions.get(url)
+        if position is None:
+            self._positions[url] = len(self._urls)
+            self._urls.append(url)
+            self._weights.append(weight)
+        elif self._weights.value(position) != weight:
+            self._weights.set(position, weight)
+        if self._best_keys.get(url) != best_key:
+            self._best_keys[url] = best_key
+            heapq.heappush(self._best_heap, (best_key, url))
+        self.touch(url, last_used)
+        self._maybe_compact()
+
+    def touch(self, url: str, last_used: Optional[datetime]) -> None:
+        """Record a new last-used time for the LRU heap."""
+        if url not in self._positions:
+            return
+        lru_key = last_used.timestamp() if last_used else float("-inf")
+        if self._lru_keys.get(url) != lru_key:
+            self._lru_keys[url] = lru_key
+            heapq.heappush(self._lru_heap, (lru_key, url))
+
+    def remove(self, url: str) -> None:
+        position = self._positions.pop(url, None)
+        if position is None:
+            return
+        last_url = self._urls.pop()
+        last_weight = self._weights.pop()
+        if last_url != url:
+            # Swap the tail into the hole so the list stays dense
+            self._urls[position] = last_url
+            self._positions[last_url] = position
+            self._weights.set(position, last_weight)
+        self._best_keys.pop(url, None)
+        self._lru_keys.pop(url, None)
+        self._maybe_compact()
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def random_choice(self) -> Optional[str]:
+        return random.choice(self._urls) if self._urls else None
+
+    def sample(self, count: int) -> List[str]:
+        return random.sample(self._urls, min(count, len(self._urls)))
+
+    def next_round_robin(self) -> Optional[str]:
+        if not self._urls:
+            return None
+        url = self._urls[self._cursor % len(self._urls)]
+        self._cursor += 1
+        return url
+
+    def weighted_choice(self) -> Optional[str]:
+        if not self._urls:
+            return None
+        return self._urls[self._weights.find(random.random() * self._weights.total())]
+
+    def best(self) -> Optional[str]:
+        return self._peek(self._best_heap, self._best_keys)
+
+    def least_recently_used(self) -> Optional[str]:
+        return self._peek(self._lru_heap, self._lru_keys)
+
+    def rebuild_weights(self) -> None:
+        """Recompute the prefix sums from scratch to shed float drift."""
+        self._weights.rebuild()
+
+    @staticmethod
+    def _peek(heap: list, current: dict) -> Optional[str]:
+        while heap:
+            key, url = heap[0]
+            if current.get(url) == key:
+                return url
+            heapq.heappop(heap)
+        return None
+
+    def _maybe_compact(self) -> None:
+        limit = HEAP_COMPACT_FACTOR * len(self._urls) + 64
+        if len(self._best_heap) > limit:
+            self._best_heap = [(key, url) for url, key in self._best_keys.items()]
+            heapq.heapify(self._best_heap)
+        if len(self._lru_heap) > limit:
+            self._lru_heap = [(key, url) for url, key in self._lru_keys.items()]
+            heapq.heapify(self._lru_heap)
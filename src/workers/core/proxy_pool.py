@@ -2,20 +2,127 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
 import logging
 import random
 import threading
-from dataclasses import dataclass
+import time
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 import httpx
 
 from api.config import settings
-from .proxy_fetcher import fetch_all_free_proxies, normalize_proxy_url
+from .proxy_fetcher import (
+    discard_proxy_origin,
+    fetch_all_free_proxies,
+    normalize_proxy_url,
+    record_proxy_rejected,
+    record_proxy_working,
+)
+from .proxy_index import ProxySelectionIndex
+from .proxy_pool_store import sync_pool_snapshot, warm_start_pool
 
 logger = logging.getLogger(__name__)
 
+# Adaptive scoring: EWMA weight for a new observation, and the half-life after
+# which old observations have decayed halfway back to the priors below.
+EWMA_ALPHA = 0.3
+EWMA_HALF_LIFE_SECONDS = 600.0
+PRIOR_SUCCESS = 0.5
+PRIOR_LATENCY_MS = 3000.0
+MIN_SUCCESS_ESTIMATE = 0.05
+# "weighted" strategy picks proportionally to score ** -exponent
+SCORE_WEIGHT_EXPONENT = 2.0
+
+# Circuit breaker: open after consecutive failures, cooldown doubles per re-open
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_COOLDOWN_SECONDS = 30.0
+BREAKER_MAX_COOLDOWN_SECONDS = 30 * 60.0
+# A half-open probe whose outcome never arrives is retried after this long
+BREAKER_PROBE_TIMEOUT_SECONDS = 60.0
+# Share of picks handed to half-open proxies as live-traffic probes
+BREAKER_PROBE_SHARE = 0.2
+
+# Health probes: a 204 endpoint on the same edge as the scrape, not the full homepage
+HEALTH_PROBE_URL = "https://www.youtube.com/generate_204"
+HEALTH_CHECK_CONCURRENCY = 10
+
+# Shared snapshot: format version and the minimum gap between writes per isolate
+SNAPSHOT_VERSION = 1
+SNAPSHOT_WRITE_INTERVAL_SECONDS = 60.0
+# Removals travel in the snapshot as tombstones so other isolates don't merge them back
+REMOVAL_TOMBSTONE_TTL_SECONDS = 6 * 60 * 60
+REMOVAL_TOMBSTONE_MAX = 5_000
+_BREAKER_CODES = {BREAKER_CLOSED: 0, BREAKER_OPEN: 1, BREAKER_HALF_OPEN: 2}
+_BREAKER_STATES = {code: state for state, code in _BREAKER_CODES.items()}
+
+# After a refresh that fetched nothing, wait this long before the scheduler retries
+REFRESH_RETRY_SECONDS = 60.0
+
+# Fetched proxies wait in quarantine until a probe passes; at most this many at once
+QUARANTINE_MAX = 500
+# Free-list candidates go stale fast; ones still waiting after this long are dropped unprobed
+QUARANTINE_MAX_AGE_SECONDS = 15 * 60
+# Candidates that failed their probe are not re-quarantined for this long
+REJECTED_TTL_SECONDS = 6 * 60 * 60
+REJECTED_MAX_ENTRIES = 20_000
+# A cold pool waits this long for its first promoted proxy before giving up
+FIRST_PROMOTION_WAIT_SECONDS = 5.0
+
+
+@dataclass
+class CircuitBreaker:
+    """Per-proxy breaker: closed -> open on repeated failures, half-open probe to recover."""
+    state: str = BREAKER_CLOSED
+    consecutive_failures: int = 0
+    trips: int = 0
+    retry_at: Optional[float] = None  # time.monotonic() when the breaker next needs attention
+    probe_in_flight: bool = False
+    
+    @property
+    def cooldown_seconds(self) -> float:
+        return min(BREAKER_BASE_COOLDOWN_SECONDS * 2 ** max(self.trips - 1, 0), BREAKER_MAX_COOLDOWN_SECONDS)
+    
+    def record_success(self) -> Optional[str]:
+        """Close the breaker; return the transition name if the state changed."""
+        previous = self.state
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.retry_at = None
+        self.probe_in_flight = False
+        return f"{previous}->{BREAKER_CLOSED}" if previous != BREAKER_CLOSED else None
+    
+    def record_failure(self, now: float) -> Optional[str]:
+        """Count a failure; return the transition name if the breaker opened."""
+        self.consecutive_failures += 1
+        if self.state == BREAKER_HALF_OPEN or (
+            self.state == BREAKER_CLOSED and self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD
+        ):
+            previous = self.state
+            self.state = BREAKER_OPEN
+            self.trips += 1
+            self.probe_in_flight = False
+            self.retry_at = now + self.cooldown_seconds
+            return f"{previous}->{BREAKER_OPEN}"
+        return None
+    
+    def half_open(self) -> str:
+        self.state = BREAKER_HALF_OPEN
+        self.probe_in_flight = False
+        self.retry_at = None
+        return f"{BREAKER_OPEN}->{BREAKER_HALF_OPEN}"
+    
+    def start_probe(self, now: float) -> None:
+        self.probe_in_flight = True
+        self.retry_at = now + BREAKER_PROBE_TIMEOUT_SECONDS
+
 
 @dataclass
 class ProxyEntry:
@@ -27,6 +134,51 @@ class ProxyEntry:
     last_success: Optional[datetime] = None
     last_failure: Optional[datetime] = None
     is_active: bool = True
+    ewma_success: float = PRIOR_SUCCESS
+    ewma_latency_ms: float = PRIOR_LATENCY_MS
+    last_observed: Optional[float] = None  # time.monotonic() of the last EWMA update
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    health_checked_at: Optional[float] = None  # time.monotonic() of the last health probe
+    # Counts already present in the shared snapshot; anything above them is this isolate's delta
+    synced_success: int = 0
+    synced_failure: int = 0
+    
+    def _decay_weight(self, now: float) -> float:
+        if self.last_observed is None:
+            return 0.0
+        return 0.5 ** (max(0.0, now - self.last_observed) / EWMA_HALF_LIFE_SECONDS)
+    
+    def decayed_estimates(self, now: Optional[float] = None) -> tuple[float, float]:
+        """Return (success, latency_ms) estimates, decayed toward the priors by age."""
+        weight = self._decay_weight(time.monotonic() if now is None else now)
+        success = PRIOR_SUCCESS + (self.ewma_success - PRIOR_SUCCESS) * weight
+        latency = PRIOR_LATENCY_MS + (self.ewma_latency_ms - PRIOR_LATENCY_MS) * weight
+        return success, latency
+    
+    def observe(self, success: bool, latency_ms: Optional[float] = None, now: Optional[float] = None) -> None:
+        """Fold one outcome into the EWMA estimates."""
+        now = time.monotonic() if now is None else now
+        decayed_success, decayed_latency = self.decayed_estimates(now)
+        self.ewma_success = (1 - EWMA_ALPHA) * decayed_success + EWMA_ALPHA * (1.0 if success else 0.0)
+        if latency_ms is not None:
+            self.ewma_latency_ms = (1 - EWMA_ALPHA) * decayed_latency + EWMA_ALPHA * latency_ms
+        else:
+            self.ewma_latency_ms = decayed_latency
+        self.last_observed = now
+    
+    def score(self, now: Optional[float] = None) -> float:
+        """Expected latency per successful request; lower is better."""
+        success, latency = self.decayed_estimates(now)
+        return latency / max(success, MIN_SUCCESS_ESTIMATE)
+    
+    @property
+    def last_checked(self) -> float:
+        """Most recent evidence about this proxy, from a probe or live traffic."""
+        return max(self.health_checked_at or float("-inf"), self.last_observed or float("-inf"))
+    
+    def selection_weight(self, now: Optional[float] = None) -> float:
+        """Relative pick probability for the "weighted" strategy."""
+        return max(self.score(now), 1.0) ** -SCORE_WEIGHT_EXPONENT
     
     @property
     def success_rate(self) -> float:
@@ -44,53 +196,164 @@ class ProxyPoolManager:
     """Manages a pool of free proxies with health checking."""
     
     def __init__(self) -> None:
-        self.proxies: Dict[str, ProxyEntry] = {}
+        self._proxies: Dict[str, ProxyEntry] = {}
+        self._index = ProxySelectionIndex()
+        self._breaker_timers: List[Tuple[float, str]] = []
+        self._probe_queue: Deque[str] = deque()
+        self._breaker_transitions: Dict[str, int] = {}
+        self._health_check_running = False
+        self._quarantine: Dict[str, float] = {}  # url -> time.monotonic() when quarantined
+        self._rejected: Dict[str, float] = {}  # url -> time.monotonic() when rejected
+        self._removed: Dict[str, float] = {}  # url -> time.time() when removed; shared via the snapshot
+        self._quarantine_progress = asyncio.Event()  # set on each promotion and when validation ends
+        self.funnel: Dict[str, int] = {
+            "fetched": 0,
+            "skipped_known": 0,
+            "skipped_rejected": 0,
+            "quarantined": 0,
+            "promoted": 0,
+            "rejected": 0,
+            "expired": 0,
+        }
+        self._mutations = 0
+        self._saved_mutations = 0
+        self._exported_mutations = 0
+        self._last_snapshot_save: Optional[float] = None
         self.last_fetch: Optional[datetime] = None
         self.last_health_check: Optional[datetime] = None
-        self.rotation_index: int = 0
         self._lock = asyncio.Lock()
         self._sync_lock = threading.Lock()
         
-        # Hardcoded configuration values
-        self.fetch_interval = 60 * 60  # 60 minutes
-        self.health_check_interval = 30 * 60  # 30 minutes
-        self.max_proxies = 50
-        self.health_check_timeout = 5.0
-        self.min_success_rate = 0.3
-        self.rotation_strategy = 'random'
+        self.fetch_interval = settings.youtube_scraper_proxy_fetch_interval_minutes * 60
+        self.health_check_interval = settings.youtube_scraper_proxy_health_check_interval_minutes * 60
+        self.max_proxies = settings.youtube_scraper_max_free_proxies
+        self.health_check_timeout = settings.youtube_scraper_proxy_health_check_timeout
+        self.min_success_rate = settings.youtube_scraper_proxy_min_success_rate
+        self.rotation_strategy = settings.youtube_scraper_proxy_rotation_strategy
+        self.scheduler = PoolRefreshScheduler(self)
         
         # Load manual proxies from settings
         manual_proxies = getattr(settings, 'youtube_scraper_proxy_pool', []) or []
         for proxy_url in manual_proxies:
             normalized = normalize_proxy_url(proxy_url)
             if normalized:
-                self.proxies[normalized] = ProxyEntry(url=normalized)
+                self._add_proxy(ProxyEntry(url=normalized))
+    
+    @property
+    def proxies(self) -> Dict[str, ProxyEntry]:
+        """All known proxies; mutate through the manager so the selection index stays in sync."""
+        return self._proxies
+    
+    @proxies.setter
+    def proxies(self, value: Dict[str, ProxyEntry]) -> None:
+        with self._sync_lock:
+            self._proxies = dict(value)
+            self._index.clear()
+            self._breaker_timers = []
+            self._probe_queue.clear()
+            for entry in self._proxies.values():
+                self._reindex(entry)
+                self._schedule_breaker(entry)
+    
+    def _reindex(self, entry: ProxyEntry, now: Optional[float] = None) -> None:
+        """Push one entry's current health and scores into the selection index."""
+        self._mutations += 1
+        self._index.update(
+            entry.url,
+            active=entry.is_active and entry.breaker.state == BREAKER_CLOSED,
+            weight=entry.selection_weight(now),
+            best_key=(-entry.success_rate, -entry.total_attempts),
+            last_used=entry.last_used,
+        )
+    
+    def _add_proxy(self, entry: ProxyEntry) -> None:
+        self._removed.pop(entry.url, None)
+        self._proxies[entry.url] = entry
+        self._reindex(entry)
+    
+    def _remove_proxy(self, url: str, removed_at: Optional[float] = None) -> None:
+        self._mutations += 1
+        self._proxies.pop(url, None)
+        self._index.remove(url)
+        self._tombstone(url, time.time() if removed_at is None else removed_at)
+    
+    def _tombstone(self, url: str, removed_at: float) -> None:
+        """Remember a removal (epoch seconds) so snapshot merges don't resurrect the proxy."""
+        if removed_at <= self._removed.get(url, 0.0):
+            return
+        self._removed.pop(url, None)
+        if len(self._removed) >= REMOVAL_TOMBSTONE_MAX:
+            self._removed.pop(next(iter(self._removed)))
+        self._removed[url] = removed_at
+    
+    def _expire_tombstones(self, now: float) -> None:
+        for url, removed_at in list(self._removed.items()):
+            if now - removed_at >= REMOVAL_TOMBSTONE_TTL_SECONDS:
+                del self._removed[url]
+    
+    def _schedule_breaker(self, entry: ProxyEntry) -> None:
+        breaker = entry.breaker
+        if breaker.retry_at is not None:
+            heapq.heappush(self._breaker_timers, (breaker.retry_at, entry.url))
+        elif breaker.state == BREAKER_HALF_OPEN:
+            self._probe_queue.append(entry.url)
+    
+    def _record_transition(self, entry: ProxyEntry, transition: Optional[str]) -> None:
+        if not transition:
+            return
+        self._breaker_transitions[transition] = self._breaker_transitions.get(transition, 0) + 1
+        logger.info(
+            f"Proxy circuit breaker {transition}: {entry.url[:50]} "
+            f"(failures={entry.breaker.consecutive_failures}, cooldown={entry.breaker.cooldown_seconds:.0f}s)"
+        )
+        self._schedule_breaker(entry)
+    
+    def _promote_breakers(self, now: float) -> None:
+        """Move open breakers whose cooldown ended to half-open and requeue stale probes."""
+        timers = self._breaker_timers
+        while timers and timers[0][0] <= now:
+            due, url = heapq.heappop(timers)
+            entry = self.proxies.get(url)
+            if entry is None or entry.breaker.retry_at != due:
+                continue  # Superseded by a later transition
+            if entry.breaker.state == BREAKER_OPEN:
+                self._record_transition(entry, entry.breaker.half_open())
+            elif entry.breaker.probe_in_flight:
+                entry.breaker.probe_in_flight = False
+                entry.breaker.retry_at = None
+                self._probe_queue.append(url)
+    
+    def _next_probe(self, now: float) -> Optional[str]:
+        while self._probe_queue:
+            url = self._probe_queue.popleft()
+            entry = self.proxies.get(url)
+            if entry is None or entry.breaker.state != BREAKER_HALF_OPEN or entry.breaker.probe_in_flight:
+                continue
+            entry.breaker.start_probe(now)
+            self._schedule_breaker(entry)
+            return url
+        return None
     
     async def _check_proxy_health(self, proxy_url: str) -> bool:
-        """Check if a proxy is working by testing it against YouTube."""
+        """Check if a proxy can reach YouTube's edge within the probe timeout."""
         try:
             async with httpx.AsyncClient(
+                proxy=proxy_url,
                 timeout=self.health_check_timeout,
                 verify=False,  # Free proxies often have SSL issues
             ) as client:
-                # Test with a simple YouTube request
-                proxy_dict = {"http://": proxy_url, "https://": proxy_url}
-                response = await client.get(
-                    "https://www.youtube.com",
-                    follow_redirects=True,
-                    proxies=proxy_dict,
-                )
-                return response.status_code == 200
+                response = await client.get(HEALTH_PROBE_URL)
+                return response.status_code in (200, 204)
         except Exception as e:
             logger.debug(f"Proxy health check failed for {proxy_url}: {str(e)}")
             return False
     
-    async def refresh_pool(self) -> None:
-        """Fetch new proxies and add them to the pool."""
+    async def refresh_pool(self, *, force: bool = False) -> None:
+        """Fetch new proxies into quarantine; validate_quarantine() promotes them."""
         current_time = datetime.now(timezone.utc)
         
         # Check if we need to refresh
-        if self.last_fetch:
+        if not force and self.last_fetch:
             elapsed = (current_time - self.last_fetch).total_seconds()
             if elapsed < self.fetch_interval:
                 return
@@ -101,148 +364,532 @@ class ProxyPoolManager:
                 new_proxies = await fetch_all_free_proxies(timeout=10.0)
                 logger.info(f"Fetched {len(new_proxies)} proxies from sources")
                 added_count = 0
+                now = time.monotonic()
                 
-                for proxy_url in new_proxies:
-                    normalized = normalize_proxy_url(proxy_url)
-                    if not normalized:
-                        continue
-                    
-                    # Don't add if we already have it
-                    if normalized in self.proxies:
-                        continue
-                    
-                    # Don't exceed max proxies
-                    if len(self.proxies) >= self.max_proxies:
-                        break
-                    
-                    # Add proxy (will be validated on first use)
-                    self.proxies[normalized] = ProxyEntry(url=normalized)
-                    added_count += 1
+                with self._sync_lock:
+                    self._expire_quarantine(now)
+                    for proxy_url in new_proxies:
+                        normalized = normalize_proxy_url(proxy_url)
+                        if not normalized:
+                            continue
+                        self.funnel["fetched"] += 1
+                        
+                        # Don't add if we already have it
+                        if normalized in self.proxies or normalized in self._quarantine:
+                            self.funnel["skipped_known"] += 1
+                            if normalized in self.proxies:
+                                discard_proxy_origin(normalized)
+                            continue
+                        rejected_at = self._rejected.get(normalized)
+                        if rejected_at is not None and now - rejected_at < REJECTED_TTL_SECONDS:
+                            self.funnel["skipped_rejected"] += 1
+                            discard_proxy_origin(normalized)
+                            continue
+                        
+                        if len(self._quarantine) >= QUARANTINE_MAX:
+                            # Never probed, so it says nothing about its source's yield
+                            discard_proxy_origin(normalized)
+                            continue
+                        
+                        # Held back from rotation until a probe passes
+                        self._quarantine[normalized] = now
+                        self.funnel["quarantined"] += 1
+                        added_count += 1
                 
                 self.last_fetch = current_time
-                logger.info(f"Added {added_count} new proxies to pool (total: {len(self.proxies)})")
+                logger.info(f"Quarantined {added_count} new proxies (quarantine: {len(self._quarantine)}, pool: {len(self.proxies)})")
         except Exception as e:
             logger.error(f"Error refreshing proxy pool: {str(e)}", exc_info=True)
     
+    async def validate_quarantine(self) -> None:
+        """Probe quarantined candidates concurrently, promoting each one as it passes."""
+        with self._sync_lock:
+            self._expire_quarantine(time.monotonic())
+            candidates = list(self._quarantine)
+        if not candidates:
+            return
+        semaphore = asyncio.Semaphore(HEALTH_CHECK_CONCURRENCY)
+        
+        async def probe(proxy_url: str) -> None:
+            async with semaphore:
+                if proxy_url not in self._quarantine:
+                    return  # Merged in from a snapshot meanwhile
+                if len(self.proxies) >= self.max_proxies:
+                    return  # Stay quarantined until the pool has room or the candidate expires
+                is_working = await self._check_proxy_health(proxy_url)
+            self._finish_quarantine(proxy_url, is_working)
+        
+        await asyncio.gather(*(probe(url) for url in candidates))
+        self._quarantine_progress.set()
+        logger.info(
+            f"Quarantine validation done: {self.funnel['promoted']} promoted, "
+            f"{self.funnel['rejected']} rejected, {len(self._quarantine)} waiting"
+        )
+    
+    def _expire_quarantine(self, now: float) -> None:
+        """Drop candidates that waited in quarantine longer than QUARANTINE_MAX_AGE_SECONDS."""
+        for proxy_url, quarantined_at in list(self._quarantine.items()):
+            if now - quarantined_at >= QUARANTINE_MAX_AGE_SECONDS:
+                del self._quarantine[proxy_url]
+                self.funnel["expired"] += 1
+                discard_proxy_origin(proxy_url)
+    
+    def _finish_quarantine(self, proxy_url: str, is_working: bool) -> None:
+        with self._sync_lock:
+            quarantined_at = self._quarantine.pop(proxy_url, None)
+            if quarantined_at is None:
+                return
+            if not is_working:
+                self.funnel["rejected"] += 1
+                record_proxy_rejected(proxy_url)
+                if len(self._rejected) >= REJECTED_MAX_ENTRIES:
+                    self._rejected.pop(next(iter(self._rejected)))
+                self._rejected[proxy_url] = time.monotonic()
+                return
+            if proxy_url in self.proxies:
+                discard_proxy_origin(proxy_url)  # Already merged in from a snapshot
+                return
+            if len(self.proxies) >= self.max_proxies:
+                self._quarantine[proxy_url] = quarantined_at  # Pool filled up meanwhile; retry until it expires
+                return
+            entry = ProxyEntry(
+                url=proxy_url,
+                success_count=1,
+                last_success=datetime.now(timezone.utc),
+                health_checked_at=time.monotonic(),
+            )
+            self._add_proxy(entry)
+            self.funnel["promoted"] += 1
+            record_proxy_working(proxy_url)
+        self._quarantine_progress.set()
+    
+    async def wait_for_promotion(self, timeout: float) -> bool:
+        """Wait until the pool has a proxy, validation has nothing left, or timeout."""
+        deadline = time.monotonic() + timeout
+        while not self.proxies and self._quarantine:
+            self._quarantine_progress.clear()
+            try:
+                await asyncio.wait_for(self._quarantine_progress.wait(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+        return bool(self.proxies)
+    
     async def validate_proxy(self, proxy_url: str) -> bool:
         """Validate a single proxy."""
         return await self._check_proxy_health(proxy_url)
     
-    async def health_check_all(self) -> None:
-        """Perform health check on all proxies."""
+    async def health_check_all(self, *, force: bool = False) -> None:
+        """Probe stale proxies with bounded concurrency, applying each result as it lands.
+        
+        Probes run without the pool lock; results are applied under it so they
+        cannot interleave with a refresh.
+        """
         current_time = datetime.now(timezone.utc)
         
         # Check if we need to health check
-        if self.last_health_check:
+        if not force and self.last_health_check:
             elapsed = (current_time - self.last_health_check).total_seconds()
             if elapsed < self.health_check_interval:
                 return
+        if self._health_check_running:
+            return
         
-        async with self._lock:
-            logger.info(f"Performing health check on {len(self.proxies)} proxies...")
+        self._health_check_running = True
+        try:
+            now = time.monotonic()
+            with self._sync_lock:
+                # Live traffic counts as a check; probe the stalest proxies first
+                stale = sorted(
+                    (p for p in self.proxies.values() if now - p.last_checked >= self.health_check_interval),
+                    key=lambda p: p.last_checked,
+                )
+                stale_urls = [p.url for p in stale]
+            logger.info(f"Performing health check on {len(stale_urls)}/{len(self.proxies)} stale proxies...")
+            
+            semaphore = asyncio.Semaphore(HEALTH_CHECK_CONCURRENCY)
             working_count = 0
             
-            # Check proxies concurrently (limit to 10 at a time)
-            proxy_list = list(self.proxies.values())
-            for i in range(0, len(proxy_list), 10):
-                batch = proxy_list[i:i + 10]
-                tasks = [self._check_proxy_health(proxy.url) for proxy in batch]
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for proxy, is_working in zip(batch, results):
-                    if isinstance(is_working, Exception) or not is_working:
-                        proxy.is_active = False
-                        proxy.last_failure = current_time
-                        proxy.failure_count += 1
-                    else:
-                        proxy.is_active = True
-                        proxy.last_success = current_time
-                        proxy.success_count += 1
+            async def probe(proxy_url: str) -> None:
+                nonlocal working_count
+                async with semaphore:
+                    is_working = await self._check_proxy_health(proxy_url)
+                async with self._lock:
+                    if self._apply_health_result(proxy_url, is_working):
                         working_count += 1
             
-            # Remove proxies with low success rate
-            to_remove = []
-            for url, proxy in self.proxies.items():
-                if proxy.total_attempts >= 5 and proxy.success_rate < self.min_success_rate:
-                    to_remove.append(url)
-            
-            for url in to_remove:
-                del self.proxies[url]
-                logger.debug(f"Removed proxy with low success rate: {url}")
+            await asyncio.gather(*(probe(url) for url in stale_urls))
             
-            self.last_health_check = current_time
-            logger.info(f"Health check complete: {working_count}/{len(self.proxies)} proxies working")
+            async with self._lock:
+                with self._sync_lock:
+                    # Weights only move on observation; refresh decayed ones and shed float drift
+                    now = time.monotonic()
+                    for proxy in self.proxies.values():
+                        self._reindex(proxy, now)
+                    self._index.rebuild_weights()
+                self.last_health_check = current_time
+            logger.info(f"Health check complete: {working_count}/{len(stale_urls)} probed proxies working")
+        finally:
+            self._health_check_running = False
+    
+    def _apply_health_result(self, proxy_url: str, is_working: bool) -> bool:
+        """Record one probe result; drop the proxy if its success rate has fallen too low."""
+        with self._sync_lock:
+            proxy = self.proxies.get(proxy_url)
+            if proxy is None:
+                return False  # Removed while the probe was in flight
+            proxy.health_checked_at = time.monotonic()
+            if is_working:
+                proxy.is_active = True
+                proxy.last_success = datetime.now(timezone.utc)
+                proxy.success_count += 1
+                record_proxy_working(proxy_url)
+            else:
+                proxy.is_active = False
+                proxy.last_failure = datetime.now(timezone.utc)
+                proxy.failure_count += 1
+                if proxy.total_attempts >= 5 and proxy.success_rate < self.min_success_rate:
+                    self._remove_proxy(proxy_url)
+                    logger.debug(f"Removed proxy with low success rate: {proxy_url}")
+                    return False
+            self._reindex(proxy)
+            return is_working
     
     def get_next_proxy(self) -> Optional[str]:
         """Get the next proxy to use based on rotation strategy."""
         with self._sync_lock:
-            active_proxies = [
-                proxy for proxy in self.proxies.values()
-                if proxy.is_active
-            ]
-            
-            if not active_proxies:
-                active_proxies = list(self.proxies.values())
-            
-            if not active_proxies:
-                return None
-            
-            if self.rotation_strategy == "random":
-                proxy = random.choice(active_proxies)
+            now = time.monotonic()
+            self._promote_breakers(now)
+            index = self._index
+            url = None
+            if self._probe_queue and (not index or random.random() < BREAKER_PROBE_SHARE):
+                url = self._next_probe(now)
+            if url is not None:
+                pass  # Live-traffic probe of a half-open proxy
+            elif not index:
+                # Every proxy is inactive or tripped. Inactive ones with a closed breaker may
+                # have recovered since their health check; tripped ones sit out their cooldown,
+                # and with none of the former the caller falls back to manual proxies or direct
+                closed = [u for u, p in self.proxies.items() if p.breaker.state == BREAKER_CLOSED]
+                if not closed:
+                    return None
+                url = random.choice(closed)
+            elif self.rotation_strategy == "random":
+                url = index.random_choice()
             elif self.rotation_strategy == "round_robin":
-                proxy = active_proxies[self.rotation_index % len(active_proxies)]
-                self.rotation_index += 1
+                url = index.next_round_robin()
+            elif self.rotation_strategy == "weighted":
+                url = index.weighted_choice()
+            elif self.rotation_strategy == "p2c":
+                # Power of two choices: sample two, keep the better score
+                candidates = index.sample(2)
+                url = min(candidates, key=lambda u: self.proxies[u].score(now))
             elif self.rotation_strategy == "best":
-                proxy = max(
-                    active_proxies,
-                    key=lambda p: (p.success_rate, p.total_attempts)
-                )
+                url = index.best()
             else:
-                proxy = min(
-                    active_proxies,
-                    key=lambda p: p.last_used or datetime.min.replace(tzinfo=timezone.utc)
-                )
+                url = index.least_recently_used()
             
+            proxy = self.proxies[url]
             proxy.last_used = datetime.now(timezone.utc)
-            return proxy.url
+            index.touch(url, proxy.last_used)
+            return url
     
-    def mark_proxy_success(self, proxy_url: str) -> None:
-        """Mark a proxy as successful."""
+    def mark_proxy_success(self, proxy_url: str, latency_ms: Optional[float] = None) -> None:
+        """Mark a proxy as successful, optionally with the observed request latency."""
         with self._sync_lock:
             if proxy_url in self.proxies:
                 proxy = self.proxies[proxy_url]
                 proxy.success_count += 1
                 proxy.last_success = datetime.now(timezone.utc)
                 proxy.is_active = True
+                proxy.observe(True, latency_ms)
+                record_proxy_working(proxy_url)
+                self._record_transition(proxy, proxy.breaker.record_success())
+                self._reindex(proxy)
     
-    def mark_proxy_failure(self, proxy_url: str) -> None:
-        """Mark a proxy as failed."""
+    def mark_proxy_failure(self, proxy_url: str, latency_ms: Optional[float] = None) -> None:
+        """Mark a proxy as failed, optionally with the time spent before failing."""
         with self._sync_lock:
             if proxy_url in self.proxies:
                 proxy = self.proxies[proxy_url]
                 proxy.failure_count += 1
                 proxy.last_failure = datetime.now(timezone.utc)
-                # Don't immediately mark as inactive, let health check decide
+                proxy.observe(False, latency_ms)
+                # is_active stays with the health check; the breaker handles short-term exclusion
+                self._record_transition(proxy, proxy.breaker.record_failure(time.monotonic()))
+                self._reindex(proxy)
+    
+    def snapshot_due(self, now: Optional[float] = None) -> bool:
+        """True when local changes exist and the write interval has passed."""
+        now = time.monotonic() if now is None else now
+        if self._mutations == self._saved_mutations:
+            return False
+        return self._last_snapshot_save is None or now - self._last_snapshot_save >= SNAPSHOT_WRITE_INTERVAL_SECONDS
+    
+    def export_snapshot(self) -> Dict[str, Any]:
+        """Serialize entries compactly, with monotonic times converted to epoch seconds.
+        
+        Each proxy is a row: [url, successes, failures, ewma_success, ewma_latency_ms,
+        observed_at, health_checked_at, active, breaker_state, consecutive_failures,
+        breaker_trips, breaker_retry_at]; missing times are 0. Removed proxies are
+        listed as [url, removed_at] tombstones until REMOVAL_TOMBSTONE_TTL_SECONDS.
+        """
+        with self._sync_lock:
+            self._exported_mutations = self._mutations
+            self._expire_tombstones(time.time())
+            to_epoch = _epoch_converter()
+            rows = []
+            for p in self.proxies.values():
+                breaker = p.breaker
+                rows.append([
+                    p.url,
+                    p.success_count,
+                    p.failure_count,
+                    round(p.ewma_success, 4),
+                    round(p.ewma_latency_ms, 1),
+                    to_epoch(p.last_observed),
+                    to_epoch(p.health_checked_at),
+                    int(p.is_active),
+                    _BREAKER_CODES[breaker.state],
+                    breaker.consecutive_failures,
+                    breaker.trips,
+                    to_epoch(breaker.retry_at),
+                ])
+            return {
+                "v": SNAPSHOT_VERSION,
+                "savedAt": round(time.time(), 1),
+                "lastFetch": self.last_fetch.isoformat() if self.last_fetch else None,
+                "lastHealthCheck": self.last_health_check.isoformat() if self.last_health_check else None,
+                "proxies": rows,
+                "removed": [[url, round(removed_at, 1)] for url, removed_at in self._removed.items()],
+            }
+    
+    def merge_snapshot(self, snapshot: Dict[str, Any]) -> int:
+        """Fold a shared snapshot into the local pool; return how many proxies were added.
+        
+        Counts become the snapshot's plus this isolate's unsynced delta. EWMA scores,
+        health and breaker state follow whichever side has the most recent evidence.
+        A removal on either side wins over entries with no evidence newer than it.
+        """
+        if not snapshot or snapshot.get("v") != SNAPSHOT_VERSION:
+            return 0
+        added = 0
+        with self._sync_lock:
+            to_epoch = _epoch_converter()
+            to_monotonic = _monotonic_converter()
+            for tombstone in snapshot.get("removed") or []:
+                try:
+                    url, removed_at = tombstone
+                except (TypeError, ValueError):
+                    continue
+                self._tombstone(url, removed_at)
+            self._expire_tombstones(time.time())
+            for row in snapshot.get("proxies") or []:
+                try:
+                    (url, successes, failures, ewma_success, ewma_latency, observed_at, checked_at,
+                     active, breaker_code, consecutive_failures, trips, retry_at) = row
+                except (TypeError, ValueError):
+                    continue
+                remote_evidence = max(observed_at, checked_at)
+                removed_at = self._removed.get(url)
+                if removed_at is not None:
+                    if remote_evidence <= removed_at:
+                        continue
+                    del self._removed[url]  # Re-admitted after the removal
+                entry = self.proxies.get(url)
+                if entry is None:
+                    if len(self.proxies) >= self.max_proxies:
+                        continue
+                    total = successes + failures
+                    if total >= 5 and successes / total < self.min_success_rate:
+                        continue  # Would be dropped by the next health check anyway
+                    entry = ProxyEntry(url=url)
+                    self._proxies[url] = entry
+                    added += 1
+                    if self._quarantine.pop(url, None) is not None:
+                        discard_proxy_origin(url)  # Another isolate already vetted it
+                entry.success_count = successes + (entry.success_count - entry.synced_success)
+                entry.failure_count = failures + (entry.failure_count - entry.synced_failure)
+                entry.synced_success, entry.synced_failure = successes, failures
+                local_evidence = max(to_epoch(entry.last_observed), to_epoch(entry.health_checked_at))
+                if remote_evidence > local_evidence:
+                    entry.ewma_success = ewma_success
+                    entry.ewma_latency_ms = ewma_latency
+                    entry.last_observed = to_monotonic(observed_at)
+                    entry.health_checked_at = to_monotonic(checked_at)
+                    entry.is_active = bool(active)
+                    entry.breaker = CircuitBreaker(
+                        state=_BREAKER_STATES.get(breaker_code, BREAKER_CLOSED),
+                        consecutive_failures=consecutive_failures,
+                        trips=trips,
+                        retry_at=to_monotonic(retry_at),
+                    )
+                    self._schedule_breaker(entry)
+                self._reindex(entry)
+            for url, removed_at in list(self._removed.items()):
+                entry = self._proxies.get(url)
+                if entry is None:
+                    continue
+                if max(to_epoch(entry.last_observed), to_epoch(entry.health_checked_at)) <= removed_at:
+                    self._remove_proxy(url, removed_at)
+                else:
+                    del self._removed[url]  # Re-admitted here after the removal
+            self.last_fetch = _latest(self.last_fetch, snapshot.get("lastFetch"))
+            self.last_health_check = _latest(self.last_health_check, snapshot.get("lastHealthCheck"))
+        return added
+    
+    def mark_snapshot_saved(self, snapshot: Dict[str, Any]) -> None:
+        """Record that snapshot (exported after a merge) is now the shared state."""
+        with self._sync_lock:
+            for url, successes, failures, *_ in snapshot.get("proxies") or []:
+                entry = self.proxies.get(url)
+                if entry is not None:
+                    entry.synced_success, entry.synced_failure = successes, failures
+            self._saved_mutations = self._exported_mutations
+            self._last_snapshot_save = time.monotonic()
     
     def get_pool_stats(self) -> Dict[str, Any]:
         """Get statistics about the proxy pool."""
         with self._sync_lock:
             active = sum(1 for p in self.proxies.values() if p.is_active)
+            breaker_states = {BREAKER_CLOSED: 0, BREAKER_OPEN: 0, BREAKER_HALF_OPEN: 0}
+            for proxy in self.proxies.values():
+                breaker_states[proxy.breaker.state] += 1
             total = len(self.proxies)
             avg_success_rate = (
                 sum(p.success_rate for p in self.proxies.values()) / total
                 if total > 0 else 0.0
             )
+            now = time.monotonic()
+            observed = [p for p in self.proxies.values() if p.last_observed is not None]
+            avg_ewma_latency = (
+                sum(p.decayed_estimates(now)[1] for p in observed) / len(observed)
+                if observed else None
+            )
             return {
                 "total_proxies": total,
                 "active_proxies": active,
                 "inactive_proxies": total - active,
                 "average_success_rate": avg_success_rate,
+                "rotation_strategy": self.rotation_strategy,
+                "observed_proxies": len(observed),
+                "breaker_states": breaker_states,
+                "breaker_transitions": dict(self._breaker_transitions),
+                "average_ewma_latency_ms": avg_ewma_latency,
                 "last_fetch": self.last_fetch.isoformat() if self.last_fetch else None,
                 "last_health_check": self.last_health_check.isoformat() if self.last_health_check else None,
+                "scheduler": dict(self.scheduler.stats),
+                "quarantine": {"waiting": len(self._quarantine), **self.funnel},
             }
 
 
+class PoolRefreshScheduler:
+    """Single-flight background maintenance for one ProxyPoolManager.
+    
+    Refreshes, health checks and snapshot syncs run on the manager's configured
+    intervals. Each kind of job has at most one run in flight; callers that need
+    it meanwhile await the same task instead of starting another.
+    """
+    
+    def __init__(self, manager: ProxyPoolManager) -> None:
+        self.manager = manager
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._refresh_retry_at = 0.0
+        self.stats: Dict[str, int] = {}
+    
+    def _start(self, name: str, factory) -> asyncio.Task:
+        task = self._tasks.get(name)
+        if task is None or task.done():
+            task = self._tasks[name] = asyncio.create_task(factory())
+            self.stats[f"{name}_runs"] = self.stats.get(f"{name}_runs", 0) + 1
+        else:
+            self.stats[f"{name}_coalesced"] = self.stats.get(f"{name}_coalesced", 0) + 1
+        return task
+    
+    async def _shared(self, name: str, factory) -> None:
+        # A cancelled waiter must not cancel the run other waiters share
+        await asyncio.shield(self._start(name, factory))
+    
+    async def refresh(self, *, force: bool = False) -> None:
+        """Fetch new proxies, joining a refresh that is already in flight.
+        
+        Fetched proxies land in quarantine; their validation continues in the
+        background after this returns.
+        """
+        async def run() -> None:
+            await self.manager.refresh_pool(force=force)
+            if self._refresh_due():
+                self._refresh_retry_at = time.monotonic() + REFRESH_RETRY_SECONDS
+            self._start("validate", self.manager.validate_quarantine)
+        await self._shared("refresh", run)
+    
+    async def ensure_populated(self) -> None:
+        """Fill an empty pool: warm-start from the shared snapshot, else fetch now.
+        
+        A fresh fetch returns once the first candidate passes validation (or after
+        FIRST_PROMOTION_WAIT_SECONDS); the rest keep validating in the background.
+        """
+        if self.manager.proxies:
+            return
+        
+        async def run() -> None:
+            if not await warm_start_pool(self.manager):
+                await self.refresh(force=True)
+                await self.manager.wait_for_promotion(FIRST_PROMOTION_WAIT_SECONDS)
+        await self._shared("populate", run)
+    
+    def _refresh_due(self) -> bool:
+        return _interval_elapsed(self.manager.last_fetch, self.manager.fetch_interval)
+    
+    def _health_check_due(self) -> bool:
+        return bool(self.manager.proxies) and _interval_elapsed(
+            self.manager.last_health_check, self.manager.health_check_interval
+        )
+    
+    def schedule(self) -> None:
+        """Start background maintenance if any job is due; a no-op otherwise."""
+        if self._maintenance_task is not None and not self._maintenance_task.done():
+            return
+        refresh_due = self._refresh_due() and time.monotonic() >= self._refresh_retry_at
+        if not (refresh_due or self._health_check_due() or self.manager.snapshot_due()):
+            return
+        self._maintenance_task = asyncio.create_task(self._maintain(refresh_due))
+    
+    async def _maintain(self, refresh_due: bool) -> None:
+        try:
+            if refresh_due:
+                await self.refresh()
+            if self._health_check_due():
+                await self._shared("health_check", self.manager.health_check_all)
+            await sync_pool_snapshot(self.manager)
+        except Exception as e:
+            logger.error(f"Proxy pool maintenance failed: {str(e)}", exc_info=True)
+
+
+def _interval_elapsed(last: Optional[datetime], interval_seconds: float) -> bool:
+    return last is None or (datetime.now(timezone.utc) - last).total_seconds() >= interval_seconds
+
+
+def _epoch_converter():
+    offset = time.time() - time.monotonic()
+    return lambda monotonic: round(monotonic + offset, 3) if monotonic is not None else 0
+
+
+def _monotonic_converter():
+    offset = time.time() - time.monotonic()
+    return lambda epoch: epoch - offset if epoch else None
+
+
+def _latest(current: Optional[datetime], remote: Optional[str]) -> Optional[datetime]:
+    try:
+        remote_dt = datetime.fromisoformat(remote) if remote else None
+    except ValueError:
+        remote_dt = None
+    if current is None or (remote_dt is not None and remote_dt > current):
+        return remote_dt
+    return current
+
+
 # Global proxy pool manager instance
 _proxy_pool_manager: Optional[ProxyPoolManager] = None
 _manager_lock = threading.Lock()
@@ -0,0 +1,107 @@
+"""Share proxy pool state across Worker isolates through Workers KV."""
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, Optional, Protocol
+
+from api.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "proxy-pool:snapshot:v1"
+
+_sync_in_flight = False
+
+
+class SnapshotPool(Protocol):
+    """The slice of ProxyPoolManager the store needs (kept structural to avoid an import cycle)."""
+
+    proxies: Dict[str, Any]
+
+    def merge_snapshot(self, snapshot: Dict[str, Any]) -> int:
+        ...
+
+    def export_snapshot(self) -> Dict[str, Any]:
+        ...
+
+    def snapshot_due(self) -> bool:
+        ...
+
+    def mark_snapshot_saved(self, snapshot: Dict[str, Any]) -> None:
+        ...
+
+
+class KVPoolStore:
+    """Reads and writes the compact pool snapshot under a single KV key."""
+
+    def __init__(self, namespace: Any) -> None:
+        self.namespace = namespace
+
+    async def load(self) -> Optional[Dict[str, Any]]:
+        raw = await self.namespace.get(SNAPSHOT_KEY)
+        if not raw:
+            return None
+        try:
+            return json.loads(str(raw))
+        except ValueError:
+            logger.warning("Ignoring unreadable proxy pool snapshot")
+            return None
+
+    async def save(self, snapshot: Dict[str, Any]) -> None:
+        await self.namespace.put(SNAPSHOT_KEY, json.dumps(snapshot, separators=(",", ":")))
+
+
+def get_pool_store() -> Optional[KVPoolStore]:
+    """Return the KV-backed store, or None outside Workers (no KV binding)."""
+    namespace = getattr(settings, "kv_namespace", None)
+    return KVPoolStore(namespace) if namespace is not None else None
+
+
+async def warm_start_pool(manager: SnapshotPool, store: Optional[KVPoolStore] = None) -> bool:
+    """Seed an empty pool from the shared snapshot; True if it now has proxies."""
+    store = store or get_pool_store()
+    if store is None:
+        return False
+    try:
+        snapshot = await store.load()
+    except Exception as exc:
+        logger.warning(f"Failed to load proxy pool snapshot: {exc}")
+        return False
+    added = manager.merge_snapshot(snapshot) if snapshot else 0
+    if added:
+        logger.info(f"Warm-started proxy pool with {added} proxies from shared snapshot")
+    return len(manager.proxies) > 0
+
+
+async def sync_pool_snapshot(
+    manager: SnapshotPool,
+    store: Optional[KVPoolStore] = None,
+    *,
+    force: bool = False,
+) -> bool:
+    """Merge the shared snapshot into the local pool and write the result back.
+
+    Writes are skipped unless the pool changed and SNAPSHOT_WRITE_INTERVAL_SECONDS
+    passed since this isolate's last write, which bounds KV writes per isolate.
+    """
+    global _sync_in_flight
+    store = store or get_pool_store()
+    if store is None or _sync_in_flight:
+        return False
+    if not force and not manager.snapshot_due():
+        return False
+    _sync_in_flight = True
+    try:
+        remote = await store.load()
+        if remote:
+            manager.merge_snapshot(remote)
+        snapshot = manager.export_snapshot()
+        await store.save(snapshot)
+        manager.mark_snapshot_saved(snapshot)
+        return True
+    except Exception as exc:
+        logger.warning(f"Failed to sync proxy pool snapshot: {exc}")
+        return False
+    finally:
+        _sync_in_flight = False
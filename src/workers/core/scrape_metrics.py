@@ -0,0 +1,168 @@
+"""Per-stage latency tracking for the Innertube transcript scrape pipeline."""
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+SCRAPE_STAGES = ("proxy-pick", "jitter", "watch", "config-extract", "player", "caption-json3", "caption-vtt", "backoff")
+HISTOGRAM_WINDOW = 512
+PERCENTILES = (50, 95, 99)
+# Most recent attempts, proxy identity included, kept for the operator-only stats view
+RECENT_ATTEMPTS = 50
+
+
+class RollingHistogram:
+    """Keeps the most recent samples and answers percentile queries over them."""
+
+    def __init__(self, size: int = HISTOGRAM_WINDOW) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        return _nearest_rank(sorted(self._samples), pct)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self._samples:
+            return {"count": self.count}
+        ordered = sorted(self._samples)
+        result: Dict[str, Any] = {"count": self.count, "window": len(ordered)}
+        for pct in PERCENTILES:
+            result[f"p{pct}"] = round(_nearest_rank(ordered, pct), 2)
+        result["max"] = round(ordered[-1], 2)
+        return result
+
+
+def _nearest_rank(ordered: List[float], pct: float) -> float:
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def proxy_identity(proxy_url: Optional[str]) -> Optional[str]:
+    """Return scheme://host:port for a proxy URL, dropping any credentials."""
+    if not proxy_url:
+        return None
+    parts = urlsplit(proxy_url)
+    host = parts.hostname or ""
+    port = f":{parts.port}" if parts.port else ""
+    return f"{parts.scheme}://{host}{port}" if parts.scheme else f"{host}{port}"
+
+
+@dataclass
+class ScrapeAttemptTrace:
+    """Stage timings, proxy identity and bytes received for one scrape attempt."""
+
+    attempt: int
+    proxy: Optional[str] = None
+    stages_ms: Dict[str, float] = field(default_factory=dict)
+    bytes_received: int = 0
+    outcome: str = "error"
+    started: float = field(default_factory=time.perf_counter)
+    ended: Optional[float] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages_ms[name] = self.stages_ms.get(name, 0.0) + elapsed
+
+    @property
+    def total_ms(self) -> float:
+        # Wall clock, not a sum of stages: racing caption formats overlap
+        return ((self.ended or time.perf_counter()) - self.started) * 1000
+
+    def as_dict(self, *, include_proxy: bool = False) -> Dict[str, Any]:
+        """Serialize the attempt; the proxy endpoint is only included for operator views."""
+        result: Dict[str, Any] = {
+            "attempt": self.attempt,
+            "outcome": self.outcome,
+            "totalMs": round(self.total_ms, 2),
+            "bytesReceived": self.bytes_received,
+            "stagesMs": {name: round(ms, 2) for name, ms in self.stages_ms.items()},
+        }
+        if include_proxy:
+            result["proxy"] = self.proxy
+        return result
+
+
+@dataclass
+class ScrapeTrace:
+    """All attempts made for one transcript request."""
+
+    attempts: List[ScrapeAttemptTrace] = field(default_factory=list)
+
+    def start_attempt(self, attempt: int) -> ScrapeAttemptTrace:
+        attempt_trace = ScrapeAttemptTrace(attempt=attempt)
+        self.attempts.append(attempt_trace)
+        return attempt_trace
+
+    def summary(self) -> Dict[str, Any]:
+        """Client-facing timings; proxy endpoints stay in logs and get_scrape_stats()."""
+        stage_totals: Dict[str, float] = {}
+        for attempt_trace in self.attempts:
+            for name, ms in attempt_trace.stages_ms.items():
+                stage_totals[name] = stage_totals.get(name, 0.0) + ms
+        return {
+            "attemptCount": len(self.attempts),
+            "totalMs": round(sum(a.total_ms for a in self.attempts), 2),
+            "bytesReceived": sum(a.bytes_received for a in self.attempts),
+            "stagesMs": {name: round(ms, 2) for name, ms in stage_totals.items()},
+            "attempts": [a.as_dict() for a in self.attempts],
+        }
+
+
+_stage_histograms: Dict[str, RollingHistogram] = {}
+_attempt_histogram = RollingHistogram()
+_bytes_histogram = RollingHistogram()
+_outcome_counts: Dict[str, int] = {}
+_recent_attempts: Deque[Dict[str, Any]] = deque(maxlen=RECENT_ATTEMPTS)
+
+
+def record_scrape_attempt(attempt_trace: ScrapeAttemptTrace) -> None:
+    """Feed a finished attempt into the rolling per-stage histograms."""
+    if attempt_trace.ended is None:
+        attempt_trace.ended = time.perf_counter()
+    for name, ms in attempt_trace.stages_ms.items():
+        histogram = _stage_histograms.get(name)
+        if histogram is None:
+            histogram = _stage_histograms[name] = RollingHistogram()
+        histogram.observe(ms)
+    _attempt_histogram.observe(attempt_trace.total_ms)
+    _bytes_histogram.observe(attempt_trace.bytes_received)
+    _outcome_counts[attempt_trace.outcome] = _outcome_counts.get(attempt_trace.outcome, 0) + 1
+    _recent_attempts.append(attempt_trace.as_dict(include_proxy=True))
+
+
+def get_scrape_stats() -> Dict[str, Any]:
+    """Return rolling percentiles per stage, attempt totals, outcomes and the latest attempts."""
+    ordered_stages = [name for name in SCRAPE_STAGES if name in _stage_histograms]
+    ordered_stages += sorted(set(_stage_histograms) - set(SCRAPE_STAGES))
+    return {
+        "stages_ms": {name: _stage_histograms[name].summary() for name in ordered_stages},
+        "attempt_total_ms": _attempt_histogram.summary(),
+        "bytes_received": _bytes_histogram.summary(),
+        "outcomes": dict(_outcome_counts),
+        "recent_attempts": list(_recent_attempts),
+    }
+
+
+def reset_scrape_stats() -> None:
+    global _attempt_histogram, _bytes_histogram
+    _stage_histograms.clear()
+    _attempt_histogram = RollingHistogram()
+    _bytes_histogram = RollingHistogram()
+    _outcome_counts.clear()
+    _recent_attempts.clear()
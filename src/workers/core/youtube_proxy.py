@@ -2,17 +2,22 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import html
+import io
 import json
 import logging
 import random
 import re
+import time
 from http import HTTPStatus
-from typing import Any, Dict, Iterable, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
 import httpx
 
 from api.config import settings
+from .proxy_pool import get_proxy_pool_manager
+from .scrape_metrics import ScrapeAttemptTrace, ScrapeTrace, proxy_identity, record_scrape_attempt
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +38,28 @@ YOUTUBE_API_CLIENT_HEADERS = {
 }
 INNERTUBE_KEY_RE = re.compile(r'"INNERTUBE_API_KEY":"(?P<key>[^"]+)"')
 CLIENT_VERSION_RE = re.compile(r'"INNERTUBE_CONTEXT_CLIENT_VERSION":"(?P<ver>[^"]+)"')
-RETRIABLE_CODES = {"blocked", "rate_limited", "network_error", "unknown"}
+RETRIABLE_CODES = {"blocked", "rate_limited", "network_error", "caption_unavailable", "unknown"}
+# Timed cues as compact parallel arrays: {"text": [...], "tStartMs": [...], "dDurationMs": [...]}
+CaptionSegments = Dict[str, list]
+VTT_SKIPPED_BLOCKS = {"NOTE", "STYLE", "REGION"}
+VTT_TAG_RE = re.compile(r"<[^>]*>")
+CAPTION_FORMAT_MIN_SAMPLES = 5
+# Older caption format outcomes lose half their weight every hour
+CAPTION_FORMAT_HALF_LIFE_SECONDS = 3600.0
+# Share of downloads that also fetch the secondary format, keeping its stats current
+CAPTION_FORMAT_EXPLORE_RATE = 0.05
+
+# Per track kind ("asr" / "standard") -> format -> decayed attempt/success weights
+_caption_format_stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+# Errors that are final for a video; retrying the scrape can't change them. Only
+# raised from the player response itself (no caption tracks, ERROR/UNPLAYABLE),
+# never from caption downloads, which a bad proxy can fail or truncate.
+NEGATIVE_CACHE_CODES = {"no_captions", "invalid_video"}
+NEGATIVE_CACHE_MAX_ENTRIES = 10_000
+# video_id -> (expires_at monotonic, code, message, details, status_code)
+_negative_cache: Dict[str, Tuple[float, str, str, Any, int]] = {}
+_negative_cache_stats: Dict[str, int] = {"hits": 0, "stores": 0, "expired": 0}
 
 
 class TranscriptProxyError(Exception):
@@ -54,82 +80,133 @@ class TranscriptProxyError(Exception):
         self.status_code = status_code
 
 
-async def fetch_transcript_via_proxy(video_id: str) -> Dict[str, Any]:
-    """Fetch transcript by scraping YouTube watch/player endpoints (Innertube)."""
+async def fetch_transcript_via_proxy(video_id: str, *, include_segments: bool = False) -> Dict[str, Any]:
+    """Fetch transcript by scraping YouTube watch/player endpoints (Innertube).
+
+    With ``include_segments`` the transcript also carries timed ``segments``
+    when the caption format provides timing.
+    """
     if not video_id or not isinstance(video_id, str) or len(video_id) != 11:
         raise ValueError("Invalid video_id: must be 11 characters")
+    cached_error = _negative_cache_lookup(video_id)
+    if cached_error:
+        raise cached_error
     try:
-        return await _fetch_via_innertube(video_id)
-    except TranscriptProxyError:
+        return await _fetch_via_innertube(video_id, include_segments=include_segments)
+    except TranscriptProxyError as exc:
+        _negative_cache_store(video_id, exc)
         raise
     except Exception as exc:
         logger.error("innertube_unexpected_error", exc_info=True, extra={"video_id": video_id})
         raise TranscriptProxyError("unknown", f"Unexpected error: {exc}") from exc
 
 
-async def _fetch_via_innertube(video_id: str) -> Dict[str, Any]:
+def _negative_cache_lookup(video_id: str) -> Optional[TranscriptProxyError]:
+    """Return a marked copy of a cached final error for this video, if still fresh."""
+    entry = _negative_cache.get(video_id)
+    if entry is None:
+        return None
+    expires_at, code, message, details, status_code = entry
+    if time.monotonic() >= expires_at:
+        del _negative_cache[video_id]
+        _negative_cache_stats["expired"] += 1
+        return None
+    _negative_cache_stats["hits"] += 1
+    logger.info("transcript_negative_cache_hit", extra={"video_id": video_id, "code": code})
+    marked_details = {**(details if isinstance(details, dict) else {}), "negativeCache": True}
+    return TranscriptProxyError(code, message, details=marked_details, status_code=status_code)
+
+
+def _negative_cache_store(video_id: str, exc: TranscriptProxyError) -> None:
+    ttl = settings.youtube_transcript_negative_cache_ttl_seconds
+    if ttl <= 0 or exc.code not in NEGATIVE_CACHE_CODES:
+        return
+    if video_id not in _negative_cache and len(_negative_cache) >= NEGATIVE_CACHE_MAX_ENTRIES:
+        # dicts keep insertion order, so this drops the oldest entry
+        del _negative_cache[next(iter(_negative_cache))]
+    _negative_cache[video_id] = (time.monotonic() + ttl, exc.code, exc.message, exc.details, exc.status_code)
+    _negative_cache_stats["stores"] += 1
+
+
+def get_negative_cache_stats() -> Dict[str, int]:
+    """Return negative cache counters and current size."""
+    return {**_negative_cache_stats, "size": len(_negative_cache)}
+
+
+def clear_negative_cache() -> None:
+    _negative_cache.clear()
+    for key in _negative_cache_stats:
+        _negative_cache_stats[key] = 0
+
+
+async def _fetch_via_innertube(video_id: str, *, include_segments: bool = False) -> Dict[str, Any]:
     attempts = max(1, settings.youtube_scraper_max_retries)
     last_error: Optional[TranscriptProxyError] = None
-    
+    trace = ScrapeTrace()
+
     for attempt in range(attempts):
+        attempt_trace = trace.start_attempt(attempt + 1)
         headers = _build_scraper_headers()
-        proxy_url, is_free_proxy = await _pick_proxy()
+        with attempt_trace.stage("proxy-pick"):
+            proxy_url, is_free_proxy = await _pick_proxy()
+        attempt_trace.proxy = proxy_identity(proxy_url)
         logger.info(f"Attempt {attempt + 1}/{attempts} - Proxy: {'Yes' if proxy_url else 'None'}, Free: {is_free_proxy}")
-        timeout = settings.youtube_scraper_timeout_seconds
-        client_kwargs: Dict[str, Any] = {"timeout": timeout}
-        proxy_dict = None
-        if proxy_url:
-            # httpx expects proxies as a dict with http:// and https:// keys
-            proxy_dict = {
-                "http://": proxy_url,
-                "https://": proxy_url,
-            }
-            # BotProxy's Bot Anti-Detect Mode requires insecure SSL connections
-            # Free proxies also often have SSL issues, so disable verification
-            if _is_botproxy(proxy_url) or is_free_proxy:
-                client_kwargs["verify"] = False
-                logger.debug(f"Using proxy with SSL verification disabled: {proxy_url[:50]}...")
-        jitter = settings.youtube_scraper_jitter_max_seconds
-        if jitter > 0:
-            await asyncio.sleep(random.uniform(0, jitter))
         try:
-            async with httpx.AsyncClient(**client_kwargs) as client:
-                watch_html = await _fetch_watch_page(client, video_id, headers, proxy_dict)
-                api_key, client_version = _extract_innertube_config(watch_html)
-                player_data = await _call_innertube_player(client, video_id, api_key, client_version, headers, proxy_dict)
+            jitter = settings.youtube_scraper_jitter_max_seconds
+            if jitter > 0:
+                with attempt_trace.stage("jitter"):
+                    await asyncio.sleep(random.uniform(0, jitter))
+            async with _build_client(proxy_url, is_free_proxy, settings.youtube_scraper_timeout_seconds) as client:
+                with attempt_trace.stage("watch"):
+                    watch_html = await _fetch_watch_page(client, video_id, headers, trace=attempt_trace)
+                with attempt_trace.stage("config-extract"):
+                    api_key, client_version = _extract_innertube_config(watch_html)
+                with attempt_trace.stage("player"):
+                    player_data = await _call_innertube_player(
+                        client, video_id, api_key, client_version, headers, trace=attempt_trace
+                    )
                 track = _select_caption_track(player_data)
-                transcript_text, track_format = await _download_caption_track(client, track, proxy_dict)
+                transcript_text, track_format, segments = await _download_caption_track(
+                    client, track, include_segments=include_segments, trace=attempt_trace
+                )
+                attempt_trace.outcome = "success"
                 
                 # Mark proxy as successful if using free proxy pool
                 if proxy_url and is_free_proxy:
                     try:
-                        from .proxy_pool import get_proxy_pool_manager
                         manager = get_proxy_pool_manager()
-                        manager.mark_proxy_success(proxy_url)
+                        manager.mark_proxy_success(proxy_url, attempt_trace.total_ms)
                     except Exception:
                         pass  # Don't fail if proxy tracking fails
                 
+                transcript: Dict[str, Any] = {
+                    "text": transcript_text,
+                    "format": track_format,
+                    "language": track.get("languageCode"),
+                    "trackKind": track.get("kind"),
+                }
+                if include_segments and segments:
+                    transcript["segments"] = segments
                 return {
                     "success": True,
-                    "transcript": {
-                        "text": transcript_text,
-                        "format": track_format,
-                        "language": track.get("languageCode"),
-                        "trackKind": track.get("kind"),
-                    },
+                    "transcript": transcript,
                     "metadata": {
                         "clientVersion": client_version,
                         "method": "innertube",
                         "videoId": video_id,
+                        "timings": trace.summary(),
                     },
                 }
         except TranscriptProxyError as exc:
-            # Mark proxy as failed if using free proxy pool
+            attempt_trace.outcome = exc.code
+            # Mark proxy as failed if using free proxy pool; video-level errors mean it worked
             if proxy_url and is_free_proxy:
                 try:
-                    from .proxy_pool import get_proxy_pool_manager
                     manager = get_proxy_pool_manager()
-                    manager.mark_proxy_failure(proxy_url)
+                    if exc.code in NEGATIVE_CACHE_CODES:
+                        manager.mark_proxy_success(proxy_url, attempt_trace.total_ms)
+                    else:
+                        manager.mark_proxy_failure(proxy_url, attempt_trace.total_ms)
                 except Exception:
                     pass  # Don't fail if proxy tracking fails
             last_error = exc
@@ -143,13 +220,20 @@ async def _fetch_via_innertube(video_id: str) -> Dict[str, Any]:
                     "max_attempts": attempts,
                     "code": exc.code,
                     "delay_seconds": round(delay, 3),
+                    "proxy": attempt_trace.proxy,
+                    "stages_ms": {name: round(ms, 1) for name, ms in attempt_trace.stages_ms.items()},
                 },
             )
-            await asyncio.sleep(delay)
+            with attempt_trace.stage("backoff"):
+                await asyncio.sleep(delay)
+        finally:
+            record_scrape_attempt(attempt_trace)
     raise last_error or TranscriptProxyError("unknown", "Unable to fetch transcript from YouTube")
 
 
-async def fetch_transcript_via_youtube_api(video_id: str, access_token: str) -> Dict[str, Any]:
+async def fetch_transcript_via_youtube_api(
+    video_id: str, access_token: str, *, include_segments: bool = False
+) -> Dict[str, Any]:
     """Fetch transcript using YouTube Data API with OAuth access token."""
     if not video_id or not isinstance(video_id, str) or len(video_id) != 11:
         raise ValueError("Invalid video_id: must be 11 characters")
@@ -230,18 +314,21 @@ async def fetch_transcript_via_youtube_api(video_id: str, access_token: str) ->
         except httpx.HTTPStatusError as exc:
             raise TranscriptProxyError("network_error", "YouTube caption download failed") from exc
 
-        transcript_text = _parse_vtt_text(download_response.text)
+        transcript_text, segments = _parse_vtt_transcript(download_response.text)
         if not transcript_text:
             raise TranscriptProxyError("no_captions", "Transcript text is empty")
 
+        transcript: Dict[str, Any] = {
+            "text": transcript_text,
+            "format": "text",
+            "language": snippet.get("language"),
+            "trackKind": snippet.get("trackKind"),
+        }
+        if include_segments and segments:
+            transcript["segments"] = segments
         return {
             "success": True,
-            "transcript": {
-                "text": transcript_text,
-                "format": "text",
-                "language": snippet.get("language"),
-                "trackKind": snippet.get("trackKind"),
-            },
+            "transcript": transcript,
             "metadata": {
                 "clientVersion": None,
                 "method": "youtube-api",
@@ -272,36 +359,121 @@ def _select_caption_item(items: Iterable[Dict[str, Any]]) -> Optional[Dict[str,
 
 
 def _parse_vtt_text(vtt_text: str) -> str:
-    raw_lines = vtt_text.splitlines()
-    lines: list[str] = []
-    total = len(raw_lines)
-    idx = 0
-    while idx < total:
-        stripped = raw_lines[idx].strip()
-        idx += 1
-        if not stripped:
+    # StringIO with universal newlines yields lines lazily instead of materializing splitlines()
+    cues = iter_vtt_cues(io.StringIO(vtt_text, newline=None), with_timing=False)
+    return " ".join([text for _, _, text in cues])
+
+
+def _parse_vtt_transcript(vtt_text: str) -> tuple[str, Optional[CaptionSegments]]:
+    cue_texts: list[str] = []
+    starts: list[int] = []
+    durations: list[int] = []
+    for start_ms, end_ms, text in iter_vtt_cues(io.StringIO(vtt_text, newline=None)):
+        cue_texts.append(text)
+        start = start_ms or 0
+        starts.append(start)
+        durations.append(max(0, end_ms - start) if end_ms is not None else 0)
+    segments: CaptionSegments = {"text": cue_texts, "tStartMs": starts, "dDurationMs": durations}
+    return " ".join(cue_texts), segments
+
+
+def iter_vtt_cues(
+    lines: Iterable[str], *, with_timing: bool = True
+) -> Iterator[Tuple[Optional[int], Optional[int], str]]:
+    """Yield ``(start_ms, end_ms, text)`` for each cue of a WebVTT or SRT body.
+
+    Consumes ``lines`` in a single pass. At most one line is held back: a
+    block-leading or bare numeric line that may turn out to be a cue
+    identifier once the next line (next non-blank line for bare numbers,
+    as SRT files often pad them) is seen. The WEBVTT header,
+    NOTE/STYLE/REGION blocks, cue settings and inline tags are dropped and
+    whitespace is collapsed, so each yielded text is already normalized.
+    With ``with_timing=False`` timestamps are not parsed and both are None.
+    """
+    start_ms: Optional[int] = None
+    end_ms: Optional[int] = None
+    cue_lines: list[str] = []
+    pending: Optional[str] = None
+    block_start = True
+    skip_block = False
+    first_line = True
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if first_line:
+            first_line = False
+            line = line.lstrip("\ufeff")
+            if line.startswith("WEBVTT"):
+                # Header metadata (Kind:, Language:) runs until the first blank line
+                skip_block = True
+                continue
+        if not line:
+            if pending is not None and not pending.isdigit():
+                # Text identifiers must sit directly above the timing line
+                cue_lines.append(pending)
+                pending = None
+            block_start = True
+            skip_block = False
             continue
-        if stripped.startswith("WEBVTT"):
+        if skip_block:
             continue
-        if "-->" in stripped:
+        if "-->" in line:
+            pending = None  # it was the cue identifier
+            if cue_lines:
+                yield start_ms, end_ms, _join_vtt_cue_lines(cue_lines)
+                cue_lines = []
+            if with_timing:
+                start_ms, end_ms = _parse_vtt_timing(line)
+            block_start = False
             continue
-        if stripped.isdigit():
-            lookahead_idx = idx
-            next_line = ""
-            while lookahead_idx < total:
-                candidate = raw_lines[lookahead_idx].strip()
-                if candidate:
-                    next_line = candidate
-                    break
-                lookahead_idx += 1
-            if next_line and "-->" in next_line:
-                continue
-        lines.append(stripped)
-    return _normalize_whitespace(" ".join(lines))
-
-
-def _normalize_whitespace(text: str) -> str:
-    return re.sub(r"\s+", " ", text).strip()
+        if pending is not None:
+            cue_lines.append(pending)
+            pending = None
+        if block_start and line.split(maxsplit=1)[0] in VTT_SKIPPED_BLOCKS:
+            skip_block = True
+            continue
+        if block_start or line.isdigit():
+            pending = line
+        else:
+            cue_lines.append(line)
+        block_start = False
+
+    if pending is not None:
+        cue_lines.append(pending)
+    if cue_lines:
+        text = _join_vtt_cue_lines(cue_lines)
+        if text:
+            yield start_ms, end_ms, text
+
+
+def _join_vtt_cue_lines(cue_lines: list[str]) -> str:
+    text = " ".join(cue_lines)
+    if "<" in text:
+        text = VTT_TAG_RE.sub("", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return " ".join(text.split())
+
+
+def _parse_vtt_timing(line: str) -> Tuple[Optional[int], Optional[int]]:
+    start, _, rest = line.partition("-->")
+    end = rest.split(maxsplit=1)  # anything after the end timestamp is cue settings
+    return _vtt_timestamp_ms(start.strip()), _vtt_timestamp_ms(end[0]) if end else None
+
+
+def _vtt_timestamp_ms(value: str) -> Optional[int]:
+    # Integer-only parsing of [HH:]MM:SS(.|,)mmm avoids float rounding drift
+    *hours_minutes, seconds = value.split(":")
+    whole, _, fraction = seconds.replace(",", ".").partition(".")
+    try:
+        ms = int(whole) * 1000 + (int(fraction[:3].ljust(3, "0")) if fraction else 0)
+        if hours_minutes:
+            ms += int(hours_minutes[-1]) * 60_000
+        if len(hours_minutes) > 1:
+            ms += int(hours_minutes[-2]) * 3_600_000
+    except ValueError:
+        return None
+    return ms
 
 
 def _build_scraper_headers() -> Dict[str, str]:
@@ -321,19 +493,18 @@ async def _pick_proxy() -> Tuple[Optional[str], bool]:
     # Use free proxy pool manager
     if enable_free:
         try:
-            from .proxy_pool import get_proxy_pool_manager
-            
             manager = get_proxy_pool_manager()
             logger.info(f"Proxy pool manager initialized, current pool size: {len(manager.proxies)}")
             
-            # If pool is empty, try to refresh synchronously first
+            # Cold isolate: warm-start from the shared snapshot, fetch synchronously only without one.
+            # Concurrent callers share a single in-flight fill.
             if len(manager.proxies) == 0:
-                logger.info("Proxy pool is empty, fetching proxies synchronously...")
-                await manager.refresh_pool()
-                logger.info(f"After sync refresh, pool size: {len(manager.proxies)}")
+                logger.info("Proxy pool is empty, populating before picking...")
+                await manager.scheduler.ensure_populated()
+                logger.info(f"After populating, pool size: {len(manager.proxies)}")
             
-            # Also trigger async refresh for next time
-            asyncio.create_task(manager.refresh_pool())
+            # Refresh, health check and snapshot sync run in the background when due
+            manager.scheduler.schedule()
             
             # Get next proxy
             proxy = manager.get_next_proxy()
@@ -341,7 +512,7 @@ async def _pick_proxy() -> Tuple[Optional[str], bool]:
                 logger.info(f"Using free proxy: {proxy[:50]}...")
                 return proxy, True
             else:
-                logger.warning(f"Free proxy pool is empty (size: {len(manager.proxies)}), no proxy available")
+                logger.warning(f"No free proxy available (pool size: {len(manager.proxies)}, rest are cooling down)")
         except Exception as e:
             logger.error(f"Error using free proxy pool: {str(e)}", exc_info=True)
     
@@ -354,6 +525,20 @@ async def _pick_proxy() -> Tuple[Optional[str], bool]:
     return random.choice(pool), False
 
 
+def _build_client(proxy_url: Optional[str], is_free_proxy: bool, timeout: float) -> httpx.AsyncClient:
+    """Create the HTTP client for one scrape attempt, routed through its proxy."""
+    client_kwargs: Dict[str, Any] = {"timeout": timeout}
+    if proxy_url:
+        # httpx routes every request of a client through the client-level proxy
+        client_kwargs["proxy"] = proxy_url
+        # BotProxy's Bot Anti-Detect Mode requires insecure SSL connections
+        # Free proxies also often have SSL issues, so disable verification
+        if _is_botproxy(proxy_url) or is_free_proxy:
+            client_kwargs["verify"] = False
+            logger.debug(f"Using proxy with SSL verification disabled: {proxy_url[:50]}...")
+    return httpx.AsyncClient(**client_kwargs)
+
+
 def _is_botproxy(proxy_url: str) -> bool:
     """Check if proxy URL is a BotProxy endpoint."""
     return "botproxy.net" in proxy_url.lower()
@@ -373,7 +558,13 @@ def _retry_delay_seconds(attempt: int) -> float:
     return delay + random.uniform(0, base)
 
 
-async def _fetch_watch_page(client: httpx.AsyncClient, video_id: str, headers: Dict[str, str], proxies: Optional[Dict[str, str]] = None) -> str:
+async def _fetch_watch_page(
+    client: httpx.AsyncClient,
+    video_id: str,
+    headers: Dict[str, str],
+    *,
+    trace: Optional[ScrapeAttemptTrace] = None,
+) -> str:
     params = {
         "v": video_id,
         "hl": "en",
@@ -381,17 +572,19 @@ async def _fetch_watch_page(client: httpx.AsyncClient, video_id: str, headers: D
         "has_verified": "1",
     }
     try:
-        response = await client.get(WATCH_URL, params=params, headers=headers, proxies=proxies)
+        response = await client.get(WATCH_URL, params=params, headers=headers)
+        if trace:
+            trace.bytes_received += response.num_bytes_downloaded
         response.raise_for_status()
         return response.text
     except httpx.HTTPStatusError as exc:
         status_code = exc.response.status_code
-        if status_code == 404:
-            raise TranscriptProxyError("invalid_video", "Video is unavailable or private") from exc
         if status_code == 429:
             raise TranscriptProxyError("rate_limited", "YouTube rate limited the request") from exc
         if status_code == 403:
             raise TranscriptProxyError("blocked", "YouTube blocked the request") from exc
+        # Including 404: YouTube serves unavailable videos with a 200 watch page, so a
+        # 404 here says more about the proxy than the video; the player call decides
         raise TranscriptProxyError("network_error", f"YouTube watch page request failed: {status_code}") from exc
     except httpx.HTTPError as exc:
         raise TranscriptProxyError("network_error", f"Failed to fetch YouTube watch page: {exc}") from exc
@@ -411,7 +604,8 @@ async def _call_innertube_player(
     api_key: str,
     client_version: str,
     headers: Dict[str, str],
-    proxies: Optional[Dict[str, str]] = None,
+    *,
+    trace: Optional[ScrapeAttemptTrace] = None,
 ) -> Dict[str, Any]:
     body = {
         "context": {
@@ -425,13 +619,13 @@ async def _call_innertube_player(
         "videoId": video_id,
     }
     try:
-        response = await client.post(f"{PLAYER_URL}?key={api_key}", json=body, headers=headers, proxies=proxies)
+        response = await client.post(f"{PLAYER_URL}?key={api_key}", json=body, headers=headers)
+        if trace:
+            trace.bytes_received += response.num_bytes_downloaded
         response.raise_for_status()
         data = response.json()
     except httpx.HTTPStatusError as exc:
         code = exc.response.status_code
-        if code == 404:
-            raise TranscriptProxyError("invalid_video", "Video not found") from exc
         if code == 429:
             raise TranscriptProxyError("rate_limited", "YouTube rate limited the request") from exc
         if code == 403:
@@ -455,7 +649,10 @@ async def _call_innertube_player(
 def _select_caption_track(player_data: Dict[str, Any]) -> Dict[str, Any]:
     captions = player_data.get("captions", {})
     tracklist = captions.get("playerCaptionsTracklistRenderer", {})
-    tracks = tracklist.get("captionTracks") or []
+    tracks = [
+        track for track in tracklist.get("captionTracks") or ()
+        if track.get("baseUrl") or track.get("base_url")
+    ]
     if not tracks:
         raise TranscriptProxyError("no_captions", "This video doesn't have captions available")
 
@@ -473,22 +670,26 @@ def _select_caption_track(player_data: Dict[str, Any]) -> Dict[str, Any]:
 async def _download_caption_track(
     client: httpx.AsyncClient,
     track: Dict[str, Any],
-    proxies: Optional[Dict[str, str]] = None,
-) -> tuple[str, str]:
+    *,
+    include_segments: bool = False,
+    trace: Optional[ScrapeAttemptTrace] = None,
+) -> tuple[str, str, Optional[CaptionSegments]]:
     base_url = track.get("baseUrl") or track.get("base_url")
     if not base_url:
-        raise TranscriptProxyError("no_captions", "Caption track missing base URL")
+        raise TranscriptProxyError("caption_unavailable", "Caption track missing base URL")
     base_url = html.unescape(base_url)
 
     async def _fetch_url(url: str) -> httpx.Response:
         try:
-            response = await client.get(url, proxies=proxies)
+            response = await client.get(url)
+            if trace:
+                trace.bytes_received += response.num_bytes_downloaded
             response.raise_for_status()
             return response
         except httpx.HTTPStatusError as exc:
             status_code = exc.response.status_code
             if status_code == 404:
-                raise TranscriptProxyError("no_captions", "Caption track not found") from exc
+                raise TranscriptProxyError("caption_unavailable", "Caption track not found") from exc
             if status_code == 403:
                 raise TranscriptProxyError("blocked", "YouTube denied caption download") from exc
             raise TranscriptProxyError("network_error", f"Caption download failed: {status_code}") from exc
@@ -497,38 +698,189 @@ async def _download_caption_track(
 
     json3_url = f"{base_url}&fmt=json3" if "fmt=" not in base_url else base_url.replace("fmt=vtt", "fmt=json3")
     vtt_url = f"{base_url}&fmt=vtt" if "fmt=" not in base_url else base_url.replace("fmt=json3", "fmt=vtt")
+    format_urls = {"json3": json3_url, "vtt": vtt_url}
+    track_kind = _caption_track_kind(track)
+
+    async def _fetch_format(fmt: str) -> tuple[str, Optional[CaptionSegments]]:
+        try:
+            with trace.stage(f"caption-{fmt}") if trace else contextlib.nullcontext():
+                response = await _fetch_url(format_urls[fmt])
+                if include_segments:
+                    transcript_text, segments = CAPTION_PARSERS[fmt](response.text)
+                else:
+                    # Text-only parsers skip building timed cues nobody asked for
+                    transcript_text, segments = CAPTION_TEXT_PARSERS[fmt](response.text), None
+        except Exception:
+            _record_caption_format_result(track_kind, fmt, False)
+            raise
+        _record_caption_format_result(track_kind, fmt, bool(transcript_text))
+        return transcript_text, segments
+
+    primary, secondary = _caption_format_order(track_kind)
+    # Sample the secondary format alongside the primary on a few requests, so both
+    # are measured under the same conditions rather than only after the primary fails
+    explore = random.random() < CAPTION_FORMAT_EXPLORE_RATE
+    if settings.youtube_scraper_caption_race:
+        # Fetch both formats concurrently so a failed primary costs no extra round trip
+        primary_task = asyncio.create_task(_fetch_format(primary))
+        secondary_task = asyncio.create_task(_fetch_format(secondary))
+        try:
+            try:
+                transcript_text, segments = await primary_task
+                if transcript_text:
+                    if explore:
+                        with contextlib.suppress(Exception):
+                            await secondary_task
+                    return transcript_text, primary, segments
+            except TranscriptProxyError:
+                pass
+            except Exception:
+                logger.warning("caption_parse_failed", exc_info=True, extra={"format": primary})
+            transcript_text, segments = await secondary_task
+        finally:
+            for task in (primary_task, secondary_task):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark retrieved so asyncio doesn't warn
+    else:
+        try:
+            transcript_text, segments = await _fetch_format(primary)
+            if transcript_text:
+                if explore:
+                    with contextlib.suppress(Exception):
+                        await _fetch_format(secondary)
+                return transcript_text, primary, segments
+        except TranscriptProxyError:
+            pass
+        except Exception:
+            logger.warning("caption_parse_failed", exc_info=True, extra={"format": primary})
+        transcript_text, segments = await _fetch_format(secondary)
 
-    try:
-        json_resp = await _fetch_url(json3_url)
-        transcript_text = _parse_json3_text(json_resp.text)
-        if transcript_text:
-            return transcript_text, "json3"
-    except TranscriptProxyError:
-        pass
-    except Exception:
-        logger.warning("json3_parse_failed", exc_info=True)
-
-    vtt_resp = await _fetch_url(vtt_url)
-    transcript_text = _parse_vtt_text(vtt_resp.text)
     if not transcript_text:
-        raise TranscriptProxyError("no_captions", "Transcript text is empty")
-    return transcript_text, "vtt"
+        raise TranscriptProxyError("caption_unavailable", "Transcript text is empty")
+    return transcript_text, secondary, segments
+
+
+def _caption_track_kind(track: Dict[str, Any]) -> str:
+    return "asr" if track.get("kind") == "asr" else "standard"
+
+
+def _decayed_caption_format_stats(stats: Dict[str, float], now: float) -> Dict[str, float]:
+    """Age a format's weights to ``now`` in place and return them."""
+    elapsed = now - stats["updated"]
+    if elapsed > 0:
+        factor = 0.5 ** (elapsed / CAPTION_FORMAT_HALF_LIFE_SECONDS)
+        stats["attempts"] *= factor
+        stats["successes"] *= factor
+        stats["updated"] = now
+    return stats
+
+
+def _record_caption_format_result(track_kind: str, fmt: str, success: bool) -> None:
+    now = time.monotonic()
+    stats = _caption_format_stats.setdefault(track_kind, {}).setdefault(
+        fmt, {"attempts": 0.0, "successes": 0.0, "updated": now}
+    )
+    _decayed_caption_format_stats(stats, now)
+    stats["attempts"] += 1
+    if success:
+        stats["successes"] += 1
+
+
+def _caption_format_success_rate(track_kind: str, fmt: str) -> Optional[float]:
+    stats = (_caption_format_stats.get(track_kind) or {}).get(fmt)
+    if not stats:
+        return None
+    stats = _decayed_caption_format_stats(stats, time.monotonic())
+    # Decayed weights are effective sample counts; round so a burst of samples counts in full
+    if round(stats["attempts"]) < CAPTION_FORMAT_MIN_SAMPLES:
+        return None
+    return stats["successes"] / stats["attempts"]
+
+
+def _caption_format_order(track_kind: str) -> Tuple[str, str]:
+    """Return (primary, secondary) caption formats for a track kind.
+
+    json3 is preferred until both formats have enough recent samples and VTT
+    has a strictly better decayed success rate for this kind of track.
+    """
+    json3_rate = _caption_format_success_rate(track_kind, "json3")
+    vtt_rate = _caption_format_success_rate(track_kind, "vtt")
+    if json3_rate is not None and vtt_rate is not None and vtt_rate > json3_rate:
+        return "vtt", "json3"
+    return "json3", "vtt"
+
+
+def get_caption_format_stats() -> Dict[str, Dict[str, Any]]:
+    """Return per-track-kind decayed caption format weights, success rates and preference."""
+    now = time.monotonic()
+    snapshot: Dict[str, Dict[str, Any]] = {}
+    for track_kind, formats in _caption_format_stats.items():
+        decayed = {fmt: _decayed_caption_format_stats(stats, now) for fmt, stats in formats.items()}
+        snapshot[track_kind] = {
+            "preferred": _caption_format_order(track_kind)[0],
+            "formats": {
+                fmt: {
+                    "attempts": round(stats["attempts"], 2),
+                    "successes": round(stats["successes"], 2),
+                    "success_rate": stats["successes"] / stats["attempts"] if stats["attempts"] else 0.0,
+                }
+                for fmt, stats in decayed.items()
+            },
+        }
+    return snapshot
 
 
-def _parse_json3_text(payload: str) -> str:
+def _load_json3_events(payload: str) -> list:
     try:
         data = json.loads(payload)
     except json.JSONDecodeError:
-        raise TranscriptProxyError("no_captions", "Invalid JSON3 caption payload")
-
-    events = data.get("events") or []
-    parts: list[str] = []
-    for event in events:
-        segs = event.get("segs") or []
-        for seg in segs:
-            text = seg.get("utf8")
-            if text:
-                cleaned = text.replace("\n", " ").strip()
-                if cleaned:
-                    parts.append(cleaned)
-    return _normalize_whitespace(" ".join(parts))
+        raise TranscriptProxyError("caption_unavailable", "Invalid JSON3 caption payload")
+    return data.get("events") or []
+
+
+def _parse_json3_text(payload: str) -> str:
+    """Parse a json3 caption payload into normalized text only.
+
+    Collects every segment string in one flat pass and normalizes whitespace
+    once over the whole transcript; no per-cue strings or timing are built.
+    """
+    parts = [seg.get("utf8") or "" for event in _load_json3_events(payload) for seg in event.get("segs") or ()]
+    return " ".join(" ".join(parts).split())
+
+
+def _parse_json3_transcript(payload: str) -> tuple[str, CaptionSegments]:
+    """Parse a json3 caption payload into normalized text and timed segments.
+
+    Runs a single pass over the events: ``str.split()`` both strips and
+    collapses whitespace per cue, so the cue texts are already normalized and
+    no extra join/regex pass over the whole transcript is needed.
+    """
+    cue_texts: list[str] = []
+    starts: list[int] = []
+    durations: list[int] = []
+    for event in _load_json3_events(payload):
+        segs = event.get("segs")
+        if not segs:
+            continue
+        cue_text = " ".join(" ".join([seg.get("utf8") or "" for seg in segs]).split())
+        if not cue_text:
+            continue
+        cue_texts.append(cue_text)
+        starts.append(int(event.get("tStartMs") or 0))
+        durations.append(int(event.get("dDurationMs") or 0))
+    segments: CaptionSegments = {"text": cue_texts, "tStartMs": starts, "dDurationMs": durations}
+    return " ".join(cue_texts), segments
+
+
+# Format -> parser returning (text, timed segments); used when segments are requested
+CAPTION_PARSERS = {
+    "json3": _parse_json3_transcript,
+    "vtt": _parse_vtt_transcript,
+}
+# Format -> text-only parser; the default path
+CAPTION_TEXT_PARSERS = {
+    "json3": _parse_json3_text,
+    "vtt": _parse_vtt_text,
+}
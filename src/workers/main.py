@@ -143,3 +143,25 @@ class Default(WorkerEntrypoint):
         Delegate to the existing queue() implementation.
         """
         return await self.queue(batch, env, ctx)
+
+    async def scheduled(self, controller, env, ctx):
+        """Run periodic database maintenance from a Cron Trigger."""
+        apply_worker_env(self.env)
+
+        from api.database import Database, reconcile_job_stats
+        from api.config import settings
+
+        db_binding = env.DB if env is not None and hasattr(env, "DB") else settings.d1_database
+        db = Database(db=db_binding)
+        try:
+            result = await reconcile_job_stats(db)
+            logger.info("job_stats reconciliation finished", extra=result)
+        except Exception:
+            logger.exception("job_stats reconciliation failed")
+
+    async def on_scheduled(self, controller, env, ctx):
+        """Cloudflare Python Worker entrypoint for Cron Triggers.
+
+        Delegate to the existing scheduled() implementation.
+        """
+        return await self.scheduled(controller, env, ctx)
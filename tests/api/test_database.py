@@ -0,0 +1,437 @@
+"""Tests for the SQLite path of the Database wrapper."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from src.workers.api import database
+from src.workers.api.config import Settings
+from src.workers.api.database import (
+    Database,
+    _chunk_params,
+    backfill_usage_rollups,
+    count_jobs,
+    create_document,
+    create_job,
+    create_job_extended,
+    get_job_stats,
+    get_usage_summary,
+    list_jobs,
+    list_jobs_page,
+    list_pipeline_events,
+    reconcile_job_stats,
+    record_pipeline_event,
+    record_usage_event,
+    update_document,
+    update_job_status,
+)
+from src.workers.api.event_buffer import MIN_FLUSH_INTERVAL, EventWriteBuffer
+from src.workers.api.exceptions import DatabaseError
+from src.workers.api.models import JobStatusEnum
+from src.workers.api.sqlite_pool import is_read_query
+from tests.conftest import create_test_user
+
+
+class FakeStatement:
+    def __init__(self, db, sql, params=(), *, mutate_on_bind=False):
+        self.db, self.sql, self.params = db, sql, params
+        self.mutate_on_bind = mutate_on_bind
+
+    def bind(self, *params):
+        if self.mutate_on_bind:
+            self.params = params
+            return self
+        return FakeStatement(self.db, self.sql, params)
+
+    async def first(self):
+        self.db.executed.append((self.sql, self.params))
+        return {"sql": self.sql, "params": self.params}
+
+    async def all(self):
+        return [await self.first()]
+
+    async def run(self):
+        await self.first()
+        return {"success": True}
+
+
+class FakeD1:
+    """Stand-in for a D1 binding: counts prepare() calls and records executions."""
+
+    def __init__(self, *, mutate_on_bind=False, fail_batch=None):
+        self.mutate_on_bind = mutate_on_bind
+        self.fail_batch = fail_batch
+        self.prepared = []
+        self.executed = []
+        self.batches = []
+
+    def prepare(self, sql):
+        self.prepared.append(sql)
+        return FakeStatement(self, sql, mutate_on_bind=self.mutate_on_bind)
+
+    async def batch(self, statements):
+        self.batches.append(len(statements))
+        if len(self.batches) == self.fail_batch:
+            raise RuntimeError("D1_ERROR: UNIQUE constraint failed")
+        return [await statement.run() for statement in statements]
+
+
+def test_is_read_query_routes_only_plain_selects_to_readers():
+    assert is_read_query("  SELECT * FROM jobs WHERE job_id = ?")
+    assert is_read_query("select 1")
+    assert not is_read_query("INSERT INTO jobs (job_id) VALUES (?) RETURNING *")
+    assert not is_read_query("UPDATE jobs SET status = ? WHERE job_id = ?")
+    assert not is_read_query("PRAGMA table_info('jobs')")
+
+
+@pytest.mark.asyncio
+async def test_pooled_connections_use_wal_and_are_reused(isolated_db):
+    db = isolated_db
+    await db.execute("CREATE TABLE IF NOT EXISTS pool_probe (id INTEGER PRIMARY KEY, value TEXT)")
+    await db.execute_many("INSERT INTO pool_probe (value) VALUES (?)", [("a",), ("b",), ("c",)])
+
+    rows = await asyncio.gather(*(db.execute_all("SELECT value FROM pool_probe ORDER BY id") for _ in range(20)))
+    assert all([row["value"] for row in result] == ["a", "b", "c"] for result in rows)
+    assert (await db.execute("PRAGMA journal_mode"))[0] == "wal"
+
+    stats = db.sqlite_pool_stats()
+    assert stats["readers"]["calls"] == 20
+    assert stats["writer"]["calls"] == 3
+    assert stats["readers"]["waiting"] == 0 and stats["readers"]["in_flight"] == 0
+    # One writer plus at most one connection per reader thread, however many calls ran
+    assert stats["connections"] <= 1 + stats["readers"]["workers"]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_rolls_back_and_writer_stays_usable(isolated_db):
+    db = isolated_db
+    await db.execute("CREATE TABLE IF NOT EXISTS pool_probe (id INTEGER PRIMARY KEY, value TEXT NOT NULL)")
+    with pytest.raises(DatabaseError):
+        await db.batch([
+            ("INSERT INTO pool_probe (value) VALUES (?)", ("kept?",)),
+            ("INSERT INTO pool_probe (value) VALUES (?)", (None,)),
+        ])
+    assert await db.execute_all("SELECT * FROM pool_probe") == []
+
+    await db.execute("INSERT INTO pool_probe (value) VALUES (?)", ("ok",))
+    assert (await db.execute("SELECT COUNT(*) AS n FROM pool_probe"))["n"] == 1
+    assert db.sqlite_pool_stats()["writer"]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_d1_statements_are_prepared_once_and_rebound_per_call():
+    d1 = FakeD1()
+    db = Database(db=d1)
+    for user_id in ("a", "b", "c"):
+        row = await db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
+        assert row["params"] == (user_id,)
+    await db.execute_all("SELECT * FROM jobs WHERE user_id = ?", ("a",))
+
+    assert d1.prepared == ["SELECT * FROM users WHERE user_id = ?", "SELECT * FROM jobs WHERE user_id = ?"]
+    stats = db.statement_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert stats["statements"]["SELECT * FROM users WHERE user_id = ?"]["calls"] == 3
+
+
+@pytest.mark.asyncio
+async def test_statement_cache_stops_sharing_when_bind_mutates():
+    d1 = FakeD1(mutate_on_bind=True)
+    db = Database(db=d1)
+    await db.execute("SELECT ?", (1,))
+    await db.execute("SELECT ?", (2,))
+    assert d1.executed == [("SELECT ?", (1,)), ("SELECT ?", (2,))]
+    assert len(d1.prepared) == 2  # re-prepared per call rather than shared
+
+
+@pytest.mark.asyncio
+async def test_d1_execute_many_sends_chunked_batches_and_reports_each_chunk():
+    d1 = FakeD1()
+    db = Database(db=d1)
+    params = [(index,) for index in range(250)]
+    reports = await db.execute_many("INSERT INTO t (value) VALUES (?)", params, return_reports=True)
+
+    assert d1.batches == [100, 100, 50]
+    assert [(r["offset"], r["count"], r["error"]) for r in reports] == [(0, 100, None), (100, 100, None), (200, 50, None)]
+    assert [p for _, p in d1.executed] == params
+    assert len(d1.prepared) == 1
+
+
+@pytest.mark.asyncio
+async def test_d1_execute_many_reports_failed_chunk_and_stops():
+    d1 = FakeD1(fail_batch=2)
+    db = Database(db=d1)
+    params = [(index,) for index in range(25)]
+    reports = await db.execute_many("INSERT INTO t (value) VALUES (?)", params, chunk_size=10, return_reports=True)
+    assert [(r["offset"], r["error"] is None) for r in reports] == [(0, True), (10, False)]
+    assert "UNIQUE" in reports[1]["error"]
+
+    d1 = FakeD1(fail_batch=2)
+    reports = await Database(db=d1).execute_many(
+        "INSERT INTO t (value) VALUES (?)", params, chunk_size=10, return_reports=True, stop_on_error=False
+    )
+    assert [r["error"] is None for r in reports] == [True, False, True]
+
+
+@pytest.mark.asyncio
+async def test_execute_many_raises_on_failure_by_default(isolated_db):
+    d1 = FakeD1(fail_batch=2)
+    params = [(index,) for index in range(25)]
+    with pytest.raises(DatabaseError, match="first 10 rows were committed"):
+        await Database(db=d1).execute_many("INSERT INTO t (value) VALUES (?)", params, chunk_size=10)
+    assert d1.batches == [10, 10]
+
+    await isolated_db.execute("CREATE TABLE IF NOT EXISTS many_probe (value TEXT UNIQUE)")
+    assert await isolated_db.execute_many("INSERT INTO many_probe (value) VALUES (?)", [("a",), ("b",)]) == [1, 1]
+    with pytest.raises(DatabaseError):
+        await isolated_db.execute_many("INSERT INTO many_probe (value) VALUES (?)", [("c",), ("a",)])
+    rows = await isolated_db.execute_all("SELECT value FROM many_probe ORDER BY value")
+    assert [row["value"] for row in rows] == ["a", "b"]
+
+
+def test_chunk_params_respects_the_byte_cap():
+    chunks = _chunk_params("INSERT INTO t VALUES (?)", [("x" * 400,)] * 10, max_statements=100, max_bytes=1000)
+    assert [(offset, len(chunk)) for offset, chunk in chunks] == [(0, 2), (2, 2), (4, 2), (6, 2), (8, 2)]
+
+
+class StubJsArray:
+    """Minimal JsProxy stand-in: rows are reachable per item or in bulk via to_py()."""
+
+    def __init__(self, rows, *, convert_rows=True):
+        self.rows = rows
+        self.convert_rows = convert_rows
+        self.to_py_calls = 0
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def to_py(self):
+        self.to_py_calls += 1
+        return [dict(row) if self.convert_rows else object() for row in self.rows]
+
+
+def test_rows_to_dicts_converts_d1_results_in_one_call(monkeypatch):
+    monkeypatch.setattr(database, "_jsproxy_type", StubJsArray)
+    results = StubJsArray([{"job_id": "a", "status": "pending"}, {"job_id": "b", "status": "completed"}])
+    assert database._rows_to_dicts(results) == [
+        {"job_id": "a", "status": "pending"},
+        {"job_id": "b", "status": "completed"},
+    ]
+    assert results.to_py_calls == 1
+
+
+def test_rows_to_dicts_falls_back_to_json_round_trip(monkeypatch):
+    class FakeJSON:
+        @staticmethod
+        def stringify(value):
+            return json.dumps(value.rows)
+
+    monkeypatch.setattr(database, "_jsproxy_type", StubJsArray)
+    monkeypatch.setattr(database, "_js_json", FakeJSON)
+    results = StubJsArray([{"job_id": "a"}], convert_rows=False)
+    assert database._rows_to_dicts(results) == [{"job_id": "a"}]
+
+
+async def _seed_jobs(db, user_id, count):
+    await create_test_user(db, user_id=user_id)
+    for index in range(count):
+        await create_job(db, f"job-{index:03d}", user_id, "folder", [".jpg"])
+    # Several jobs share each created_at second so the job_id tie-break matters
+    await db.execute(
+        "UPDATE jobs SET created_at = '2024-01-01 00:00:' || printf('%02d', CAST(substr(job_id, 5) AS INTEGER) / 3)"
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_jobs_page_walks_every_job_once_in_order(isolated_db):
+    await _seed_jobs(isolated_db, "pager", 23)
+    expected, total = await list_jobs(isolated_db, "pager", page=1, page_size=100)
+    assert total == 23
+
+    seen, cursor = [], None
+    while True:
+        jobs, cursor = await list_jobs_page(isolated_db, "pager", cursor=cursor, page_size=5)
+        seen.extend(job["job_id"] for job in jobs)
+        if cursor is None:
+            break
+    assert seen == [job["job_id"] for job in expected]
+    assert len(set(seen)) == 23
+
+
+@pytest.mark.asyncio
+async def test_list_jobs_page_rejects_malformed_cursor(isolated_db):
+    with pytest.raises(ValueError):
+        await list_jobs_page(isolated_db, "pager", cursor="not-a-cursor")
+
+
+async def _full_scan_stats(db, user_id):
+    row = await db.execute(
+        "SELECT COUNT(*) as total, SUM(status = 'pending') as pending, SUM(status = 'processing') as processing, "
+        "SUM(status = 'completed') as completed, SUM(status = 'failed') as failed, "
+        "SUM(status = 'cancelled') as cancelled FROM jobs WHERE user_id = ?",
+        (user_id,),
+    )
+    return {key: row[key] or 0 for key in row.keys()}
+
+
+@pytest.mark.asyncio
+async def test_job_stats_counters_track_creates_transitions_and_deletes(isolated_db):
+    await _seed_jobs(isolated_db, "counted", 6)
+    await update_job_status(isolated_db, "job-000", JobStatusEnum.PROCESSING)
+    await update_job_status(isolated_db, "job-000", JobStatusEnum.COMPLETED)
+    await update_job_status(isolated_db, "job-001", JobStatusEnum.FAILED, error="boom")
+    await update_job_status(isolated_db, "job-002", JobStatusEnum.CANCELLED)
+    await update_job_status(isolated_db, "job-002", JobStatusEnum.CANCELLED)
+    await isolated_db.execute("DELETE FROM jobs WHERE job_id = ?", ("job-003",))
+
+    stats = await get_job_stats(isolated_db, "counted")
+    assert stats == await _full_scan_stats(isolated_db, "counted")
+    assert stats == {"total": 5, "pending": 2, "processing": 0, "completed": 1, "failed": 1, "cancelled": 1}
+    assert await count_jobs(isolated_db, "counted", "pending") == 2
+    assert (await get_job_stats(isolated_db))["total"] == 5
+    assert await get_job_stats(isolated_db, "nobody") == dict.fromkeys(stats, 0)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_job_stats_repairs_drift(isolated_db):
+    await _seed_jobs(isolated_db, "drifted", 4)
+    assert await reconcile_job_stats(isolated_db) == {"checked": 1, "repaired": 0}
+
+    await isolated_db.execute("UPDATE job_stats SET total = 40, pending = 0 WHERE user_id = ?", ("drifted",))
+    assert await reconcile_job_stats(isolated_db, "drifted") == {"checked": 1, "repaired": 1}
+    assert await get_job_stats(isolated_db, "drifted") == await _full_scan_stats(isolated_db, "drifted")
+
+    await isolated_db.execute("DELETE FROM job_stats")
+    assert (await reconcile_job_stats(isolated_db))["repaired"] == 1
+    assert (await get_job_stats(isolated_db, "drifted"))["pending"] == 4
+
+
+@pytest.mark.asyncio
+async def test_usage_summary_combines_rollups_with_raw_edge_bucket(isolated_db):
+    await _seed_jobs(isolated_db, "metered", 1)
+    await record_usage_event(isolated_db, "metered", "job-000", "download", {"bytes_downloaded": 1000, "duration_s": 90.5})
+    await record_usage_event(isolated_db, "metered", "job-000", "transcribe", {"duration_s": 30})
+    summary = await get_usage_summary(isolated_db, "metered", window_days=7)
+    assert (summary["events"], summary["bytes_downloaded"], summary["audio_duration_s"]) == (2, 1000, 120)
+
+    # Historical events written without rollups: one just inside the window edge, one outside it
+    for event_id, age, metrics in (
+        ("edge", "-7 days", '{"bytes_downloaded": 24, "duration_s": 60}'),
+        ("old", "-9 days", '{"bytes_downloaded": 999}'),
+    ):
+        await isolated_db.execute(
+            "INSERT INTO usage_events (id, user_id, job_id, event_type, metrics, created_at) "
+            "VALUES (?, 'metered', 'job-000', 'download', ?, datetime('now', ?, '+2 seconds'))",
+            (event_id, metrics, age),
+        )
+    buckets = await backfill_usage_rollups(isolated_db)
+    assert buckets["usage_rollups_daily"] == 3
+
+    # Backfilled rollups are recomputed from usage_events, and the edge event is counted once
+    summary = await get_usage_summary(isolated_db, "metered", window_days=7)
+    assert (summary["events"], summary["bytes_downloaded"], summary["audio_duration_s"]) == (3, 1024, 180)
+    assert (await get_usage_summary(isolated_db, "metered", window_days=30))["bytes_downloaded"] == 2023
+
+
+@pytest.mark.asyncio
+async def test_event_buffer_flushes_in_order_by_size_and_isolates_bad_events():
+    written, batches = [], []
+
+    async def write_batch(statements):
+        if any(params == ("bad",) for _, params in statements):
+            raise DatabaseError("constraint failed")
+        batches.append(len(statements))
+        written.extend(params[0] for _, params in statements)
+
+    buffer = EventWriteBuffer(write_batch, max_batch=3, flush_interval=60, max_pending=4)
+    for index in range(3):
+        await buffer.add([("INSERT", (f"job-a:{index}",))])
+    # The size trigger wakes the flusher without waiting out the 60s interval
+    for _ in range(20):
+        if len(written) == 3:
+            break
+        await asyncio.sleep(0)
+    assert written == ["job-a:0", "job-a:1", "job-a:2"]
+
+    await buffer.add([("INSERT", ("job-b:0",))])
+    await buffer.add([("INSERT", ("bad",))])
+    await buffer.add([("INSERT", ("job-b:1",)), ("UPSERT", ("job-b:1-rollup",))])
+    await buffer.close()
+    assert written[3:] == ["job-b:0", "job-b:1", "job-b:1-rollup"]
+    assert buffer.stats()["dropped"] == 1
+    with pytest.raises(RuntimeError):
+        await buffer.add([("INSERT", ("late",))])
+
+
+@pytest.mark.asyncio
+async def test_event_buffer_applies_backpressure_when_full():
+    written = []
+
+    async def write_batch(statements):
+        written.extend(params[0] for _, params in statements)
+
+    buffer = EventWriteBuffer(write_batch, max_batch=2, flush_interval=60, max_pending=2)
+    # Nothing here yields to the background flusher, so only backpressure can flush
+    for index in range(5):
+        await buffer.add([("INSERT", (index,))])
+    assert written == [0, 1, 2, 3]
+    assert buffer.stats()["backpressure_waits"] == 2
+    await buffer.close()
+    assert written == [0, 1, 2, 3, 4]
+
+
+def test_event_buffer_flush_interval_has_a_floor():
+    async def write_batch(statements):
+        pass
+
+    # A zero interval would turn the background flusher into a busy loop
+    assert EventWriteBuffer(write_batch, flush_interval=0).flush_interval == MIN_FLUSH_INTERVAL
+    assert Settings(jwt_secret_key="test-key", event_buffer_flush_ms=0).event_buffer_flush_ms == 10
+
+@pytest.mark.asyncio
+async def test_buffered_pipeline_events_are_written_on_close(isolated_db):
+    await _seed_jobs(isolated_db, "eventful", 1)
+    isolated_db.enable_event_buffer(max_batch=100, flush_interval=60)
+    for index in range(5):
+        await record_pipeline_event(isolated_db, "eventful", "job-000", "ingest_youtube", message=f"step {index}")
+    assert await list_pipeline_events(isolated_db, "eventful", job_id="job-000") == []
+
+    await isolated_db.close_event_buffer()
+    events = await list_pipeline_events(isolated_db, "eventful", job_id="job-000")
+    assert [event["message"] for event in events] == [f"step {index}" for index in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_event_enrichment_is_cached_until_invalidated(isolated_db):
+    def lookups():
+        stats = isolated_db.statement_stats(top=None)["statements"]
+        return sum(
+            entry["calls"] for sql, entry in stats.items()
+            if sql.startswith(("SELECT * FROM jobs", "SELECT * FROM documents"))
+        )
+
+    await create_test_user(isolated_db, user_id="enriched")
+    await create_document(isolated_db, "doc-1", "enriched", "youtube", frontmatter={"title": "First", "slug": "first"})
+    await create_job_extended(isolated_db, "job-e", "enriched", job_type="ingest_youtube", document_id="doc-1")
+
+    for _ in range(5):
+        await record_pipeline_event(isolated_db, "enriched", "job-e", "ingest_youtube")
+    assert lookups() == 2
+
+    await update_document(isolated_db, "doc-1", {"frontmatter": {"title": "Renamed"}})
+    await update_job_status(isolated_db, "job-e", JobStatusEnum.PROCESSING)
+    await record_pipeline_event(isolated_db, "enriched", "job-e", "ingest_youtube")
+    assert lookups() == 4
+    # Another user's event for the same job must not be served from the owner's cache entry
+    await record_pipeline_event(isolated_db, "intruder", "job-e", "ingest_youtube")
+    assert lookups() == 5
+
+    events = await list_pipeline_events(isolated_db, "enriched", job_id="job-e")
+    assert [event["data"]["document_title"] for event in events] == ["First"] * 5 + ["Renamed"]
+    assert events[0]["data"]["document_slug"] == "first"
+    assert "document_slug" not in events[-1]["data"]
+    assert isolated_db.enrichment_cache_stats()["documents"]["hits"] == 4
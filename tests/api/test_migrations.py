@@ -0,0 +1,64 @@
+"""Tests for the versioned schema migrations."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from src.workers.api import migrations
+from src.workers.api.database import create_job, get_usage_summary
+from src.workers.api.migrations import LATEST_VERSION, MIGRATIONS, get_schema_version, migrate, v0001_baseline
+from tests.conftest import create_test_user
+
+
+def test_migrations_are_listed_in_order_and_match_the_package_files():
+    files = sorted(path.stem for path in Path(migrations.__file__).parent.glob("v[0-9][0-9][0-9][0-9]_*.py"))
+    assert [f"v{m.version:04d}_{m.name}" for m in MIGRATIONS] == files
+    assert [m.version for m in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+
+@pytest.mark.asyncio
+async def test_migrate_records_version_then_only_checks_it(isolated_db):
+    assert await get_schema_version(isolated_db) == 0
+    assert await migrate(isolated_db) == LATEST_VERSION
+    row = await isolated_db.execute("SELECT name FROM schema_version WHERE version = ?", (1,))
+    assert row["name"] == "baseline"
+
+    before = isolated_db.statement_stats(top=None)["statements"]
+    calls_before = sum(entry["calls"] for entry in before.values())
+    assert await migrate(isolated_db) == LATEST_VERSION
+    after = isolated_db.statement_stats(top=None)["statements"]
+    assert sum(entry["calls"] for entry in after.values()) == calls_before + 1
+
+
+@pytest.mark.asyncio
+async def test_migrate_applies_only_newer_migrations(isolated_db, monkeypatch):
+    applied = []
+
+    async def upgrade(db):
+        applied.append("probe")
+        await db.execute("CREATE TABLE IF NOT EXISTS migration_probe (id INTEGER)", ())
+
+    await migrate(isolated_db)
+    probe_version = LATEST_VERSION + 1
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS + [migrations.Migration(probe_version, "probe", upgrade)])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", probe_version)
+    assert await migrate(isolated_db) == probe_version
+    assert await migrate(isolated_db) == probe_version
+    assert applied == ["probe"]
+
+
+@pytest.mark.asyncio
+async def test_rollup_backfill_migration_covers_events_recorded_before_rollups(isolated_db):
+    await v0001_baseline.upgrade(isolated_db)
+    await create_test_user(isolated_db, user_id="legacy")
+    await create_job(isolated_db, "job-legacy", "legacy", "folder", [".jpg"])
+    await isolated_db.execute(
+        "INSERT INTO usage_events (id, user_id, job_id, event_type, metrics) "
+        "VALUES ('legacy-event', 'legacy', 'job-legacy', 'download', '{\"bytes_downloaded\": 512}')"
+    )
+    assert (await get_usage_summary(isolated_db, "legacy", window_days=7))["events"] == 0
+
+    assert await migrate(isolated_db) == LATEST_VERSION
+    summary = await get_usage_summary(isolated_db, "legacy", window_days=7)
+    assert (summary["events"], summary["bytes_downloaded"]) == (1, 512)
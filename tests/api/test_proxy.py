@@ -4,8 +4,10 @@ from __future__ import annotations
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
-from fastapi import Request
+from fastapi import FastAPI, Request
 
+from src.workers.api import proxy
+from src.workers.api.deps import get_saas_user
 from src.workers.api.proxy import (
     router,
     _identity_key,
@@ -163,22 +165,97 @@ async def test_pick_proxy_with_manual_proxies():
 async def test_pick_proxy_with_free_proxies_enabled():
     """Test that _pick_proxy uses proxy pool manager when free proxies enabled."""
     from src.workers.core.youtube_proxy import _pick_proxy
-    import asyncio
     
     with patch("src.workers.core.youtube_proxy.settings") as mock_settings, \
          patch("src.workers.core.youtube_proxy.get_proxy_pool_manager") as mock_get_manager:
         
         mock_settings.youtube_scraper_enable_free_proxies = True
         mock_manager = MagicMock()
+        mock_manager.proxies = {}
         mock_manager.get_next_proxy.return_value = "http://free-proxy:8080"
-        mock_manager.refresh_pool = AsyncMock()
+        mock_manager.scheduler.ensure_populated = AsyncMock()
         mock_get_manager.return_value = mock_manager
         
         proxy, is_free = await _pick_proxy()
         assert proxy == "http://free-proxy:8080"
         assert is_free is True
-        # Give the task a moment to be created
-        await asyncio.sleep(0.01)
-        # refresh_pool is called via create_task, so we can't easily assert it was called
-        # but we can verify get_next_proxy was called
+        # Empty pool is filled through the scheduler; background work is only scheduled
+        mock_manager.scheduler.ensure_populated.assert_awaited_once()
+        mock_manager.scheduler.schedule.assert_called_once()
         mock_manager.get_next_proxy.assert_called_once()
+
+
+def test_bulk_request_dedupes_and_validates_video_ids():
+    """Bulk request keeps first-seen order, drops duplicates and rejects bad IDs."""
+    from pydantic import ValidationError
+    from src.workers.api.models import TranscriptProxyBulkRequest
+
+    body = TranscriptProxyBulkRequest(video_ids=["aaaaaaaaaaa", "bbbbbbbbbbb", "aaaaaaaaaaa"])
+    assert body.video_ids == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+    with pytest.raises(ValidationError):
+        TranscriptProxyBulkRequest(video_ids=["short"])
+    with pytest.raises(ValidationError):
+        TranscriptProxyBulkRequest(video_ids=[])
+
+
+@pytest.mark.asyncio
+async def test_stream_bulk_results_partial_failures_and_concurrency_bound():
+    """Bulk stream emits one NDJSON line per video with per-item error codes."""
+    import asyncio
+    import json
+    from src.workers.api import proxy
+
+    in_flight = 0
+    peak = 0
+
+    async def fake_fetch(video_id, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if video_id.startswith("x"):
+            raise proxy.TranscriptProxyError("no_captions", "No captions")
+        return {
+            "transcript": {"text": f"text {video_id}", "format": "json3"},
+            "metadata": {"method": "innertube", "videoId": video_id},
+        }
+
+    video_ids = [f"{'x' if i % 3 == 0 else 'v'}{i:010d}" for i in range(9)]
+    with patch.object(proxy, "fetch_transcript_via_proxy", side_effect=fake_fetch), \
+         patch.object(proxy.settings, "youtube_transcript_bulk_concurrency", 2):
+        lines = [line async for line in proxy._stream_bulk_results(video_ids, None, None)]
+
+    items = {item["video_id"]: item for item in map(json.loads, lines)}
+    assert set(items) == set(video_ids)
+    assert peak <= 2
+    assert items["x0000000000"]["success"] is False
+    assert items["x0000000000"]["error"]["code"] == "no_captions"
+    assert items["v0000000001"]["success"] is True
+    assert items["v0000000001"]["transcript"]["text"] == "text v0000000001"
+
+
+def test_bulk_route_charges_the_rate_limit_per_video_id():
+    """A bulk call costs one request per video and is rejected whole when it doesn't fit."""
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_saas_user] = lambda: {"user_id": "bulk-user"}
+    fetch = AsyncMock(return_value={"transcript": {"text": "hi", "format": "json3"}, "metadata": {}})
+    video_ids = [f"v{i:010d}" for i in range(6)]
+
+    with patch.object(proxy, "_rate_limits", return_value=(5, 1000)), \
+         patch.object(proxy, "_resolve_youtube_access_token", AsyncMock(return_value=(None, None))), \
+         patch.object(proxy, "fetch_transcript_via_proxy", fetch):
+        client = TestClient(app)
+        too_many = client.post("/api/proxy/youtube-transcript/bulk", json={"video_ids": video_ids})
+        assert too_many.status_code == 429
+        assert too_many.json()["error"]["details"] == {"video_count": 6}
+        assert fetch.await_count == 0
+
+        # The rejected call charged nothing, so five IDs still fit
+        accepted = client.post("/api/proxy/youtube-transcript/bulk", json={"video_ids": video_ids[:5]})
+        assert accepted.status_code == 200
+        assert len(accepted.text.splitlines()) == 5
+
+        exhausted = client.post("/api/proxy/youtube-transcript/bulk", json={"video_ids": video_ids[5:]})
+        assert exhausted.status_code == 429
@@ -76,6 +76,7 @@ def isolated_db(tmp_path_factory):
         # Ensure the global deps.ensure_db() uses this instance
         set_db_instance(db)
         yield db
+        db.close()
     finally:
         if original_path is None:
             os.environ.pop("LOCAL_SQLITE_PATH", None)
@@ -0,0 +1,164 @@
+"""Tests for the multi-source proxy fetcher, against local fixture servers."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.workers.core import proxy_fetcher
+from src.workers.core.proxy_fetcher import (
+    ProxyProvider,
+    fetch_all_free_proxies,
+    fetch_proxy_candidates,
+    normalize_proxy_url,
+    record_proxy_rejected,
+    record_proxy_working,
+)
+
+FIXTURES = {
+    "/plain.txt": ("text/plain", "# free list\n1.1.1.1:8080\nhttp://2.2.2.2:3128\n\nsocks5://9.9.9.9:1080\n"),
+    "/list.json": ("application/json", json.dumps({"data": [
+        {"ip": "2.2.2.2", "port": "3128", "protocols": ["http"]},
+        {"ip": "3.3.3.3", "port": "80", "protocols": ["socks4"]},
+        {"proxy": "https://4.4.4.4:443"},
+    ]})),
+    "/list.csv": ("text/csv", "IP,Port,Type\n5.5.5.5,8000,HTTP\n6.6.6.6,1080,socks5\n"),
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow.txt":
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"7.7.7.7:80\n")
+            self.wfile.flush()
+            time.sleep(1.0)
+            return
+        if self.path not in FIXTURES:
+            self.send_response(503)
+            self.end_headers()
+            return
+        content_type, body = FIXTURES[self.path]
+        payload = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    registry = {}
+    monkeypatch.setattr(proxy_fetcher, "_providers", registry)
+    monkeypatch.setattr(proxy_fetcher, "_proxy_origins", OrderedDict())
+    return registry
+
+
+def _register(registry, base, name, path, fmt="text", timeout=5.0):
+    registry[name] = ProxyProvider(name=name, url=f"{base}{path}", format=fmt, timeout=timeout)
+    return registry[name]
+
+
+def test_normalize_proxy_url():
+    assert normalize_proxy_url("192.168.1.1:8080") == "http://192.168.1.1:8080"
+    assert normalize_proxy_url("HTTPS://Example.COM:0443/") == "https://example.com:443"
+    assert normalize_proxy_url("http://user:Pw@host:80") == "http://user:Pw@host:80"
+    assert normalize_proxy_url("socks5://1.2.3.4:1080") == ""
+    assert normalize_proxy_url("1.2.3.4:notaport") == ""
+    assert normalize_proxy_url("") == ""
+
+
+@pytest.mark.asyncio
+async def test_fetches_all_formats_concurrently_and_dedupes(fixture_server, providers):
+    _register(providers, fixture_server, "plain", "/plain.txt")
+    _register(providers, fixture_server, "json", "/list.json", fmt="json")
+    _register(providers, fixture_server, "csv", "/list.csv", fmt="csv")
+    slow = _register(providers, fixture_server, "slow", "/slow.txt", timeout=0.3)
+    broken = _register(providers, fixture_server, "broken", "/missing.txt")
+
+    started = time.perf_counter()
+    candidates = await fetch_proxy_candidates()
+    assert time.perf_counter() - started < 0.9  # slow source cut off at its own timeout
+
+    assert candidates == {
+        "http://1.1.1.1:8080": "plain",
+        "http://2.2.2.2:3128": "plain",
+        "https://4.4.4.4:443": "json",
+        "http://5.5.5.5:8000": "csv",
+    }
+    assert providers["json"].fetched == 2 and providers["json"].unique == 1
+    assert slow.last_error == "timeout" and broken.errors == 1
+
+    record_proxy_working("http://2.2.2.2:3128")
+    record_proxy_working("http://2.2.2.2:3128")  # only the first success counts
+    assert providers["plain"].working == 1
+    assert proxy_fetcher.get_provider_stats()["plain"]["yield_ratio"] == 1.0
+    record_proxy_rejected("http://1.1.1.1:8080")
+    assert proxy_fetcher.get_provider_stats()["plain"]["yield_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_low_yield_sources_are_polled_less(fixture_server, providers, monkeypatch):
+    monkeypatch.setattr(proxy_fetcher, "MIN_YIELD_SAMPLE", 1)
+    plain = _register(providers, fixture_server, "plain", "/plain.txt")
+    csv_source = _register(providers, fixture_server, "csv", "/list.csv")
+    csv_source.format = "csv"
+    plain.working, plain.rejected = 1, 99  # 1% of probed proxies worked
+    csv_source.working, csv_source.rejected = 50, 50
+
+    for _ in range(3):
+        await fetch_all_free_proxies()
+    assert csv_source.polls == 3
+    assert plain.polls == 1
+    assert plain.skipped_polls == 2
+
+
+@pytest.mark.asyncio
+async def test_repolling_a_stable_list_neither_adds_unique_nor_lowers_yield(fixture_server, providers, monkeypatch):
+    monkeypatch.setattr(proxy_fetcher, "MIN_YIELD_SAMPLE", 1)
+    plain = _register(providers, fixture_server, "plain", "/plain.txt")
+
+    await fetch_proxy_candidates()
+    record_proxy_working("http://1.1.1.1:8080")
+    record_proxy_rejected("http://2.2.2.2:3128")
+    for _ in range(5):
+        await fetch_proxy_candidates()
+
+    # Only the two distinct URLs count, and only probe outcomes move the ratio
+    assert plain.unique == 2
+    assert plain.yield_ratio == 0.5
+    assert plain.polls == 6 and plain.skipped_polls == 0
+
+
+@pytest.mark.asyncio
+async def test_origin_tracking_evicts_oldest_instead_of_freezing(fixture_server, providers, monkeypatch):
+    monkeypatch.setattr(proxy_fetcher, "_MAX_TRACKED_ORIGINS", 2)
+    _register(providers, fixture_server, "plain", "/plain.txt")
+    csv_source = _register(providers, fixture_server, "csv", "/list.csv", fmt="csv")
+
+    await fetch_proxy_candidates()
+    # The cap dropped the oldest entry; the newest proxy is still attributed
+    assert list(proxy_fetcher._proxy_origins) == ["http://2.2.2.2:3128", "http://5.5.5.5:8000"]
+    record_proxy_rejected("http://5.5.5.5:8000")
+    proxy_fetcher.discard_proxy_origin("http://2.2.2.2:3128")
+    assert csv_source.rejected == 1 and not proxy_fetcher._proxy_origins
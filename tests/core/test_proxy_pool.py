@@ -0,0 +1,420 @@
+"""Tests for adaptive proxy scoring and selection."""
+from __future__ import annotations
+
+import asyncio
+import random
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import pytest
+
+from src.workers.core import proxy_fetcher, proxy_pool
+from src.workers.core.proxy_index import ProxySelectionIndex
+from src.workers.core.proxy_pool import ProxyEntry, ProxyPoolManager
+
+
+def _manager(*urls: str, strategy: str = "weighted") -> ProxyPoolManager:
+    manager = ProxyPoolManager()
+    manager.proxies = {url: ProxyEntry(url=url) for url in urls}
+    manager.rotation_strategy = strategy
+    return manager
+
+
+def test_observe_updates_ewma_and_decays_toward_priors():
+    entry = ProxyEntry(url="http://1.1.1.1:80")
+    entry.observe(True, 200.0, now=0.0)
+    success, latency = entry.decayed_estimates(now=0.0)
+    assert success == pytest.approx(0.65)
+    assert latency == pytest.approx(0.7 * proxy_pool.PRIOR_LATENCY_MS + 0.3 * 200.0)
+
+    half_life = proxy_pool.EWMA_HALF_LIFE_SECONDS
+    decayed_success, decayed_latency = entry.decayed_estimates(now=half_life)
+    assert decayed_success == pytest.approx((success + proxy_pool.PRIOR_SUCCESS) / 2)
+    assert decayed_latency == pytest.approx((latency + proxy_pool.PRIOR_LATENCY_MS) / 2)
+
+
+def test_score_penalises_failures_more_than_latency():
+    fast_flaky = ProxyEntry(url="http://1.1.1.1:80")
+    slow_reliable = ProxyEntry(url="http://2.2.2.2:80")
+    for _ in range(10):
+        fast_flaky.observe(False, 5000.0, now=0.0)
+        slow_reliable.observe(True, 1500.0, now=0.0)
+    assert slow_reliable.score(now=0.0) < fast_flaky.score(now=0.0)
+
+
+@pytest.mark.parametrize("strategy", ["weighted", "p2c"])
+def test_adaptive_strategies_prefer_faster_proxy(strategy):
+    random.seed(1)
+    manager = _manager("http://fast:80", "http://slow:80", "http://dead:80", strategy=strategy)
+    for _ in range(10):
+        manager.mark_proxy_success("http://fast:80", 200.0)
+        manager.mark_proxy_success("http://slow:80", 3000.0)
+        manager.mark_proxy_failure("http://dead:80", 5000.0)
+
+    picks = [manager.get_next_proxy() for _ in range(300)]
+    assert picks.count("http://fast:80") > picks.count("http://slow:80")
+    assert "http://dead:80" not in picks  # its circuit breaker is open
+
+    stats = manager.get_pool_stats()
+    assert stats["rotation_strategy"] == strategy
+    assert stats["observed_proxies"] == 3
+
+
+def test_selection_index_matches_brute_force_under_churn():
+    rng = random.Random(5)
+    random.seed(5)
+    urls = [f"http://10.0.0.{i}:80" for i in range(40)]
+    manager = _manager(*urls[:20])
+    for _ in range(2000):
+        op = rng.random()
+        url = rng.choice(urls)
+        with manager._sync_lock:
+            if op < 0.1:
+                manager._add_proxy(ProxyEntry(url=url))
+            elif op < 0.15:
+                manager._remove_proxy(url)
+            elif op < 0.25 and url in manager.proxies:
+                manager.proxies[url].is_active = not manager.proxies[url].is_active
+                manager._reindex(manager.proxies[url])
+        if 0.25 <= op < 0.6:
+            manager.mark_proxy_success(url, rng.uniform(50, 5000))
+        elif 0.6 <= op < 0.8:
+            manager.mark_proxy_failure(url, rng.uniform(50, 5000))
+        else:
+            manager.rotation_strategy = rng.choice(["random", "round_robin", "weighted", "p2c", "best", "lru"])
+            manager.get_next_proxy()
+
+        index = manager._index
+        active = [
+            p for p in manager.proxies.values()
+            if p.is_active and p.breaker.state == proxy_pool.BREAKER_CLOSED
+        ]
+        assert sorted(index.urls()) == sorted(p.url for p in active)
+        if active:
+            best = manager.proxies[index.best()]
+            assert (best.success_rate, best.total_attempts) == max((p.success_rate, p.total_attempts) for p in active)
+            floor = datetime.min.replace(tzinfo=timezone.utc)
+            lru = manager.proxies[index.least_recently_used()]
+            assert (lru.last_used or floor) == min(p.last_used or floor for p in active)
+            assert index._weights.total() == pytest.approx(sum(index._weights.value(i) for i in range(len(index))))
+
+
+def test_weighted_choice_follows_weights():
+    random.seed(3)
+    index = ProxySelectionIndex()
+    for url, weight in (("a", 1.0), ("b", 3.0), ("c", 6.0)):
+        index.update(url, active=True, weight=weight, best_key=(0.0, 0), last_used=None)
+    index.remove("b")
+    index.update("d", active=True, weight=3.0, best_key=(0.0, 0), last_used=None)
+    picks = [index.weighted_choice() for _ in range(10_000)]
+    assert picks.count("b") == 0
+    assert picks.count("c") / len(picks) == pytest.approx(0.6, abs=0.03)
+    assert picks.count("d") / len(picks) == pytest.approx(0.3, abs=0.03)
+
+
+def test_circuit_breaker_opens_probes_and_backs_off(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(proxy_pool.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(proxy_pool, "BREAKER_PROBE_SHARE", 1.0)
+    manager = _manager("http://bad:80", "http://good:80", strategy="round_robin")
+
+    for _ in range(proxy_pool.BREAKER_FAILURE_THRESHOLD):
+        manager.mark_proxy_failure("http://bad:80", 5000.0)
+    breaker = manager.proxies["http://bad:80"].breaker
+    assert breaker.state == proxy_pool.BREAKER_OPEN
+    assert {manager.get_next_proxy() for _ in range(10)} == {"http://good:80"}
+
+    # Cooldown over: the next pick is the live half-open probe, then no second probe while it is in flight
+    clock[0] += proxy_pool.BREAKER_BASE_COOLDOWN_SECONDS
+    assert manager.get_next_proxy() == "http://bad:80"
+    assert breaker.state == proxy_pool.BREAKER_HALF_OPEN
+    assert manager.get_next_proxy() == "http://good:80"
+
+    # Failed probe re-opens with a doubled cooldown
+    manager.mark_proxy_failure("http://bad:80", 5000.0)
+    assert breaker.state == proxy_pool.BREAKER_OPEN
+    clock[0] += proxy_pool.BREAKER_BASE_COOLDOWN_SECONDS
+    assert manager.get_next_proxy() == "http://good:80"
+    clock[0] += proxy_pool.BREAKER_BASE_COOLDOWN_SECONDS
+    assert manager.get_next_proxy() == "http://bad:80"
+
+    manager.mark_proxy_success("http://bad:80", 300.0)
+    assert breaker.state == proxy_pool.BREAKER_CLOSED
+    assert "http://bad:80" in manager._index
+
+    stats = manager.get_pool_stats()
+    assert stats["breaker_states"] == {"closed": 2, "open": 0, "half_open": 0}
+    assert stats["breaker_transitions"] == {
+        "closed->open": 1,
+        "open->half_open": 2,
+        "half_open->open": 1,
+        "half_open->closed": 1,
+    }
+
+
+def test_tripped_proxies_are_not_picked_before_their_cooldown_ends(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(proxy_pool.time, "monotonic", lambda: clock[0])
+    manager = _manager("http://bad:80", "http://idle:80")
+    manager.proxies["http://idle:80"].is_active = False
+    manager._reindex(manager.proxies["http://idle:80"])
+    for _ in range(proxy_pool.BREAKER_FAILURE_THRESHOLD):
+        manager.mark_proxy_failure("http://bad:80")
+
+    # An inactive proxy with a closed breaker is still worth a try
+    assert {manager.get_next_proxy() for _ in range(10)} == {"http://idle:80"}
+    for _ in range(proxy_pool.BREAKER_FAILURE_THRESHOLD):
+        manager.mark_proxy_failure("http://idle:80")
+    assert manager.get_next_proxy() is None
+
+    # Once a cooldown ends, that proxy is handed out as the half-open probe
+    clock[0] += proxy_pool.BREAKER_BASE_COOLDOWN_SECONDS
+    assert manager.get_next_proxy() == "http://bad:80"
+
+def test_stuck_half_open_probe_is_retried(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(proxy_pool.time, "monotonic", lambda: clock[0])
+    manager = _manager("http://bad:80")
+    for _ in range(proxy_pool.BREAKER_FAILURE_THRESHOLD):
+        manager.mark_proxy_failure("http://bad:80")
+    clock[0] += proxy_pool.BREAKER_BASE_COOLDOWN_SECONDS
+    assert manager.get_next_proxy() == "http://bad:80"
+    assert manager.proxies["http://bad:80"].breaker.probe_in_flight
+
+    clock[0] += proxy_pool.BREAKER_PROBE_TIMEOUT_SECONDS
+    manager.get_next_proxy()
+    assert manager.proxies["http://bad:80"].breaker.probe_in_flight
+    assert manager.proxies["http://bad:80"].breaker.retry_at == clock[0] + proxy_pool.BREAKER_PROBE_TIMEOUT_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_health_check_is_bounded_incremental_and_probes_without_the_lock(monkeypatch):
+    monkeypatch.setattr(proxy_pool, "HEALTH_CHECK_CONCURRENCY", 3)
+    manager = _manager(*(f"http://10.0.0.{i}:80" for i in range(9)), "http://fresh:80")
+    manager.mark_proxy_success("http://fresh:80", 200.0)  # live traffic counts as a recent check
+    slow_gate = asyncio.Event()
+    in_flight = peak = 0
+    probed = []
+
+    async def fake_probe(proxy_url):
+        nonlocal in_flight, peak
+        assert not manager._lock.locked()
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            if proxy_url == "http://10.0.0.0:80":
+                await slow_gate.wait()
+            else:
+                await asyncio.sleep(0)
+            probed.append(proxy_url)
+            return proxy_url != "http://10.0.0.1:80"
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(manager, "_check_proxy_health", fake_probe)
+    task = asyncio.create_task(manager.health_check_all())
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+    # The slow probe holds one slot; every other stale proxy finished through the remaining two
+    assert len(probed) == 8
+    assert manager.proxies["http://10.0.0.1:80"].is_active is False
+    assert "http://10.0.0.1:80" not in manager._index
+    assert manager.last_health_check is None
+    await manager.health_check_all()  # a second run while one is in flight is a no-op
+
+    slow_gate.set()
+    await task
+    assert peak == 3
+    assert "http://fresh:80" not in probed
+    assert manager.last_health_check is not None
+
+
+@pytest.mark.asyncio
+async def test_health_results_wait_for_a_refresh_holding_the_lock(monkeypatch):
+    manager = _manager("http://a:80")
+
+    async def failing_probe(proxy_url):
+        return False
+
+    monkeypatch.setattr(manager, "_check_proxy_health", failing_probe)
+    async with manager._lock:  # e.g. a refresh replacing pool entries
+        task = asyncio.create_task(manager.health_check_all())
+        for _ in range(20):
+            await asyncio.sleep(0)
+        assert manager.proxies["http://a:80"].failure_count == 0
+        assert manager.last_health_check is None
+    await task
+    assert manager.proxies["http://a:80"].failure_count == 1
+    assert manager.last_health_check is not None
+
+
+def test_manager_reads_pool_settings(monkeypatch):
+    monkeypatch.setattr(proxy_pool.settings, "youtube_scraper_proxy_fetch_interval_minutes", 5)
+    monkeypatch.setattr(proxy_pool.settings, "youtube_scraper_max_free_proxies", 500)
+    monkeypatch.setattr(proxy_pool.settings, "youtube_scraper_proxy_rotation_strategy", "p2c")
+    manager = ProxyPoolManager()
+    assert manager.fetch_interval == 300
+    assert manager.max_proxies == 500
+    assert manager.rotation_strategy == "p2c"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_coalesces_concurrent_populate_and_refresh(monkeypatch):
+    manager = ProxyPoolManager()
+    manager.proxies = {}
+    fetches = 0
+    gate = asyncio.Event()
+
+    async def fake_fetch(timeout):
+        nonlocal fetches
+        fetches += 1
+        await gate.wait()
+        return ["http://1.1.1.1:80", "http://2.2.2.2:80"]
+
+    async def fake_probe(proxy_url):
+        return True
+
+    monkeypatch.setattr(proxy_pool, "fetch_all_free_proxies", fake_fetch)
+    monkeypatch.setattr(manager, "_check_proxy_health", fake_probe)
+    waiters = [asyncio.create_task(manager.scheduler.ensure_populated()) for _ in range(5)]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(*waiters)
+    await manager.scheduler._tasks["validate"]
+
+    assert fetches == 1
+    assert len(manager.proxies) == 2
+    assert manager.scheduler.stats == {
+        "populate_runs": 1,
+        "populate_coalesced": 4,
+        "refresh_runs": 1,
+        "validate_runs": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_only_due_jobs_once(monkeypatch):
+    manager = _manager("http://1.1.1.1:80")
+    calls = []
+
+    async def fake_refresh(*, force=False):
+        calls.append("refresh")
+        manager.last_fetch = datetime.now(timezone.utc)
+
+    async def fake_health_check(*, force=False):
+        calls.append("health")
+        manager.last_health_check = datetime.now(timezone.utc)
+
+    monkeypatch.setattr(manager, "refresh_pool", fake_refresh)
+    monkeypatch.setattr(manager, "health_check_all", fake_health_check)
+    for _ in range(10):
+        manager.scheduler.schedule()
+    await manager.scheduler._maintenance_task
+    for _ in range(10):
+        manager.scheduler.schedule()
+    await asyncio.sleep(0)
+
+    assert calls == ["refresh", "health"]
+    assert manager.scheduler._maintenance_task.done()
+
+
+@pytest.mark.asyncio
+async def test_fetched_proxies_are_quarantined_until_validated(monkeypatch):
+    manager = _manager("http://known:80")
+    manager.max_proxies = 3
+    fetched = ["http://known:80", "http://good1:80", "http://dead:80", "http://good2:80", "http://good3:80"]
+
+    async def fake_fetch(timeout):
+        return fetched
+
+    async def fake_probe(proxy_url):
+        return proxy_url != "http://dead:80"
+
+    monkeypatch.setattr(proxy_pool, "fetch_all_free_proxies", fake_fetch)
+    monkeypatch.setattr(manager, "_check_proxy_health", fake_probe)
+    await manager.refresh_pool(force=True)
+    assert set(manager.proxies) == {"http://known:80"}
+    assert manager.get_next_proxy() == "http://known:80"
+
+    await manager.validate_quarantine()
+    # Two good candidates fit under max_proxies; the third waits, the dead one is rejected
+    assert len(manager.proxies) == 3
+    assert all(url in manager._index for url in manager.proxies)
+    assert len(manager._quarantine) == 1
+    assert "http://dead:80" in manager._rejected
+
+    await manager.refresh_pool(force=True)
+    quarantine = manager.get_pool_stats()["quarantine"]
+    assert quarantine == {
+        "waiting": 1,
+        "fetched": 10,
+        "skipped_known": 5,
+        "skipped_rejected": 1,
+        "quarantined": 4,
+        "promoted": 2,
+        "rejected": 1,
+        "expired": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_quarantine_drops_candidates_already_in_the_pool_and_expires_old_ones(monkeypatch):
+    manager = _manager("http://known:80")
+    manager.max_proxies = 2
+
+    async def fake_fetch(timeout):
+        return ["http://merged:80", "http://waiting:80"]
+
+    async def fake_probe(proxy_url):
+        return True
+
+    monkeypatch.setattr(proxy_pool, "fetch_all_free_proxies", fake_fetch)
+    monkeypatch.setattr(manager, "_check_proxy_health", fake_probe)
+    await manager.refresh_pool(force=True)
+    # Another isolate's snapshot brings in a URL this one still has quarantined
+    merged = manager.export_snapshot()
+    merged["proxies"] = [["http://merged:80", *merged["proxies"][0][1:]]]
+    manager.max_proxies = 3
+    assert manager.merge_snapshot(merged) == 1
+    assert list(manager._quarantine) == ["http://waiting:80"]
+    # A candidate that reached the pool some other way is dropped, not re-queued
+    manager._quarantine["http://known:80"] = manager._quarantine["http://waiting:80"]
+    manager._finish_quarantine("http://known:80", True)
+    assert list(manager._quarantine) == ["http://waiting:80"]
+    assert manager.funnel["promoted"] == 0
+
+    # A full pool keeps the candidate waiting, but only until it is too old
+    manager.max_proxies = 2
+    await manager.validate_quarantine()
+    assert list(manager._quarantine) == ["http://waiting:80"]
+    manager._quarantine["http://waiting:80"] -= proxy_pool.QUARANTINE_MAX_AGE_SECONDS
+    await manager.validate_quarantine()
+    assert not manager._quarantine
+    assert manager.funnel["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_quarantine_outcomes_are_reported_to_the_proxy_sources(monkeypatch):
+    source = proxy_fetcher.ProxyProvider(name="src", url="http://unused")
+    monkeypatch.setattr(proxy_fetcher, "_providers", {"src": source})
+    fetched = ["http://known:80", "http://good:80", "http://dead:80", "http://overflow:80"]
+    monkeypatch.setattr(proxy_fetcher, "_proxy_origins", OrderedDict((url, "src") for url in fetched))
+    monkeypatch.setattr(proxy_pool, "QUARANTINE_MAX", 2)
+    manager = _manager("http://known:80")
+
+    async def fake_fetch(timeout):
+        return fetched
+
+    async def fake_probe(proxy_url):
+        return proxy_url == "http://good:80"
+
+    monkeypatch.setattr(proxy_pool, "fetch_all_free_proxies", fake_fetch)
+    monkeypatch.setattr(manager, "_check_proxy_health", fake_probe)
+    await manager.refresh_pool(force=True)
+    # Pool members and quarantine overflow are never probed, so they stop being tracked
+    assert list(proxy_fetcher._proxy_origins) == ["http://good:80", "http://dead:80"]
+
+    await manager.validate_quarantine()
+    assert (source.working, source.rejected) == (1, 1)
+    assert not proxy_fetcher._proxy_origins
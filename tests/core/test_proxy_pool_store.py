@@ -0,0 +1,131 @@
+"""Tests for sharing proxy pool state across isolates."""
+from __future__ import annotations
+
+import json
+import time
+
+import pytest
+
+from src.workers.core import proxy_pool
+from src.workers.core.proxy_pool import ProxyEntry, ProxyPoolManager
+from src.workers.core.proxy_pool_store import KVPoolStore, sync_pool_snapshot, warm_start_pool
+
+
+class FakeKV:
+    def __init__(self):
+        self.values = {}
+        self.puts = 0
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def put(self, key, value):
+        self.puts += 1
+        self.values[key] = value
+
+
+def _manager(*urls: str) -> ProxyPoolManager:
+    manager = ProxyPoolManager()
+    manager.proxies = {url: ProxyEntry(url=url) for url in urls}
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_isolates_merge_counts_and_warm_start():
+    store = KVPoolStore(FakeKV())
+    first = _manager("http://a:80", "http://b:80")
+    second = _manager("http://a:80")
+    for _ in range(3):
+        first.mark_proxy_success("http://a:80", 400.0)
+    second.mark_proxy_success("http://a:80", 900.0)
+    second.mark_proxy_failure("http://a:80", 5000.0)
+    second.proxies["http://a:80"].last_observed += 1.0  # observed after the first isolate
+
+    assert await sync_pool_snapshot(first, store)
+    assert await sync_pool_snapshot(second, store)
+    # Resyncing without new observations adds nothing twice
+    assert await sync_pool_snapshot(first, store, force=True)
+
+    snapshot = json.loads(store.namespace.values["proxy-pool:snapshot:v1"])
+    rows = {row[0]: row for row in snapshot["proxies"]}
+    assert rows["http://a:80"][1:3] == [4, 1]
+    assert set(rows) == {"http://a:80", "http://b:80"}
+
+    cold = ProxyPoolManager()
+    assert await warm_start_pool(cold, store)
+    entry = cold.proxies["http://a:80"]
+    assert (entry.success_count, entry.failure_count) == (4, 1)
+    # Most recent evidence for "a" came from the second isolate
+    assert entry.ewma_latency_ms == pytest.approx(second.proxies["http://a:80"].ewma_latency_ms, abs=0.1)
+    assert entry.last_observed is not None
+    assert "http://a:80" in cold._index
+
+
+@pytest.mark.asyncio
+async def test_snapshot_writes_are_rate_limited_and_carry_breakers(monkeypatch):
+    kv = FakeKV()
+    store = KVPoolStore(kv)
+    manager = _manager("http://bad:80")
+    for _ in range(proxy_pool.BREAKER_FAILURE_THRESHOLD):
+        manager.mark_proxy_failure("http://bad:80")
+
+    assert await sync_pool_snapshot(manager, store)
+    manager.mark_proxy_failure("http://bad:80")
+    assert not await sync_pool_snapshot(manager, store)
+    assert kv.puts == 1
+
+    monkeypatch.setattr(proxy_pool, "SNAPSHOT_WRITE_INTERVAL_SECONDS", 0.0)
+    assert await sync_pool_snapshot(manager, store)
+    assert not await sync_pool_snapshot(manager, store)  # nothing changed since
+    assert kv.puts == 2
+
+    cold = ProxyPoolManager()
+    await warm_start_pool(cold, store)
+    assert cold.proxies["http://bad:80"].breaker.state == proxy_pool.BREAKER_OPEN
+    assert "http://bad:80" not in cold._index
+
+
+@pytest.mark.asyncio
+async def test_warm_start_without_store_or_snapshot():
+    manager = ProxyPoolManager()
+    assert not await warm_start_pool(manager, None)
+    assert not await warm_start_pool(manager, KVPoolStore(FakeKV()))
+
+
+@pytest.mark.asyncio
+async def test_removed_proxies_are_not_merged_back_from_other_isolates():
+    store = KVPoolStore(FakeKV())
+    first = _manager("http://a:80", "http://gone:80")
+    second = _manager("http://a:80", "http://gone:80")
+    assert await sync_pool_snapshot(first, store)
+    assert await sync_pool_snapshot(second, store)
+
+    with first._sync_lock:
+        first._remove_proxy("http://gone:80", removed_at=time.time() - 60)
+    assert await sync_pool_snapshot(first, store, force=True)
+    # The second isolate holds no newer evidence, so it drops the proxy instead of re-sharing it
+    assert await sync_pool_snapshot(second, store, force=True)
+    assert "http://gone:80" not in second.proxies
+    assert "http://gone:80" not in second._index
+
+    snapshot = json.loads(store.namespace.values["proxy-pool:snapshot:v1"])
+    assert "http://gone:80" not in {row[0] for row in snapshot["proxies"]}
+    assert [url for url, _ in snapshot["removed"]] == ["http://gone:80"]
+
+    cold = ProxyPoolManager()
+    assert await warm_start_pool(cold, store)
+    assert set(cold.proxies) == {"http://a:80"}
+
+    # A proxy re-admitted after its removal carries newer evidence and wins the merge
+    second._add_proxy(ProxyEntry(url="http://gone:80"))
+    second.mark_proxy_success("http://gone:80", 300.0)
+    assert await sync_pool_snapshot(second, store, force=True)
+    assert await sync_pool_snapshot(first, store, force=True)
+    assert "http://gone:80" in first.proxies
+
+
+def test_tombstones_expire():
+    manager = _manager("http://a:80")
+    with manager._sync_lock:
+        manager._remove_proxy("http://a:80", removed_at=1.0)
+    assert manager.export_snapshot()["removed"] == []
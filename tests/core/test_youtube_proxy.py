@@ -0,0 +1,465 @@
+"""Tests for Innertube caption download helpers."""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.workers.core import youtube_proxy
+from src.workers.core.youtube_proxy import (
+    TranscriptProxyError,
+    _download_caption_track,
+    _parse_json3_text,
+    _parse_json3_transcript,
+    _parse_vtt_text,
+    _parse_vtt_transcript,
+    clear_negative_cache,
+    fetch_transcript_via_proxy,
+    get_caption_format_stats,
+    get_negative_cache_stats,
+    iter_vtt_cues,
+)
+
+TRACK = {"baseUrl": "https://www.youtube.com/api/timedtext?v=abc&lang=en", "kind": "asr"}
+JSON3_BODY = json.dumps({"events": [{"segs": [{"utf8": "hello"}, {"utf8": " world"}]}]})
+VTT_BODY = "WEBVTT\n\n00:00:00.000 --> 00:00:01.000\nhello vtt\n"
+
+
+class StubCaptionClient:
+    """Minimal async client returning canned caption responses per format."""
+
+    def __init__(self, responses, delays=None):
+        self.responses = responses
+        self.delays = delays or {}
+        self.requested: list[str] = []
+        self.cancelled: list[str] = []
+
+    async def get(self, url, proxies=None):
+        fmt = "json3" if "fmt=json3" in url else "vtt"
+        self.requested.append(fmt)
+        try:
+            await asyncio.sleep(self.delays.get(fmt, 0))
+        except asyncio.CancelledError:
+            self.cancelled.append(fmt)
+            raise
+        status_code, body = self.responses[fmt]
+        return httpx.Response(status_code, text=body, request=httpx.Request("GET", url))
+
+
+@pytest.fixture(autouse=True)
+def reset_caption_stats(monkeypatch):
+    youtube_proxy._caption_format_stats.clear()
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_caption_race", False)
+    monkeypatch.setattr(youtube_proxy, "CAPTION_FORMAT_EXPLORE_RATE", 0.0)
+    yield
+    youtube_proxy._caption_format_stats.clear()
+
+
+@pytest.mark.asyncio
+async def test_sequential_mode_falls_back_to_vtt():
+    client = StubCaptionClient({"json3": (404, ""), "vtt": (200, VTT_BODY)})
+    text, fmt, _ = await _download_caption_track(client, TRACK)
+    assert (text, fmt) == ("hello vtt", "vtt")
+    assert client.requested == ["json3", "vtt"]
+
+
+@pytest.mark.asyncio
+async def test_segments_are_parsed_only_when_requested(monkeypatch):
+    client = StubCaptionClient({"json3": (404, ""), "vtt": (200, VTT_BODY)})
+    timed = MagicMock(side_effect=AssertionError("timed parser on the text-only path"))
+    monkeypatch.setitem(youtube_proxy.CAPTION_PARSERS, "vtt", timed)
+    assert await _download_caption_track(client, TRACK) == ("hello vtt", "vtt", None)
+
+    monkeypatch.setitem(youtube_proxy.CAPTION_PARSERS, "vtt", _parse_vtt_transcript)
+    _, _, segments = await _download_caption_track(client, TRACK, include_segments=True)
+    assert segments == {"text": ["hello vtt"], "tStartMs": [0], "dDurationMs": [1000]}
+
+@pytest.mark.asyncio
+async def test_race_mode_prefers_json3_and_cancels_vtt(monkeypatch):
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_caption_race", True)
+    client = StubCaptionClient(
+        {"json3": (200, JSON3_BODY), "vtt": (200, VTT_BODY)},
+        delays={"vtt": 1.0},
+    )
+    text, fmt, _ = await _download_caption_track(client, TRACK)
+    await asyncio.sleep(0)
+    assert (text, fmt) == ("hello world", "json3")
+    assert client.cancelled == ["vtt"]
+
+
+@pytest.mark.asyncio
+async def test_race_mode_uses_vtt_when_json3_fails(monkeypatch):
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_caption_race", True)
+    client = StubCaptionClient(
+        {"json3": (200, "not json"), "vtt": (200, VTT_BODY)},
+        delays={"json3": 0.05},
+    )
+    text, fmt, _ = await _download_caption_track(client, TRACK)
+    assert (text, fmt) == ("hello vtt", "vtt")
+    stats = get_caption_format_stats()["asr"]["formats"]
+    assert stats["json3"]["successes"] == 0
+    assert stats["vtt"]["successes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_race_mode_raises_when_both_formats_fail(monkeypatch):
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_caption_race", True)
+    client = StubCaptionClient({"json3": (404, ""), "vtt": (404, "")})
+    with pytest.raises(TranscriptProxyError) as exc_info:
+        await _download_caption_track(client, TRACK)
+    assert exc_info.value.code == "caption_unavailable"
+
+
+@pytest.mark.asyncio
+async def test_preferred_format_adapts_per_track_kind():
+    client = StubCaptionClient({"json3": (200, "not json"), "vtt": (200, VTT_BODY)})
+    for _ in range(youtube_proxy.CAPTION_FORMAT_MIN_SAMPLES):
+        await _download_caption_track(client, TRACK)
+
+    stats = get_caption_format_stats()
+    assert stats["asr"]["preferred"] == "vtt"
+    assert youtube_proxy._caption_format_order("standard") == ("json3", "vtt")
+
+    client.requested.clear()
+    await _download_caption_track(client, TRACK)
+    assert client.requested == ["vtt"]
+
+
+@pytest.mark.asyncio
+async def test_old_format_outcomes_decay_away():
+    client = StubCaptionClient({"json3": (200, "not json"), "vtt": (200, VTT_BODY)})
+    for _ in range(youtube_proxy.CAPTION_FORMAT_MIN_SAMPLES):
+        await _download_caption_track(client, TRACK)
+    assert youtube_proxy._caption_format_order("asr") == ("vtt", "json3")
+
+    # Three half-lives later the old failures are no longer a sufficient sample
+    for stats in youtube_proxy._caption_format_stats["asr"].values():
+        stats["updated"] -= 3 * youtube_proxy.CAPTION_FORMAT_HALF_LIFE_SECONDS
+    assert youtube_proxy._caption_format_order("asr") == ("json3", "vtt")
+    assert get_caption_format_stats()["asr"]["formats"]["json3"]["attempts"] == pytest.approx(0.62, abs=0.01)
+
+
+@pytest.mark.asyncio
+async def test_exploration_samples_secondary_format_when_primary_succeeds(monkeypatch):
+    monkeypatch.setattr(youtube_proxy, "CAPTION_FORMAT_EXPLORE_RATE", 1.0)
+    client = StubCaptionClient({"json3": (200, JSON3_BODY), "vtt": (200, VTT_BODY)})
+    text, fmt, _ = await _download_caption_track(client, TRACK)
+
+    assert (text, fmt) == ("hello world", "json3")
+    assert client.requested == ["json3", "vtt"]
+    stats = get_caption_format_stats()["asr"]["formats"]
+    assert stats["vtt"]["successes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_race_mode_exploration_records_the_losing_format(monkeypatch):
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_caption_race", True)
+    monkeypatch.setattr(youtube_proxy, "CAPTION_FORMAT_EXPLORE_RATE", 1.0)
+    client = StubCaptionClient(
+        {"json3": (200, JSON3_BODY), "vtt": (404, "")},
+        delays={"vtt": 0.05},
+    )
+    text, fmt, _ = await _download_caption_track(client, TRACK)
+
+    assert (text, fmt) == ("hello world", "json3")
+    assert client.cancelled == []
+    stats = get_caption_format_stats()["asr"]["formats"]
+    assert (stats["vtt"]["attempts"], stats["vtt"]["successes"]) == (1, 0)
+
+
+def _legacy_parse_json3_text(payload: str) -> str:
+    """Reference implementation: segment list, join, then regex-normalize."""
+    parts = []
+    for event in json.loads(payload).get("events") or []:
+        for seg in event.get("segs") or []:
+            text = seg.get("utf8")
+            if text:
+                cleaned = text.replace("\n", " ").strip()
+                if cleaned:
+                    parts.append(cleaned)
+    return re.sub(r"\s+", " ", " ".join(parts)).strip()
+
+
+def test_parse_json3_transcript_returns_parallel_segment_arrays():
+    payload = json.dumps({
+        "events": [
+            {"tStartMs": 0, "dDurationMs": 1000, "id": 1, "wpWinPosId": 1},
+            {"tStartMs": 100, "dDurationMs": 2000, "segs": [{"utf8": "Hello"}, {"utf8": "  big\nworld "}]},
+            {"tStartMs": 2100, "dDurationMs": 500, "segs": [{"utf8": "\n"}]},
+            {"tStartMs": 2600, "segs": [{"utf8": "bye"}]},
+        ]
+    })
+    text, segments = _parse_json3_transcript(payload)
+    assert text == "Hello big world bye"
+    assert segments == {
+        "text": ["Hello big world", "bye"],
+        "tStartMs": [100, 2600],
+        "dDurationMs": [2000, 0],
+    }
+
+
+def test_parse_json3_text_matches_legacy_parser_on_random_payloads():
+    rng = random.Random(1234)
+    alphabet = ["a", "b", "é", " ", "  ", "\n", "\t", "\u00a0", "[Music]", "\r\n"]
+    for _ in range(200):
+        events = []
+        for i in range(rng.randint(0, 20)):
+            segs = [{"utf8": "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))}
+                    for _ in range(rng.randint(0, 4))]
+            event = {"tStartMs": i * 1000, "dDurationMs": 900}
+            if segs or rng.random() < 0.5:
+                event["segs"] = segs
+            events.append(event)
+        payload = json.dumps({"events": events})
+        assert _parse_json3_text(payload) == _legacy_parse_json3_text(payload)
+
+
+def test_parse_json3_text_rejects_invalid_payload():
+    with pytest.raises(TranscriptProxyError):
+        _parse_json3_text("not json")
+
+
+def _legacy_parse_vtt_text(vtt_text: str) -> str:
+    """Reference implementation: splitlines() with numeric-line lookahead."""
+    raw_lines = vtt_text.splitlines()
+    lines = []
+    idx = 0
+    while idx < len(raw_lines):
+        stripped = raw_lines[idx].strip()
+        idx += 1
+        if not stripped or stripped.startswith("WEBVTT") or "-->" in stripped:
+            continue
+        if stripped.isdigit():
+            lookahead = idx
+            next_line = ""
+            while lookahead < len(raw_lines):
+                if raw_lines[lookahead].strip():
+                    next_line = raw_lines[lookahead].strip()
+                    break
+                lookahead += 1
+            if next_line and "-->" in next_line:
+                continue
+        lines.append(stripped)
+    return re.sub(r"\s+", " ", " ".join(lines)).strip()
+
+
+def test_iter_vtt_cues_skips_header_blocks_settings_and_tags():
+    vtt = (
+        "WEBVTT\nKind: captions\nLanguage: en\n\n"
+        "STYLE\n::cue { color: lime }\n\n"
+        "NOTE this is a comment\nspanning lines\n\n"
+        "intro\n00:00:01.500 --> 00:00:03.000 align:start position:0%\n"
+        "<v Roger>Hello<00:00:02.000><c> there</c>\n&amp; welcome\n\n"
+        "00:01:02.250 --> 00:01:04.000\n  42  \n"
+    )
+    assert list(iter_vtt_cues(vtt.splitlines())) == [
+        (1500, 3000, "Hello there & welcome"),
+        (62250, 64000, "42"),
+    ]
+    text, segments = _parse_vtt_transcript(vtt)
+    assert text == "Hello there & welcome 42"
+    assert segments == {
+        "text": ["Hello there & welcome", "42"],
+        "tStartMs": [1500, 62250],
+        "dDurationMs": [1500, 1750],
+    }
+
+
+def test_iter_vtt_cues_parses_srt():
+    srt = "1\r\n00:00:00,000 --> 00:00:01,250\r\nfirst line\r\nsecond\r\n\r\n2\r\n01:00:00,000 --> 01:00:02,000\r\nlast\r\n"
+    assert list(iter_vtt_cues(srt.splitlines())) == [
+        (0, 1250, "first line second"),
+        (3600000, 3602000, "last"),
+    ]
+
+
+def _random_caption_file(rng: random.Random) -> str:
+    words = ["hello", "world", "it's", "caf\u00e9", "x1", "7pm", "\u00a0", "--", "a"]
+    numbered = rng.random() < 0.5
+    sep = "," if numbered and rng.random() < 0.5 else "."
+    newline = rng.choice(["\n", "\r\n"])
+    out = ["WEBVTT", ""] if not numbered or rng.random() < 0.3 else []
+    for index in range(1, rng.randint(0, 15) + 1):
+        if numbered:
+            out.append(f"{' ' * rng.randint(0, 1)}{index}")
+            out.extend([""] * rng.randint(0, 1))
+        settings = rng.choice(["", " align:start position:0%", " line:90%"])
+        out.append(f"00:00:{index:02d}{sep}000 --> 00:00:{index:02d}{sep}900{settings}")
+        text_lines = []
+        for _ in range(rng.randint(0, 3)):
+            text_lines.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 5))))
+        if text_lines and rng.random() < 0.3:
+            text_lines.insert(0, str(rng.randint(0, 999)))  # bare number spoken in the cue
+        out.extend(text_lines)
+        out.extend([rng.choice(["", "   ", "\t"]) for _ in range(rng.randint(1, 3))])
+    return newline.join(out)
+
+
+def test_streaming_vtt_parser_matches_legacy_parser_on_random_files():
+    rng = random.Random(2029)
+    for _ in range(500):
+        caption_file = _random_caption_file(rng)
+        assert _parse_vtt_text(caption_file) == _legacy_parse_vtt_text(caption_file), caption_file
+
+
+@pytest.fixture
+def negative_cache(monkeypatch):
+    clear_negative_cache()
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_transcript_negative_cache_ttl_seconds", 60)
+    yield
+    clear_negative_cache()
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_serves_final_errors_without_rescraping(negative_cache):
+    scrape = AsyncMock(side_effect=TranscriptProxyError("no_captions", "No captions"))
+    with patch.object(youtube_proxy, "_fetch_via_innertube", scrape):
+        with pytest.raises(TranscriptProxyError) as first:
+            await fetch_transcript_via_proxy("abcdefghijk")
+        with pytest.raises(TranscriptProxyError) as second:
+            await fetch_transcript_via_proxy("abcdefghijk")
+
+    assert scrape.await_count == 1
+    assert "negativeCache" not in (first.value.details or {})
+    assert second.value.code == "no_captions"
+    assert second.value.details == {"negativeCache": True}
+    assert get_negative_cache_stats() == {"hits": 1, "stores": 1, "expired": 0, "size": 1}
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_skips_retriable_codes_and_expires(negative_cache):
+    blocked = AsyncMock(side_effect=TranscriptProxyError("blocked", "Blocked"))
+    with patch.object(youtube_proxy, "_fetch_via_innertube", blocked):
+        for _ in range(2):
+            with pytest.raises(TranscriptProxyError):
+                await fetch_transcript_via_proxy("abcdefghijk")
+    assert blocked.await_count == 2
+
+    invalid = AsyncMock(side_effect=TranscriptProxyError("invalid_video", "Gone"))
+    with patch.object(youtube_proxy, "_fetch_via_innertube", invalid):
+        with pytest.raises(TranscriptProxyError):
+            await fetch_transcript_via_proxy("abcdefghijk")
+        # Age the entry past its TTL
+        _, *rest = youtube_proxy._negative_cache["abcdefghijk"]
+        youtube_proxy._negative_cache["abcdefghijk"] = (0.0, *rest)
+        with pytest.raises(TranscriptProxyError):
+            await fetch_transcript_via_proxy("abcdefghijk")
+    assert invalid.await_count == 2
+    assert get_negative_cache_stats()["expired"] == 1
+
+
+@pytest.mark.asyncio
+async def test_build_client_routes_through_client_level_proxy():
+    watch_url = httpx.URL(youtube_proxy.WATCH_URL)
+    async with youtube_proxy._build_client("http://10.0.0.1:8080", True, 5.0) as client:
+        assert client._transport_for_url(watch_url) is not client._transport  # the proxy mount
+    async with youtube_proxy._build_client(None, False, 5.0) as client:
+        assert client._transport_for_url(watch_url) is client._transport
+
+
+@pytest.mark.asyncio
+async def test_innertube_scrape_runs_through_per_attempt_client(monkeypatch, negative_cache):
+    def youtube(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/watch":
+            return httpx.Response(
+                200, text='"INNERTUBE_API_KEY":"key","INNERTUBE_CONTEXT_CLIENT_VERSION":"2.0"'
+            )
+        if request.url.path == "/youtubei/v1/player":
+            tracks = [{"baseUrl": TRACK["baseUrl"], "languageCode": "en", "kind": "asr"}]
+            return httpx.Response(200, json={"captions": {"playerCaptionsTracklistRenderer": {"captionTracks": tracks}}})
+        return httpx.Response(200, text=JSON3_BODY)
+
+    clients = []
+
+    def build_client(proxy_url, is_free_proxy, timeout):
+        clients.append(proxy_url)
+        return httpx.AsyncClient(transport=httpx.MockTransport(youtube), timeout=timeout)
+
+    monkeypatch.setattr(youtube_proxy, "_build_client", build_client)
+    monkeypatch.setattr(youtube_proxy, "_pick_proxy", AsyncMock(return_value=("http://10.0.0.1:8080", False)))
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_jitter_max_seconds", 0.0)
+
+    result = await fetch_transcript_via_proxy("abcdefghijk")
+
+    assert result["transcript"]["text"] == "hello world"
+    assert clients == ["http://10.0.0.1:8080"]
+
+
+@pytest.mark.asyncio
+async def test_caption_download_failure_is_retried_and_not_negatively_cached(monkeypatch, negative_cache):
+    caption_statuses = [404, 404, 200]
+
+    def youtube(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/watch":
+            return httpx.Response(
+                200, text='"INNERTUBE_API_KEY":"key","INNERTUBE_CONTEXT_CLIENT_VERSION":"2.0"'
+            )
+        if request.url.path == "/youtubei/v1/player":
+            tracks = [{"baseUrl": TRACK["baseUrl"], "languageCode": "en", "kind": "asr"}]
+            return httpx.Response(200, json={"captions": {"playerCaptionsTracklistRenderer": {"captionTracks": tracks}}})
+        return httpx.Response(caption_statuses.pop(0), text=JSON3_BODY)
+
+    mark_success, mark_failure = MagicMock(), MagicMock()
+    manager = youtube_proxy.get_proxy_pool_manager()
+    monkeypatch.setattr(manager, "mark_proxy_success", mark_success)
+    monkeypatch.setattr(manager, "mark_proxy_failure", mark_failure)
+    monkeypatch.setattr(
+        youtube_proxy, "_build_client", lambda *_: httpx.AsyncClient(transport=httpx.MockTransport(youtube))
+    )
+    monkeypatch.setattr(youtube_proxy, "_pick_proxy", AsyncMock(return_value=("http://10.0.0.1:8080", True)))
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_jitter_max_seconds", 0.0)
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_max_retries", 2)
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_retry_base_delay", 0.0)
+
+    result = await fetch_transcript_via_proxy("abcdefghijk")
+
+    assert result["transcript"]["text"] == "hello world"
+    # Both formats 404ed on the first attempt: a proxy failure, not a video without captions
+    assert mark_failure.call_count == 1
+    assert mark_success.call_count == 1
+    assert get_negative_cache_stats()["stores"] == 0
+
+
+@pytest.mark.asyncio
+async def test_watch_page_404_is_retried_and_not_negatively_cached(monkeypatch, negative_cache):
+    watch_statuses = [404, 200]
+
+    def youtube(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/watch":
+            return httpx.Response(
+                watch_statuses.pop(0), text='"INNERTUBE_API_KEY":"key","INNERTUBE_CONTEXT_CLIENT_VERSION":"2.0"'
+            )
+        if request.url.path == "/youtubei/v1/player":
+            tracks = [{"baseUrl": TRACK["baseUrl"], "languageCode": "en", "kind": "asr"}]
+            return httpx.Response(200, json={"captions": {"playerCaptionsTracklistRenderer": {"captionTracks": tracks}}})
+        return httpx.Response(200, text=JSON3_BODY)
+
+    mark_success, mark_failure = MagicMock(), MagicMock()
+    manager = youtube_proxy.get_proxy_pool_manager()
+    monkeypatch.setattr(manager, "mark_proxy_success", mark_success)
+    monkeypatch.setattr(manager, "mark_proxy_failure", mark_failure)
+    monkeypatch.setattr(
+        youtube_proxy, "_build_client", lambda *_: httpx.AsyncClient(transport=httpx.MockTransport(youtube))
+    )
+    monkeypatch.setattr(youtube_proxy, "_pick_proxy", AsyncMock(return_value=("http://10.0.0.1:8080", True)))
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_jitter_max_seconds", 0.0)
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_max_retries", 2)
+    monkeypatch.setattr(youtube_proxy.settings, "youtube_scraper_retry_base_delay", 0.0)
+
+    result = await fetch_transcript_via_proxy("abcdefghijk")
+
+    assert result["transcript"]["text"] == "hello world"
+    assert (mark_failure.call_count, mark_success.call_count) == (1, 1)
+    assert get_negative_cache_stats()["stores"] == 0
+
+
+def test_tracks_without_a_caption_url_are_not_selectable():
+    player = {"captions": {"playerCaptionsTracklistRenderer": {"captionTracks": [{"languageCode": "en"}]}}}
+    with pytest.raises(TranscriptProxyError) as exc_info:
+        youtube_proxy._select_caption_track(player)
+    assert exc_info.value.code == "no_captions"